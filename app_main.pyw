@@ -233,6 +233,19 @@ def main():
                 shooter_name, game_name, arrow_index = window[event].metadata
                 game.on_update_manual_result(shooter_name, game_name, arrow_index, int(values[event]))
 
+            elif ResultProcessor.VIEW_SHOT_FIELD_PREFIX in event:
+                sg.cprint("{} - EVENT: [{}] received.".format(datetime.now(), event))
+                shooter_name, game_name, arrow_index = window[event].metadata
+                game.on_view_arrow_shot(shooter_name, game_name, arrow_index)
+
+            elif ResultProcessor.SHOW_SHOOTER_FIELD_PREFIX in event:
+                sg.cprint("{} - EVENT: [{}] received.".format(datetime.now(), event))
+                game.on_show_result_shooter(window[event].metadata)
+
+            ## one per arrow shown, no trace logs here
+            elif event == ResultProcessor.THUMBNAIL_READY_EVENT:
+                game.on_thumbnail_ready(*values[event])
+
             ############################################################################# 
             ## TIMEOUT - THIS WILL DO CONTINOUS WORK LIKE CHECKING FOR BANGS. NO TRACE LOGS HERE!
             elif event == "__TIMEOUT__":
@@ -6,9 +6,11 @@ from sys import platform as PLATFORM
 from game_modules.app_configuration import AppConfig
 from game_modules.video_player import VideoPlayer
 from game_modules.shooter_data import ShooterData
-from game_modules.audio_bang_detector import BangDetector
+from game_modules.audio_bang_detector import BangDetector, ImpactEvent
 from game_modules.camera_control import CameraControl
 from game_modules.result_processor import ResultProcessor
+from game_modules.image_writer import ImageWriterPool
+from game_modules.thread_log import THREAD_LOG
 
 ################################################################################################
 # PySimpleGui Docu: https://www.pysimplegui.org/en/latest/call%20reference/ 
@@ -25,8 +27,9 @@ class GameEngine:
         self.video_player : VideoPlayer = None
         self.shooter_data = ShooterData(AppConfig.CFG_MAX_PLAYERS)
         self.bang_detector = BangDetector()
-        self.webcam_handler = CameraControl()
-        self.result_processor = ResultProcessor()
+        self.image_writer = ImageWriterPool()
+        self.webcam_handler = CameraControl(self.image_writer)
+        self.result_processor = ResultProcessor(self.image_writer)
 
         # Runtime data
         self.session_id = ""
@@ -180,6 +183,10 @@ class GameEngine:
             # run this player and game     
             sg.cprint("{} - Starting game {} for shooter {}...".format(datetime.now(), self.current_game_index, self.current_player_index))               
             self.video_player.play(self.shooter_data.shooter_by_index(self.current_player_index), self.list_selected_games[self.current_game_index])
+            self.bang_detector.clear_impacts()
+            # the target without this shooter's arrows, baseline for the automatic scoring
+            self.result_processor.process_reference_shot(self.shooter_data.shooter_by_index(self.current_player_index), 
+                self.list_selected_games[self.current_game_index], self.webcam_handler.take_reference_shot())
             self.game_active = True
         else:
             self.game_active = False
@@ -385,6 +392,9 @@ class GameEngine:
     def on_event_loop_timeout(self):
         #sg.cprint("{} - TRACE: {}.on_event_loop_timeout()".format(datetime.now(), self.__class__))   # not tracing, to noisy
 
+        ## Log lines of the background threads go to the log window from here
+        THREAD_LOG.flush()
+
         self.timeout_count += 1
         if self.timeout_count >= ((1000 / AppConfig.CFG_CYCLE_TIMEOUT_MS) - 1):
             ## Allow the player window to update the time every one second
@@ -396,15 +406,15 @@ class GameEngine:
 
         ## Listen for impact via audio detection
         if self.game_active is True:
-            if self.bang_detector.listen() is True:
-                sg.cprint("{} - BANG !!! Impact via AUDIO detected - will now take a shot with the camera!".format(datetime.now()))
-                self.handle_bang()
+            for impact in self.bang_detector.poll_impacts():
+                sg.cprint("{} - BANG !!! Impact via AUDIO detected {:.0f} ms ago - will now take a shot with the camera!".format(datetime.now(), impact.age_ms()))
+                self.handle_bang(impact)
                 
         return
 
     #####################################################################################
     #------- Pause the video and take a shot with the camera when a bang was detected, but only for the 3 first arrows
-    def handle_bang(self):
+    def handle_bang(self, impact: ImpactEvent = None):
         sg.cprint("{} - TRACE: {}.handle_bang()".format(datetime.now(), self.__class__)) 
 
         # check the amount of arrows
@@ -412,19 +422,47 @@ class GameEngine:
             sg.cprint("{} - TRACE: Will skip this BANG!!, shooter already has {} arrow pictures recorded.".format(datetime.now(), AppConfig.CFG_ARROWS_PER_PLAYER)) 
             return
 
-        # pause the video, and take a camera picture
+        # timing of the impact, a manual bang happens right now
+        handled_time = time.monotonic()
+        if impact is None:
+            impact_sample = -1
+            impact_time = handled_time
+            detection_latency_ms = 0.0
+            handling_latency_ms = 0.0
+        else:
+            impact_sample = impact.onset_frame
+            impact_time = impact.onset_time
+            detection_latency_ms = impact.detection_latency_ms()
+            handling_latency_ms = (handled_time - impact.monotonic_time) * 1000.0
+
+        # the video position must be taken before pausing
+        video_time_ms = self.video_player.get_video_time_at(impact_time)
+        sg.cprint("{} - Impact at video time {} ms, detection latency {:.1f} ms, handling latency {:.1f} ms.".format(datetime.now(), 
+            video_time_ms, detection_latency_ms, handling_latency_ms))
+
+        # pause the video, and pick the camera picture right after the impact from the capture thread, waiting for it
+        # is part of the pause
         self.video_player.pause()
-        time.sleep(1)
-        file_name = self.webcam_handler.get_and_store_shot(game_instance = self.session_id, 
+        pause_end_time = handled_time + AppConfig.CFG_BANG_VIDEO_PAUSE_SECONDS
+        shot = self.webcam_handler.get_and_store_shot(game_instance = self.session_id, 
             game_name = self.list_selected_games[self.current_game_index], 
-            player_name = self.shooter_data.shooter_by_index(self.current_player_index))
+            player_name = self.shooter_data.shooter_by_index(self.current_player_index),
+            impact_time = impact_time,
+            deadline = pause_end_time)
+
+        # the audio clip goes next to the picture, written in the background
+        audio_clip = "{}.wav".format(os.path.splitext(shot.image_file)[0])
+        if self.bang_detector.archive_clip(impact, audio_clip) is False:
+            audio_clip = ""
 
-        # picture is good, now show some BANG and process the image
-        time.sleep(1)
+        # picture is good, keep the video paused for the rest of the pause to show the BANG
+        time.sleep(max(0.0, pause_end_time - time.monotonic()))
         self.video_player.resume()
 
-        # now store and process the shot 
-        self.result_processor.process_arrow_cam_shot(self.shooter_data.shooter_by_index(self.current_player_index), self.list_selected_games[self.current_game_index], self.current_player_arrow_nr, file_name)
+        # now process the shot, straight from memory
+        self.result_processor.process_arrow_cam_shot(self.shooter_data.shooter_by_index(self.current_player_index), self.list_selected_games[self.current_game_index], self.current_player_arrow_nr, shot)
+        self.result_processor.register_arrow_impact(self.shooter_data.shooter_by_index(self.current_player_index), self.list_selected_games[self.current_game_index], self.current_player_arrow_nr, 
+            self.video_player.video_file, video_time_ms, impact_sample, impact_time, detection_latency_ms, handling_latency_ms, audio_clip)
 
         # count the arrow
         self.current_player_arrow_nr += 1
@@ -437,6 +475,26 @@ class GameEngine:
         self.result_processor.update_manual_result(shooter_name, game_name, arrow_index, new_value)
         return
         
+    #####################################################################################
+    #------- Handle a click on an arrow picture in the result window
+    def on_view_arrow_shot(self, shooter_name: str, game_name: str, arrow_index: int):
+        sg.cprint("{} - TRACE: {}.on_view_arrow_shot()".format(datetime.now(), self.__class__)) 
+        self.result_processor.show_arrow_shot(shooter_name, game_name, arrow_index)
+        return
+
+    #####################################################################################
+    #------- Handle the selection of a shooter in the result window
+    def on_show_result_shooter(self, shooter_name: str):
+        sg.cprint("{} - TRACE: {}.on_show_result_shooter()".format(datetime.now(), self.__class__)) 
+        self.result_processor.show_result_shooter(shooter_name)
+        return
+
+    #####################################################################################
+    #------- Handle a thumbnail for the result window that was made in the background
+    def on_thumbnail_ready(self, image_file: str, data: bytes):
+        self.result_processor.show_thumbnail(image_file, data)
+        return
+
     #####################################################################################
     #------- Handle a close in the result window
     def on_button_close_result_window(self):
@@ -453,5 +511,7 @@ class GameEngine:
         self.main_window.close()
         self.webcam_handler.close()
         self.bang_detector.stop()        
+        self.result_processor.close()
+        self.image_writer.stop()
         self.result_processor.clear_results()
         return
@@ -0,0 +1,141 @@
+import numpy as np
+
+from game_modules.app_configuration import AppConfig
+
+##############################################################################################################
+##############################################################################################################
+## Tracks the noise floor per channel in dBFS with a frugal streaming quantile: every block moves the estimate
+## a small step up or down, so the update is O(1) and the floor follows the soundtrack in both directions.
+## The step size scales with a running estimate of the level spread and the configured window length.
+## All per block work runs on preallocated arrays.
+class NoiseFloorEstimator(object):
+
+    MIN_LEVEL = 1e-6     # -120 dBFS, avoids log(0)
+    MIN_SPREAD_DB = 1.0
+
+    ##############################################################################################################
+    def __init__(self, channels: int, block_time: float, window_seconds: float, quantile: float, initial_floor_db: float):
+        self.channels = max(1, int(channels))
+        self.quantile = quantile
+        self.rate = min(1.0, block_time / max(block_time, window_seconds))
+
+        self.floor_db = np.full(self.channels, initial_floor_db, dtype = np.float64)
+        self.spread_db = np.full(self.channels, 6.0, dtype = np.float64)
+        self.level_db = np.zeros(self.channels, dtype = np.float64)
+
+        # work arrays
+        self._above = np.zeros(self.channels, dtype = np.bool_)
+        self._step = np.zeros(self.channels, dtype = np.float64)
+        self._deviation = np.zeros(self.channels, dtype = np.float64)
+
+    ##############################################################################################################
+    ## Converts the per channel RMS into dBFS, the result is kept in level_db
+    def set_level(self, rms: np.ndarray) -> np.ndarray:
+        np.maximum(rms, self.MIN_LEVEL, out = self.level_db)
+        np.log10(self.level_db, out = self.level_db)
+        self.level_db *= 20.0
+        return self.level_db
+
+    ##############################################################################################################
+    ## Moves the floor one step towards the configured quantile of the recent levels
+    def update(self):
+        # spread: running mean absolute deviation from the floor
+        np.subtract(self.level_db, self.floor_db, out = self._deviation)
+        np.abs(self._deviation, out = self._deviation)
+        self._deviation -= self.spread_db
+        self._deviation *= self.rate
+        self.spread_db += self._deviation
+        np.maximum(self.spread_db, self.MIN_SPREAD_DB, out = self.spread_db)
+
+        # quantile: up by step * q when above, down by step * (1 - q) when below
+        np.greater(self.level_db, self.floor_db, out = self._above)
+        np.add(self._above, self.quantile - 1.0, out = self._step)
+        self._step *= self.spread_db
+        self._step *= self.rate
+        self.floor_db += self._step
+        return
+
+##############################################################################################################
+##############################################################################################################
+## Impact decision on top of the noise floor: a burst starts when the loudest channel exceeds the floor by the
+## on margin and ends when it drops below the off margin (hysteresis). Short bursts count as impacts, long ones
+## are treated as soundtrack or speech. After an impact the detector stays deaf for the refractory period.
+class AdaptiveThreshold(object):
+
+    ##############################################################################################################
+    def __init__(self, channels: int, block_time: float):
+        self.block_time = block_time
+        self.on_margin_db = AppConfig.CFG_NOISE_FLOOR_ON_MARGIN_DB
+        self.off_margin_db = AppConfig.CFG_NOISE_FLOOR_OFF_MARGIN_DB
+        self.min_on_level_db = AppConfig.CFG_NOISE_FLOOR_MIN_ON_LEVEL_DB
+        self.max_burst_blocks = max(1, int(round(AppConfig.CFG_NOISE_FLOOR_MAX_BURST_SECONDS / block_time)))
+        self.refractory_blocks = int(round(AppConfig.CFG_NOISE_FLOOR_REFRACTORY_SECONDS / block_time))
+
+        self.estimator = NoiseFloorEstimator(channels, block_time, AppConfig.CFG_NOISE_FLOOR_WINDOW_SECONDS,
+            AppConfig.CFG_NOISE_FLOOR_QUANTILE, AppConfig.CFG_NOISE_FLOOR_INITIAL_DB)
+        self._excess_db = np.zeros(self.estimator.channels, dtype = np.float64)
+
+        self.in_burst = False
+        self.burst_blocks = 0
+        self.blocks_since_impact = self.refractory_blocks
+        self.impact_count = 0
+        self.rejected_count = 0
+        self.last_excess_db = 0.0
+
+    ##############################################################################################################
+    ## Returns true at the end of a short burst, i.e. one block after the impact sound
+    def process(self, rms: np.ndarray) -> bool:
+
+        impact = False
+        self.blocks_since_impact += 1
+        self.estimator.set_level(rms)
+        np.subtract(self.estimator.level_db, self.estimator.floor_db, out = self._excess_db)
+        channel = int(self._excess_db.argmax())
+        self.last_excess_db = float(self._excess_db[channel])
+        level_db = float(self.estimator.level_db[channel])
+
+        if self.in_burst is False:
+            if self.last_excess_db > self.on_margin_db and level_db > self.min_on_level_db and self.blocks_since_impact > self.refractory_blocks:
+                self.in_burst = True
+                self.burst_blocks = 1
+            else:
+                self.estimator.update()
+        else:
+            if self.last_excess_db < self.off_margin_db:
+                self.in_burst = False
+                if self.burst_blocks <= self.max_burst_blocks:
+                    impact = True
+                    self.impact_count += 1
+                    self.blocks_since_impact = 0
+                else:
+                    self.rejected_count += 1
+                self.estimator.update()
+            else:
+                self.burst_blocks += 1
+                if self.burst_blocks > self.max_burst_blocks:
+                    # a sustained sound, let the floor follow it
+                    self.estimator.update()
+
+        return impact
+
+    ##############################################################################################################
+    ## True if the current block belongs to a burst that started in this block
+    def burst_started(self) -> bool:
+        return self.in_burst is True and self.burst_blocks == 1
+
+    ##############################################################################################################
+    ## Snapshot for diagnostics
+    def get_state(self) -> dict:
+        return {
+            "floor_db": np.round(self.estimator.floor_db, 1).tolist(),
+            "spread_db": np.round(self.estimator.spread_db, 1).tolist(),
+            "level_db": np.round(self.estimator.level_db, 1).tolist(),
+            "on_threshold_db": np.round(self.estimator.floor_db + self.on_margin_db, 1).tolist(),
+            "off_threshold_db": np.round(self.estimator.floor_db + self.off_margin_db, 1).tolist(),
+            "excess_db": round(self.last_excess_db, 1),
+            "in_burst": self.in_burst,
+            "burst_blocks": self.burst_blocks,
+            "refractory": self.blocks_since_impact <= self.refractory_blocks,
+            "impacts": self.impact_count,
+            "rejected_bursts": self.rejected_count,
+        }
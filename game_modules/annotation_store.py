@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+import PySimpleGUI as sg
+
+##############################################################################################################
+##############################################################################################################
+## What the processing found on the camera pictures of a session: where the target face is, how sure the match
+## was, where the arrow hit and how long it took. The pictures themselves stay as the camera took them, the
+## overlays are drawn from this data when a picture is viewed. One JSON file per session next to the results.
+class AnnotationStore(object):
+
+    ##############################################################################################################
+    def __init__(self, sidecar_file: str, session_id: str = ""):
+        self.sidecar_file = sidecar_file
+        self.session_id = session_id
+        self.annotations = {} # "shooter/game/arrow_nr" -> {"cam_image", "crop_image", "bbox", "score", ...}
+        self.lock = threading.Lock()
+        self.changed = False
+        self.load()
+
+    ##############################################################################################################
+    @staticmethod
+    def get_key(shooter_name: str, game_name: str, arrow_nr: int) -> str:
+        return "{}/{}/{}".format(shooter_name, game_name, arrow_nr)
+
+    ##############################################################################################################
+    def load(self):
+        if os.path.exists(self.sidecar_file) is False:
+            return
+        try:
+            with open(self.sidecar_file, "r") as f:
+                self.annotations = json.load(f).get("annotations", {})
+        except Exception as e:
+            sg.cprint("{} - WARNING: Could not read annotations {}, starting empty. E = {}".format(datetime.now(), self.sidecar_file, e))
+            self.annotations = {}
+        return
+
+    ##############################################################################################################
+    ## Sets the given fields of the annotation of an arrow, other fields stay
+    def update(self, shooter_name: str, game_name: str, arrow_nr: int, **fields):
+        with self.lock:
+            annotation = self.annotations.setdefault(self.get_key(shooter_name, game_name, arrow_nr), {})
+            annotation.update(fields)
+            self.changed = True
+        return
+
+    ##############################################################################################################
+    ## Annotation of an arrow, None if there is none
+    def get(self, shooter_name: str, game_name: str, arrow_nr: int) -> dict:
+        with self.lock:
+            annotation = self.annotations.get(self.get_key(shooter_name, game_name, arrow_nr), None)
+        return None if annotation is None else dict(annotation)
+
+    ##############################################################################################################
+    def save(self):
+        with self.lock:
+            if self.changed is False:
+                return
+            content = {"session_id": self.session_id, "updated": str(datetime.now()), "annotations": dict(self.annotations)}
+            self.changed = False
+
+        folder = os.path.dirname(self.sidecar_file)
+        if folder != "" and os.path.exists(folder) is False:
+            os.makedirs(folder)
+        with open(self.sidecar_file, "w") as f:
+            json.dump(content, f, indent = 1)
+        return
+
+##############################################################################################################
+## Draws the annotation into a copy of a BGR picture: the target face and the arrow hit. With on_crop the picture
+## is the crop of the target face, otherwise the camera picture.
+def render_overlay(image: np.ndarray, annotation: dict, on_crop: bool = False) -> np.ndarray:
+    overlay = image.copy()
+    bbox = annotation.get("bbox", None)
+    # crop -> camera picture: the homography of the rectification, or the offset of the axis aligned crop
+    homography = np.eye(3)
+    if bbox is not None and on_crop is False:
+        homography = np.array([[1.0, 0.0, bbox[0]], [0.0, 1.0, bbox[1]], [0.0, 0.0, 1.0]])
+        if annotation.get("homography", None) is not None:
+            homography = np.array(annotation["homography"], dtype = np.float64)
+        corners = np.array([[[0, 0]], [[bbox[2], 0]], [[bbox[2], bbox[3]]], [[0, bbox[3]]]], dtype = np.float64)
+        outline = cv.perspectiveTransform(corners, homography).astype(np.int32)
+        cv.polylines(overlay, [outline], True, (0, 0, 0), 2, cv.LINE_AA)
+        if annotation.get("score", None) is not None:
+            top_left = outline.reshape(-1, 2).min(axis = 0)
+            cv.putText(overlay, "{:.3f}".format(annotation["score"]), (int(top_left[0]), max(12, int(top_left[1]) - 6)), cv.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv.LINE_AA)
+
+    hit_point = annotation.get("hit_point", None)
+    if hit_point is not None:
+        hit = cv.perspectiveTransform(np.array([[hit_point]], dtype = np.float64), homography).reshape(2)
+        hit = (int(round(hit[0])), int(round(hit[1])))
+        colour = (0, 140, 255) if annotation.get("needs_review", False) else (255, 80, 0)
+        cv.drawMarker(overlay, hit, colour, cv.MARKER_CROSS, 12, 2)
+        cv.putText(overlay, "{}".format(annotation.get("auto_points", "")), (hit[0] + 6, hit[1] - 6), cv.FONT_HERSHEY_SIMPLEX, 0.5, colour, 1, cv.LINE_AA)
+    return overlay
@@ -13,13 +13,20 @@ class AppConfig:
     CFG_HSG_LOGO_ICO_FILE = "./images/hsg_logo.ico"
     CFG_ARCHERY_TARGET_FILE = "./images/archery_target.png"
     CFG_NO_HIT_MISS_IMAGE_FILE = "./pattern_img/no_hit_image.png"
+    CFG_TARGET_TEMPLATE_FILE = "./pattern_img/default/template.png"
+    CFG_TARGET_MASK_FILE = "./pattern_img/default/mask.png"
+    CFG_MATCH_LOCATION_CACHE_FILE = "./results/match_location_cache.json"
+    CFG_TARGET_ZONE_MAP_FILE = "./results/target_zone_map_{face}.npy"
+    CFG_TARGET_FACE_LIBRARY_PATH = "./pattern_img"
     CFG_LAST_SESSION_LOG_FILE = "./logs/last_session.log"
     CFG_VIDEO_GAMES_PATH = "./videos"
     CFG_CAM_PICTURE_STORAGE_PATH = "./cam_shots"
     CFG_RESULTS_STORAGE_PATH = "./results"
+    CFG_THUMBNAIL_CACHE_PATH = "./results/thumbnails"
     
     ## TECHNICAL CONSTANTS
     CFG_CYCLE_TIMEOUT_MS = 50  
+    CFG_BANG_VIDEO_PAUSE_SECONDS = 1.0      # the video stays paused this long after each arrow
 
     # Defaults for gameplay
     CFG_MAX_PLAYERS       = 12
@@ -29,10 +36,79 @@ class AppConfig:
     CFG_POINTS_WHITE      = 1
     CFG_POINTS_MISS       = 0
 
+    ## DEFAULTS FOR AUDIO CAPTURE
+    CFG_AUDIO_CAPTURE_MODE = "callback"     # "callback" = own audio thread, "blocking" = read in GUI cycle
+    CFG_AUDIO_RING_BUFFER_SECONDS = 5
+    CFG_AUDIO_CLIP_ENABLED = True           # store a WAV clip of each impact next to its camera picture
+    CFG_AUDIO_CLIP_PRE_SECONDS = 0.3
+    CFG_AUDIO_CLIP_POST_SECONDS = 0.2
+    CFG_AUDIO_CLIP_MAX_WAIT_SECONDS = 1.0
+
+    ## DEFAULTS FOR THE ADAPTIVE NOISE FLOOR OF THE RMS DETECTION ENGINE (levels in dBFS)
+    CFG_NOISE_FLOOR_WINDOW_SECONDS = 3.0
+    CFG_NOISE_FLOOR_QUANTILE = 0.3
+    CFG_NOISE_FLOOR_INITIAL_DB = -45.0
+    CFG_NOISE_FLOOR_ON_MARGIN_DB = 9.0
+    CFG_NOISE_FLOOR_OFF_MARGIN_DB = 4.0
+    CFG_NOISE_FLOOR_MIN_ON_LEVEL_DB = -50.0
+    CFG_NOISE_FLOOR_MAX_BURST_SECONDS = 0.15
+    CFG_NOISE_FLOOR_REFRACTORY_SECONDS = 0.15
+
+    ## DEFAULTS FOR THE SPECTRAL FLUX DETECTION ENGINE
+    CFG_SPECTRAL_FLUX_FRAME_SIZE = 1024
+    CFG_SPECTRAL_FLUX_HOP_SIZE = 256
+    CFG_SPECTRAL_FLUX_BAND_HZ = (300, 8000)
+    CFG_SPECTRAL_FLUX_MEDIAN_SECONDS = 0.5
+    CFG_SPECTRAL_FLUX_THRESHOLD_FACTOR = 1.5
+    CFG_SPECTRAL_FLUX_THRESHOLD_DELTA = 0.3
+    CFG_SPECTRAL_FLUX_REFRACTORY_SECONDS = 0.15
+
     ## DEFAULTS FOR CAMERA
+    CFG_CAMERA_BACKEND = "pygame"           # "pygame" = webcam, "replay" = pictures or video, "synthetic" = generated target
+    CFG_CAMERA_REPLAY_PATH = "./cam_replay" # directory with pictures or a video file
+    CFG_CAMERA_REPLAY_FPS = 15
+    CFG_CAMERA_SYNTHETIC_FPS = 30
     CFG_DEFAULT_CAMERA_RESOLUTION = (1920, 1080)
-    CFG_DEFAULT_CAMERA_OUTPUT_FORMAT = "png"
+    CFG_DEFAULT_CAMERA_OUTPUT_FORMAT = "png"  # "png", "jpg", "webp" or "npy" (raw array, no encoding)
     CFG_DEFAULT_CAMERA_COLOR_SPACE = "RGB"
+    CFG_CAMERA_STORE_PICTURES = True        # keep every camera picture on disk, processing works from memory
+    CFG_CAMERA_FRAME_RING_MAX_MB = 256      # memory cap for the ring of recent camera frames
+    CFG_CAMERA_SHOT_DELAY_SECONDS = 0.05    # the shot is picked from frames taken in this window after the impact
+    CFG_CAMERA_SHOT_WINDOW_SECONDS = 0.4
+
+    ## DEFAULTS FOR WRITING IMAGES
+    CFG_IMAGE_WRITER_WORKERS = 2
+    CFG_IMAGE_WRITER_MAX_PENDING = 8        # submitting more images blocks until one is written
+    CFG_IMAGE_PNG_COMPRESSION = 1           # 0..9, higher is smaller but slower
+    CFG_IMAGE_JPEG_QUALITY = 92
+    CFG_IMAGE_WEBP_QUALITY = 90
+    CFG_THUMBNAIL_SCALE = 0.5               # size of the crops in the results window
+    CFG_THUMBNAIL_CACHE_MAX_BYTES = 32 * 1024 * 1024 # thumbnails kept in memory, least recently used are dropped
+    CFG_EXTRACTION_WORKERS = 2              # processes for the target extraction, 0 = on the GUI thread
+
+    ## DEFAULTS FOR FINDING THE TARGET FACE
+    CFG_TARGET_FACE = "auto"                # name of the target face in the library, "auto" = identified from the first shot of a session
+    CFG_TARGET_IDENTIFY_SCALE = 0.25        # the faces are compared on the picture scaled by this
+    CFG_MATCH_STRATEGY = "pyramid"          # "pyramid" = coarse to fine, "full" = full resolution search
+    CFG_MATCH_METHOD = "ccorr_normed"       # "ccorr_normed", "ccoeff_normed", "sqdiff_normed" or "sqdiff"
+    CFG_MATCH_GRAYSCALE = False             # match on one channel instead of BGR
+    CFG_MATCH_PYRAMID_LEVELS = 2            # the picture is searched at 1 / 2^levels first
+    CFG_MATCH_REFINE_MARGIN = 4             # pixels searched around the location of the coarser level
+    CFG_MATCH_ROI_MARGIN = 48               # pixels around the last location that are searched first
+    CFG_MATCH_ROI_MIN_SCORE = 0.9           # below this match score the whole picture is searched
+    CFG_RECTIFY_TARGET = True               # front facing crop through the calibrated homography, False = axis aligned crop
+    CFG_RECTIFY_CALIBRATION_FILE = "./results/target_calibration_{camera_id}_{face}.npz"
+    CFG_CAMERA_LENS_FILE = ""               # camera_matrix and dist_coeffs (.npz) from tools.calibrate_target --chessboard, "" = no undistortion
+    CFG_RECTIFY_MIN_FEATURE_MATCHES = 12    # fewer matched features: the homography starts from the template match
+    CFG_RECTIFY_MIN_SCORE = 0.8             # a rectified face less similar to the template means the camera or target moved
+    CFG_RECTIFY_MAX_SHIFT = 8               # pixels the matched face may be away from where it was calibrated before calibrating again
+
+    ## DEFAULTS FOR THE AUTOMATIC ARROW SCORING
+    CFG_SCORER_DIFF_THRESHOLD = 40          # change of the most changed colour channel that counts as changed pixel
+    CFG_SCORER_MIN_BLOB_AREA = 15           # smaller changed areas are noise, in crop pixels
+    CFG_SCORER_MAX_CHANGED_FRACTION = 0.25  # more changed means light or camera changed, not an arrow
+    CFG_SCORER_MIN_CONFIDENCE = 0.6         # less confident arrows are marked for manual review
+    CFG_SCORER_ARROW_DIRECTION = (0.5, 1.0) # direction from tip to nock in the picture, depends on the camera position
 
     # USER SETTING: THEME
     _CFG_DEFAULT_THEME = 'Topanga'
@@ -49,6 +125,11 @@ class AppConfig:
     _KEY_USER_MICRO_INDEX = "UserMicrophone"
     _user_setting_micro_index = _CFG_DEFAULT_MICRO_INDEX
 
+    # USER SETTING: AUDIO DETECTION ENGINE ("rms" or "spectral_flux")
+    _CFG_DEFAULT_DETECTION_ENGINE = "rms"
+    _KEY_USER_DETECTION_ENGINE = "UserDetectionEngine"
+    _user_setting_detection_engine = _CFG_DEFAULT_DETECTION_ENGINE
+
     ################################################################################################
     ## Load user settings from file
     @staticmethod
@@ -68,6 +149,9 @@ class AppConfig:
             # Microphone
             AppConfig._user_setting_micro_index = sg.user_settings_get_entry(AppConfig._KEY_USER_MICRO_INDEX, AppConfig._CFG_DEFAULT_MICRO_INDEX)
             print("{} - DEBUG: | - Loaded key [{}] with value [{}]...".format(datetime.now(), AppConfig._KEY_USER_MICRO_INDEX, AppConfig._user_setting_micro_index))
+            # Detection engine
+            AppConfig._user_setting_detection_engine = sg.user_settings_get_entry(AppConfig._KEY_USER_DETECTION_ENGINE, AppConfig._CFG_DEFAULT_DETECTION_ENGINE)
+            print("{} - DEBUG: | - Loaded key [{}] with value [{}]...".format(datetime.now(), AppConfig._KEY_USER_DETECTION_ENGINE, AppConfig._user_setting_detection_engine))
 
         return
 
@@ -112,3 +196,17 @@ class AppConfig:
     @staticmethod
     def get_user_setting_micro_index() -> str:
         return AppConfig._user_setting_micro_index
+
+    ################################################################################################
+    @staticmethod
+    def set_user_setting_detection_engine(new_engine_value: str):
+        sg.cprint("{} - DEBUG: Now storing user setting with key {} with value{}...".format(datetime.now(), AppConfig._KEY_USER_DETECTION_ENGINE, new_engine_value))
+        AppConfig._user_setting_detection_engine = new_engine_value
+        sg.user_settings_set_entry(AppConfig._KEY_USER_DETECTION_ENGINE, AppConfig._user_setting_detection_engine)
+        sg.user_settings_save()
+        return
+
+    ################################################################################################
+    @staticmethod
+    def get_user_setting_detection_engine() -> str:
+        return AppConfig._user_setting_detection_engine
@@ -0,0 +1,125 @@
+import numpy as np
+import cv2 as cv
+
+from game_modules.app_configuration import AppConfig
+from game_modules.zone_map import ZoneMap
+
+##############################################################################################################
+##############################################################################################################
+class ArrowScore(object):
+
+    ##############################################################################################################
+    def __init__(self, points: int, hit_point: tuple = None, confidence: float = 0.0, changed_pixels: int = 0):
+        self.points = points
+        ## (x, y) of the arrow tip in crop coordinates, None if no arrow was found
+        self.hit_point = hit_point
+        ## 0..1, below AppConfig.CFG_SCORER_MIN_CONFIDENCE the arrow should be checked manually
+        self.confidence = float(confidence)
+        self.changed_pixels = changed_pixels
+        self.needs_review = bool(self.confidence < AppConfig.CFG_SCORER_MIN_CONFIDENCE)
+
+    ##############################################################################################################
+    def to_str(self) -> str:
+        return "points {}, hit {}, confidence {:.2f}{}".format(self.points, self.hit_point, self.confidence, ", REVIEW" if self.needs_review else "")
+
+##############################################################################################################
+##############################################################################################################
+## Scores an arrow from two crops of the target face, before and after the shot. The crops are aligned by the
+## template matching, so the new arrow is what changed: threshold of the difference, morphology against noise
+## and small gaps, then the largest connected blob is the arrow. Its tip is the end of the blob against the
+## direction the shafts point to in the picture. The points are looked up in the zone map of the target face.
+class ArrowHitScorer(object):
+
+    ##############################################################################################################
+    def __init__(self, zone_map: ZoneMap):
+        self.zone_map = zone_map
+        self.center = (zone_map.get_size()[0] / 2.0, zone_map.get_size()[1] / 2.0)
+        direction = np.array(AppConfig.CFG_SCORER_ARROW_DIRECTION, dtype = np.float64)
+        self.arrow_direction = direction / np.linalg.norm(direction) if np.linalg.norm(direction) > 0 else None
+        self.open_kernel = np.ones((3, 3), np.uint8)
+        self.close_kernel = np.ones((5, 5), np.uint8)
+
+    ##############################################################################################################
+    ## Tip of an arrow blob given by its pixel coordinates
+    def find_tip(self, xs: np.ndarray, ys: np.ndarray) -> tuple:
+        points = np.stack([xs, ys], axis = 1).astype(np.float64)
+        if self.arrow_direction is not None:
+            # the tip is the end of the shaft against the direction the arrows point to
+            projection = points @ self.arrow_direction
+            tips = points[projection <= projection.min() + 1.0]
+            return tuple(tips.mean(axis = 0))
+
+        # unknown direction: the end of the main axis closer to the center
+        mean = points.mean(axis = 0)
+        _, _, axes = np.linalg.svd(points - mean, full_matrices = False)
+        projection = (points - mean) @ axes[0]
+        ends = [points[projection.argmin()], points[projection.argmax()]]
+        return tuple(min(ends, key = lambda p: np.hypot(p[0] - self.center[0], p[1] - self.center[1])))
+
+    ##############################################################################################################
+    ## Finds the new arrow, returns the tip (x, y) or None, the confidence of the detection and the changed pixels
+    def find_hit(self, previous_crop: np.ndarray, crop: np.ndarray) -> tuple:
+        if previous_crop is None or previous_crop.shape != crop.shape:
+            return None, 0.0, 0
+
+        # the largest change of the three colours, a dark shaft on red hardly changes the grey level
+        diff = cv.absdiff(cv.GaussianBlur(previous_crop, (5, 5), 0), cv.GaussianBlur(crop, (5, 5), 0))
+        diff = diff.max(axis = 2) if diff.ndim == 3 else diff
+        _, changed = cv.threshold(diff, AppConfig.CFG_SCORER_DIFF_THRESHOLD, 255, cv.THRESH_BINARY)
+        changed = cv.morphologyEx(changed, cv.MORPH_OPEN, self.open_kernel)
+        changed = cv.morphologyEx(changed, cv.MORPH_CLOSE, self.close_kernel)
+        changed_pixels = int(cv.countNonZero(changed))
+
+        # too much changed: light, camera or crop moved, this is no arrow
+        if changed_pixels > AppConfig.CFG_SCORER_MAX_CHANGED_FRACTION * changed.size:
+            return None, 0.0, changed_pixels
+
+        count, labels, stats, _centroids = cv.connectedComponentsWithStats(changed, connectivity = 8)
+        areas = stats[1:, cv.CC_STAT_AREA]
+        blobs = np.flatnonzero(areas >= AppConfig.CFG_SCORER_MIN_BLOB_AREA) + 1
+        if blobs.size == 0:
+            # nothing new on the target: a miss, or an arrow that can not be seen
+            return None, 0.5, changed_pixels
+
+        arrow = blobs[np.argmax(stats[blobs, cv.CC_STAT_AREA])]
+        ys, xs = np.nonzero(labels == arrow)
+        hit_point = self.find_tip(xs, ys)
+
+        # more than one blob: something else changed too
+        blob_confidence = stats[arrow, cv.CC_STAT_AREA] / float(stats[blobs, cv.CC_STAT_AREA].sum())
+        return (int(round(hit_point[0])), int(round(hit_point[1]))), blob_confidence, changed_pixels
+
+    ##############################################################################################################
+    def score(self, previous_crop: np.ndarray, crop: np.ndarray) -> ArrowScore:
+        return self.score_series([previous_crop, crop])[0]
+
+    ##############################################################################################################
+    ## Scores the arrows of one game, crops[0] is the target before the first arrow, then one crop per arrow. Each
+    ## arrow is found against the last crop before it, then all hits are scored with one zone map lookup.
+    ## Returns one ArrowScore per arrow, None where the crop is None.
+    def score_series(self, crops: list) -> list:
+        detections = []
+        previous_crop = crops[0]
+        for crop in crops[1:]:
+            if crop is None:
+                detections.append(None)
+                continue
+            detections.append(self.find_hit(previous_crop, crop))
+            previous_crop = crop
+
+        hit_points = [d[0] for d in detections if d is not None and d[0] is not None]
+        points = self.zone_map.score_hits(hit_points)
+        scores = []
+        hit_index = 0
+        for detection in detections:
+            if detection is None:
+                scores.append(None)
+                continue
+            hit_point, confidence, changed_pixels = detection
+            if hit_point is None:
+                scores.append(ArrowScore(AppConfig.CFG_POINTS_MISS, None, confidence, changed_pixels))
+                continue
+            confidence *= self.zone_map.confidence_at(hit_point)
+            scores.append(ArrowScore(int(points[hit_index]), hit_point, confidence, changed_pixels))
+            hit_index += 1
+        return scores
@@ -1,36 +1,88 @@
 import PySimpleGUI as sg
 import pyaudio
-import struct
-import math
+import time
+import threading
+from collections import deque
 from datetime import datetime
 
 from game_modules.app_configuration import AppConfig
+from game_modules.audio_features import AudioFeatureExtractor
+from game_modules.audio_ring_buffer import AudioRingBuffer
+from game_modules.audio_clip_archive import AudioClipArchive
+from game_modules.audio_sources import PyAudioSource
+from game_modules.onset_detectors import create_onset_detector, DETECTION_ENGINES
+
+##############################################################################################################
+##############################################################################################################
+## A detected impact, handed over from the audio thread to the game engine
+class ImpactEvent(object):
+
+    ##############################################################################################################
+    def __init__(self, frame_index: int, monotonic_time: float, amplitude: float, onset_frame: int, onset_time: float):
+        ## absolute index of the first frame of the block the impact was detected in
+        self.frame_index = frame_index
+        ## time.monotonic() when the block was received
+        self.monotonic_time = monotonic_time
+        self.amplitude = amplitude
+        ## absolute index of the first sample of the impact sound since stream start
+        self.onset_frame = onset_frame
+        ## time.monotonic() at which that sample hit the microphone
+        self.onset_time = onset_time
+
+    ##############################################################################################################
+    def age_ms(self) -> float:
+        return (time.monotonic() - self.monotonic_time) * 1000.0
+
+    ##############################################################################################################
+    ## Time between the impact sound and its detection
+    def detection_latency_ms(self) -> float:
+        return (self.monotonic_time - self.onset_time) * 1000.0
 
 ##############################################################################################################
 ##############################################################################################################
 class BangDetector(object):
     
     ## CONSTANTS AND DEFAULTS
-    INITIAL_TAP_THRESHOLD = 0.025
-    FORMAT = pyaudio.paInt16 
+    CAPTURE_MODE_CALLBACK = "callback"
+    CAPTURE_MODE_BLOCKING = "blocking"
+    MAX_PENDING_IMPACTS = 64
     SHORT_NORMALIZE = (1.0/32768.0)
     INPUT_BLOCK_TIME = 0.035
-    OVERSENSITIVE = 15.0/INPUT_BLOCK_TIME                    
-    UNDERSENSITIVE = 120.0/INPUT_BLOCK_TIME 
-    MAX_TAP_BLOCKS = 0.15/INPUT_BLOCK_TIME
 
     ##############################################################################################################
-    def __init__(self):        
+    ## audio_source: any of the classes in audio_sources.py, by default the live PyAudio input
+    ## detection_engine: name of the detection engine, by default the user setting
+    def __init__(self, audio_source = None, detection_engine: str = None):        
         sg.cprint("{} - TRACE: Initializing class {}.".format(datetime.now(), self.__class__))
 
         self.current_audio_device_index = AppConfig.get_user_setting_micro_index()
-        self.pa = pyaudio.PyAudio()
-        self.tap_threshold = self.INITIAL_TAP_THRESHOLD
-        self.noisycount = self.MAX_TAP_BLOCKS + 1 
-        self.quietcount = 0 
+        self.source = audio_source
+        if self.source is None:
+            self.source = PyAudioSource()
+        else:
+            self.current_audio_device_index = 0
+        self.detection_engine = detection_engine
+        if self.detection_engine is None:
+            self.detection_engine = AppConfig.get_user_setting_detection_engine()
+        self.detector = None
         self.errorcount = 0
+        self.overflowcount = 0
+        self.reported_overflowcount = 0
+        self.capture_mode = AppConfig.CFG_AUDIO_CAPTURE_MODE
         self.input_frames_per_block = 0
-        self.stream = None
+        self.input_channels = 1
+        self.input_sample_rate = 0
+        self.features = AudioFeatureExtractor()
+        ## own work buffer for get_rms() on the GUI thread, the one of self.features is filled by the audio thread
+        self.rms_features = AudioFeatureExtractor()
+        self.last_features = None
+        self.ring_buffer = None
+        ## held while the stream and its buffers are rebuilt, the audio thread drops blocks instead of waiting for it
+        self.stream_lock = threading.Lock()
+        self.pending_impacts = deque(maxlen = self.MAX_PENDING_IMPACTS)
+        self.clip_archive = None
+        if AppConfig.CFG_AUDIO_CLIP_ENABLED is True:
+            self.clip_archive = AudioClipArchive(AppConfig.CFG_AUDIO_CLIP_PRE_SECONDS, AppConfig.CFG_AUDIO_CLIP_POST_SECONDS, AppConfig.CFG_AUDIO_CLIP_MAX_WAIT_SECONDS)
 
         self.config_window = None
         self.config_layout = None   
@@ -41,39 +93,24 @@ class BangDetector(object):
     def get_rms(self, block ):
         #sg.cprint("{} - TRACE: {}.get_rms()".format(datetime.now(), self.__class__)) ## no tracing here, too noisy
 
-        count = len(block)/2
-        format = "%dh"%(count)
-        shorts = struct.unpack( format, block )
-        sum_squares = 0.0
-        for sample in shorts:
-            n = sample * self.SHORT_NORMALIZE
-            sum_squares += n*n
+        return self.rms_features.total_rms(block)
 
-        return math.sqrt( sum_squares / count )
     ##############################################################################################################
     def stop(self):        
         sg.cprint("{} - TRACE: {}.stop()".format(datetime.now(), self.__class__))
 
-        if self.stream is not None:
-            if self.stream.is_active():
-                self.stream.close()
-
-        self.pa.terminate()
+        # pending clips still need the running stream
+        if self.clip_archive is not None:
+            self.clip_archive.stop()
+        self.source.terminate()
 
     ##############################################################################################################
     def get_input_device_list(self):
         sg.cprint("{} - TRACE: {}.get_input_device_list()".format(datetime.now(), self.__class__))
 
-        list_r_devices = []
-
-        for i in range( self.pa.get_device_count() ):     
-            devinfo = self.pa.get_device_info_by_index(i)   
-            
-            in_channels = devinfo["maxInputChannels"]
-            in_host_api = devinfo["hostApi"]
-            if (in_channels > 0 and in_host_api == 0):
-                    sg.cprint("{} - Found a sound input device at index {}: {}".format(datetime.now(), i, devinfo))
-                    list_r_devices.append(devinfo)
+        list_r_devices = self.source.get_input_device_list()
+        for devinfo in list_r_devices:
+            sg.cprint("{} - Found a sound input device at index {}: {}".format(datetime.now(), devinfo["index"], devinfo))
 
         return list_r_devices
 
@@ -81,59 +118,164 @@ class BangDetector(object):
     def update_device_index(self):
         sg.cprint("{} - TRACE: {}.update_device_index()".format(datetime.now(), self.__class__))        
 
-        if (self.stream is not None) and (self.stream.is_active() is True):
-            self.stream.close()
+        # the old stream is stopped before the buffers it writes to are replaced
+        with self.stream_lock:
+            self.source.close()
+
+            # only live sources can deliver blocks on their own thread
+            stream_callback = None
+            if self.capture_mode == self.CAPTURE_MODE_CALLBACK and self.source.SUPPORTS_CALLBACK is True:
+                stream_callback = self.on_audio_block
+            else:
+                self.capture_mode = self.CAPTURE_MODE_BLOCKING
 
-        # get full device configuration
-        device_info = self.get_input_device_list()
+            # open the source without starting it, the buffers must be ready before the first callback
+            self.source.open(self.current_audio_device_index, self.INPUT_BLOCK_TIME, stream_callback)
 
-        self.input_frames_per_block = int(device_info[self.current_audio_device_index]["defaultSampleRate"] * self.INPUT_BLOCK_TIME)
+            self.input_sample_rate = self.source.sample_rate
+            self.input_frames_per_block = self.source.frames_per_block
+            self.input_channels = self.source.channels
+            self.features.configure(self.input_channels, self.input_frames_per_block)
+            self.rms_features.configure(self.input_channels, self.input_frames_per_block)
+            self.ring_buffer = AudioRingBuffer(self.input_sample_rate * AppConfig.CFG_AUDIO_RING_BUFFER_SECONDS, self.input_channels)
+            self.detector = create_onset_detector(self.detection_engine, self.input_sample_rate, self.input_frames_per_block, self.input_channels)
+            self.pending_impacts.clear()
 
-        self.stream = self.pa.open(format = self.FORMAT,
-            channels = int(device_info[self.current_audio_device_index]["maxInputChannels"]),
-            rate = int(device_info[self.current_audio_device_index]["defaultSampleRate"]),
-            input = True,
-            input_device_index = self.current_audio_device_index,
-            frames_per_buffer = self.input_frames_per_block)
+        sg.cprint("{} - Opening audio stream in {} mode with {} detection: {} channel(s) @ {} Hz, {} frames per block.".format(datetime.now(), 
+            self.capture_mode, self.detector.NAME, self.input_channels, self.input_sample_rate, self.input_frames_per_block))
+
+        self.source.start()
 
     ##############################################################################################################
-    ## Returns true if a clap/bang was detected
-    def listen(self) -> bool:
-        #sg.cprint("{} - TRACE: {}.listen()".format(datetime.now(), self.__class__)) ## no tracing here, too noisy
-        
-        clap_detected = False
+    ## PyAudio stream callback, runs on the PortAudio thread. Must never block and never touch the GUI, overflows
+    ## are only counted here and reported by poll_impacts().
+    def on_audio_block(self, in_data, frame_count, time_info, status_flags):
+
+        if status_flags & pyaudio.paInputOverflow:
+            self.overflowcount += 1
+
+        # PortAudio reports the capture time of the first sample in stream time, convert it to time.monotonic()
+        received_time = time.monotonic()
+        block_start_time = None
+        if time_info is not None and time_info.get("input_buffer_adc_time", 0) > 0:
+            block_start_time = received_time - (time_info["current_time"] - time_info["input_buffer_adc_time"])
+
+        # the stream is being rebuilt, the block is dropped
+        if self.stream_lock.acquire(blocking = False) is False:
+            return (None, pyaudio.paContinue)
+        try:
+            self.process_block(in_data, received_time, block_start_time)
+        finally:
+            self.stream_lock.release()
+        return (None, pyaudio.paContinue)
+
+    ##############################################################################################################
+    ## Stores a block in the ring buffer and runs the detection on it. Detected impacts are queued.
+    def process_block(self, block, received_time: float, block_start_time: float = None) -> bool:
+
+        frame_index = self.ring_buffer.frames_written
+        samples = self.features.samples(block)
+        self.ring_buffer.write(samples)
+
+        clap_detected = self.detect_block(block)
+        if clap_detected is True:
+            if block_start_time is None:
+                block_start_time = received_time - samples.shape[0] / float(self.input_sample_rate)
+
+            # the engines locate the onset relative to the start of the detecting block
+            onset_offset = self.detector.last_onset_offset
+            if onset_offset is None:
+                onset_offset = 0
+            onset_frame = max(0, frame_index + onset_offset)
+            onset_time = block_start_time + (onset_frame - frame_index) / float(self.input_sample_rate)
+
+            self.pending_impacts.append(ImpactEvent(frame_index, received_time, self.last_features.max_rms(), onset_frame, onset_time))
+
+        return clap_detected
+
+    ##############################################################################################################
+    ## Returns all impacts detected since the last call, never blocks in callback mode
+    def poll_impacts(self) -> list:
+        #sg.cprint("{} - TRACE: {}.poll_impacts()".format(datetime.now(), self.__class__)) ## no tracing here, too noisy
 
-        if (self.stream is not None) and (self.stream.is_active() is True):
+        if self.capture_mode == self.CAPTURE_MODE_BLOCKING:
+            self.read_blocking()
+
+        overflowcount = self.overflowcount
+        if overflowcount != self.reported_overflowcount:
+            sg.cprint("{} - AUDIO OVERFLOW - ({}) input overflow(s) reported by the audio driver, {} since the last report.".format(datetime.now(),
+                overflowcount, overflowcount - self.reported_overflowcount))
+            self.reported_overflowcount = overflowcount
+
+        impacts = []
+        while len(self.pending_impacts) > 0:
+            impacts.append(self.pending_impacts.popleft())
+
+        return impacts
+
+    ##############################################################################################################
+    ## Drops all impacts that were detected but not yet polled, e.g. before a new game starts
+    def clear_impacts(self):
+        sg.cprint("{} - TRACE: {}.clear_impacts()".format(datetime.now(), self.__class__))
+
+        self.pending_impacts.clear()
+        return
+
+    ##############################################################################################################
+    ## Legacy mode, reads one block synchronously
+    def read_blocking(self):
+
+        if self.source.is_active() is True:
             try:
-                block = self.stream.read(self.input_frames_per_block)
+                block = self.source.read(self.input_frames_per_block)
             except IOError as e:
                 self.errorcount += 1
                 print( "AUDIO ERRORO - (%d) Error recording: %s"%(self.errorcount,e) )
-                self.noisycount = 1
-                return False
-
-            amplitude = self.get_rms(block)
-            #print("amplitude = {}".format(amplitude))
-            if amplitude > self.tap_threshold:
-                self.quietcount = 0
-                self.noisycount += 1
-                if self.noisycount > self.OVERSENSITIVE:
-                    self.tap_threshold *= 1.1
-            else:            
-                if 1 <= self.noisycount <= self.MAX_TAP_BLOCKS:
-                    clap_detected = True
-                    
-                self.noisycount = 0
-                self.quietcount += 1
-                if self.quietcount > self.UNDERSENSITIVE:
-                    self.tap_threshold *= 2
-        
-        return clap_detected
+                self.detector.on_input_error()
+                return
+
+            self.process_block(block, time.monotonic())
+
+        return
+
+    ##############################################################################################################
+    ## Returns true if a clap/bang was detected
+    def listen(self) -> bool:
+        #sg.cprint("{} - TRACE: {}.listen()".format(datetime.now(), self.__class__)) ## no tracing here, too noisy
+
+        return len(self.poll_impacts()) > 0
+
+    ##############################################################################################################
+    ## Runs the selected detection engine on a single block
+    def detect_block(self, block) -> bool:
+
+        self.last_features = self.features.extract(block)
+        return self.detector.process(self.features.current_block(), self.last_features)
+
+    ##############################################################################################################
+    ## Saves the audio around an impact as WAV file in the background. Without an impact (manual bang) the clip
+    ## is taken around the newest captured sample. Returns false if clips are disabled or the queue is full.
+    def archive_clip(self, impact: ImpactEvent, target_file: str) -> bool:
+        sg.cprint("{} - TRACE: {}.archive_clip(target_file = {})".format(datetime.now(), self.__class__, target_file))
+
+        if self.clip_archive is None or self.ring_buffer is None:
+            return False
+
+        onset_frame = self.ring_buffer.frames_written if impact is None else impact.onset_frame
+        return self.clip_archive.request_clip(self.ring_buffer, self.input_sample_rate, onset_frame, target_file)
+
+    ##############################################################################################################
+    ## Current state of the detection engine (noise floor, thresholds, counters) for diagnostics
+    def get_detector_state(self) -> dict:
+        if self.detector is None:
+            return {}
+        return self.detector.get_state()
 
     ##############################################################################################################
     ## Opens a user dialog to select the correct microphone
     def configure(self) -> sg.Window:
         sg.cprint("{} - TRACE: {}.configure()".format(datetime.now(), self.__class__))
+        sg.cprint("{} - DEBUG: Detection engine [{}] state: {}".format(datetime.now(), self.detection_engine, self.get_detector_state()))
         
         # get device full information list
         device_list = self.get_input_device_list()
@@ -144,6 +286,7 @@ class BangDetector(object):
         self.config_layout = [
             [sg.Text('Verfügbare Audiogeräte:')],
             [sg.Combo(values = name_list, default_value = name_list[self.current_audio_device_index], key = "-AUDIO_INPUT_DEVICE_INDEX-", expand_x = True)],
+            [sg.Text('Erkennung:'), sg.Combo(values = list(DETECTION_ENGINES.keys()), default_value = self.detection_engine, key = "-AUDIO_DETECTION_ENGINE-", readonly = True, expand_x = True)],
             [sg.VPush()],
             [sg.Button("Mikrofon OK", size = (30, 1), pad = (1, 1), expand_x = True)],
         ]
@@ -153,7 +296,7 @@ class BangDetector(object):
             element_justification = 'left', 
             finalize = True, 
             resizable = False,
-            size = (400, 150),
+            size = (400, 180),
             modal = True,
             disable_close = True,
             disable_minimize = True
@@ -168,10 +311,12 @@ class BangDetector(object):
 
         device_entry = self.config_window["-AUDIO_INPUT_DEVICE_INDEX-"].get()
         self.current_audio_device_index = int(device_entry[0:1])
+        self.detection_engine = self.config_window["-AUDIO_DETECTION_ENGINE-"].get()
         self.update_device_index()
 
         # Store user setting to disk
         AppConfig.set_user_setting_micro_index(self.current_audio_device_index)
+        AppConfig.set_user_setting_detection_engine(self.detection_engine)
 
         self.config_window.close()
         self.config_window = None
@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+import wave
+from datetime import datetime
+
+from game_modules.audio_ring_buffer import AudioRingBuffer
+from game_modules.thread_log import THREAD_LOG
+
+##############################################################################################################
+##############################################################################################################
+class ClipRequest(object):
+
+    ##############################################################################################################
+    def __init__(self, ring_buffer: AudioRingBuffer, sample_rate: int, start_frame: int, frame_count: int, target_file: str):
+        self.ring_buffer = ring_buffer
+        self.sample_rate = sample_rate
+        self.start_frame = start_frame
+        self.frame_count = frame_count
+        self.target_file = target_file
+
+##############################################################################################################
+##############################################################################################################
+## Writes short WAV clips around detected impacts on a background thread, so the detection is never delayed.
+## The clip audio comes from the capture ring buffer; the writer waits until the post trigger part was
+## captured (or the wait timed out) and then copies it out.
+class AudioClipArchive(object):
+
+    MAX_PENDING_CLIPS = 16
+    POLL_INTERVAL = 0.02
+
+    ##############################################################################################################
+    def __init__(self, pre_seconds: float, post_seconds: float, max_wait_seconds: float):
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.requests = queue.Queue(maxsize = self.MAX_PENDING_CLIPS)
+        self.clips_written = 0
+        self.clips_dropped = 0
+
+        self.writer_thread = threading.Thread(target = self.run_writer, name = "AudioClipWriter", daemon = True)
+        self.writer_thread.start()
+
+    ##############################################################################################################
+    ## Queues a clip around onset_frame, never blocks. Returns false if the queue is full.
+    def request_clip(self, ring_buffer: AudioRingBuffer, sample_rate: int, onset_frame: int, target_file: str) -> bool:
+        pre_frames = int(self.pre_seconds * sample_rate)
+        post_frames = int(self.post_seconds * sample_rate)
+        request = ClipRequest(ring_buffer, sample_rate, max(0, onset_frame - pre_frames), pre_frames + post_frames, target_file)
+        try:
+            self.requests.put_nowait(request)
+        except queue.Full:
+            self.clips_dropped += 1
+            THREAD_LOG.add("{} - WARNING: Audio clip queue is full, dropping clip {}.".format(datetime.now(), target_file))
+            return False
+        return True
+
+    ##############################################################################################################
+    def run_writer(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                self.requests.task_done()
+                break
+
+            try:
+                self.write_clip(request)
+            except Exception as e:
+                THREAD_LOG.add("{} - ERROR: Could not write audio clip {}. E = {}".format(datetime.now(), request.target_file, e))
+            self.requests.task_done()
+        return
+
+    ##############################################################################################################
+    def write_clip(self, request: ClipRequest):
+        end_frame = request.start_frame + request.frame_count
+        deadline = time.monotonic() + self.max_wait_seconds
+        while request.ring_buffer.frames_written < end_frame and time.monotonic() < deadline:
+            time.sleep(self.POLL_INTERVAL)
+
+        samples = request.ring_buffer.read(request.start_frame, request.frame_count)
+
+        wav = wave.open(request.target_file, "wb")
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(request.sample_rate)
+        wav.writeframes(samples.tobytes())
+        wav.close()
+
+        self.clips_written += 1
+        THREAD_LOG.add("{} - Audio clip saved: {}".format(datetime.now(), request.target_file))
+        return
+
+    ##############################################################################################################
+    ## Waits until all queued clips are written
+    def flush(self):
+        self.requests.join()
+        return
+
+    ##############################################################################################################
+    def stop(self):
+        self.requests.put(None)
+        self.writer_thread.join(timeout = self.max_wait_seconds + 1.0)
+        return
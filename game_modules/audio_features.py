@@ -0,0 +1,106 @@
+import numpy as np
+
+##############################################################################################################
+##############################################################################################################
+class BlockFeatures(object):
+
+    ##############################################################################################################
+    def __init__(self, rms: np.ndarray, peak: np.ndarray, crest: np.ndarray, rise: np.ndarray):
+        ## All values are per channel, normalized to full scale (1.0)
+        self.rms = rms
+        self.peak = peak
+        self.crest = crest
+        ## Ratio of the current block RMS to the previous block RMS, a cheap onset strength
+        self.rise = rise
+
+    ##############################################################################################################
+    def max_rms(self) -> float:
+        return float(self.rms.max())
+
+    ##############################################################################################################
+    def loudest_channel(self) -> int:
+        return int(self.rms.argmax())
+
+    ##############################################################################################################
+    def to_str(self) -> str:
+        return "rms = {}, peak = {}, crest = {}, rise = {}".format(
+            np.round(self.rms, 4), np.round(self.peak, 4), np.round(self.crest, 2), np.round(self.rise, 2))
+
+##############################################################################################################
+##############################################################################################################
+## Computes per-channel RMS, peak and crest factor for raw 16 bit audio blocks as delivered by PyAudio.
+## The input buffer is never copied, a zero-copy view is used and all work arrays are preallocated and
+## reused as long as the block layout does not change. Shared by all bang detection engines.
+class AudioFeatureExtractor(object):
+
+    SHORT_NORMALIZE = (1.0/32768.0)
+    EPSILON = 1e-9
+
+    ##############################################################################################################
+    def __init__(self, channels: int = 1, frames_per_block: int = 0):
+        self.channels = max(1, int(channels))
+        self.frames_per_block = 0
+        self._work = None
+        self._sum_squares = np.zeros(self.channels, dtype = np.float32)
+        self._prev_rms = np.zeros(self.channels, dtype = np.float64)
+        self._allocate(frames_per_block)
+
+    ##############################################################################################################
+    def _allocate(self, frames_per_block: int):
+        self.frames_per_block = int(frames_per_block)
+        # channel major, so that all per channel reductions run over contiguous memory
+        self._work = np.empty((self.channels, self.frames_per_block), dtype = np.float32)
+
+    ##############################################################################################################
+    ## Resets the block layout, e.g. after the input device was changed
+    def configure(self, channels: int, frames_per_block: int):
+        self.channels = max(1, int(channels))
+        self._sum_squares = np.zeros(self.channels, dtype = np.float32)
+        self._prev_rms = np.zeros(self.channels, dtype = np.float64)
+        self._allocate(frames_per_block)
+
+    ##############################################################################################################
+    ## Returns a zero-copy view on the raw bytes with shape (frames, channels)
+    def samples(self, block) -> np.ndarray:
+        return np.frombuffer(block, dtype = np.int16).reshape(-1, self.channels)
+
+    ##############################################################################################################
+    ## Returns the normalized float samples of a block with shape (channels, frames). The returned array is
+    ## the internal work buffer, it is overwritten by the next call.
+    def normalized(self, block) -> np.ndarray:
+        shorts = block if isinstance(block, np.ndarray) else self.samples(block)
+        if shorts.shape[0] != self.frames_per_block:
+            self._allocate(shorts.shape[0])
+        np.multiply(shorts.T, self.SHORT_NORMALIZE, out = self._work)
+        return self._work
+
+    ##############################################################################################################
+    ## The normalized samples of the last block passed to normalized() or extract(), shape (channels, frames)
+    def current_block(self) -> np.ndarray:
+        return self._work
+
+    ##############################################################################################################
+    def extract(self, block) -> BlockFeatures:
+        work = self.normalized(block)
+        frames = max(1, work.shape[1])
+
+        # sum of squares per channel without a temporary array
+        np.einsum("ij,ij->i", work, work, out = self._sum_squares)
+        rms = np.sqrt(self._sum_squares / frames, dtype = np.float64)
+        if work.shape[1] > 0:
+            peak = np.maximum(work.max(axis = 1), -work.min(axis = 1)).astype(np.float64)
+        else:
+            peak = np.zeros(self.channels, dtype = np.float64)
+        crest = peak / (rms + self.EPSILON)
+        rise = rms / (self._prev_rms + self.EPSILON)
+        self._prev_rms[:] = rms
+
+        return BlockFeatures(rms, peak, crest, rise)
+
+    ##############################################################################################################
+    ## RMS over all samples of all channels, identical to the legacy BangDetector.get_rms() result
+    def total_rms(self, block) -> float:
+        work = self.normalized(block)
+        if work.size == 0:
+            return 0.0
+        return float(np.sqrt(np.einsum("ij,ij->", work, work, dtype = np.float64) / work.size))
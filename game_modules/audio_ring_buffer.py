@@ -0,0 +1,75 @@
+import numpy as np
+
+##############################################################################################################
+##############################################################################################################
+## Preallocated ring buffer for 16 bit audio samples with shape (frames, channels).
+## There is exactly one writer (the PyAudio callback thread) and any number of readers. The writer copies the
+## block first and publishes it afterwards by advancing frames_written, a single attribute store which is atomic
+## in CPython - so no lock is needed. Readers address samples by their absolute frame index since stream start.
+class AudioRingBuffer(object):
+
+    ##############################################################################################################
+    def __init__(self, capacity_frames: int, channels: int = 1):
+        self.capacity_frames = max(1, int(capacity_frames))
+        self.channels = max(1, int(channels))
+        self.buffer = np.zeros((self.capacity_frames, self.channels), dtype = np.int16)
+        self.frames_written = 0
+
+    ##############################################################################################################
+    ## Only to be called by the single writer
+    def write(self, samples: np.ndarray):
+        total = samples.shape[0]
+        count = total
+        if count >= self.capacity_frames:
+            # only the newest part fits
+            samples = samples[count - self.capacity_frames:]
+            start = (self.frames_written + count - self.capacity_frames) % self.capacity_frames
+            count = self.capacity_frames
+        else:
+            start = self.frames_written % self.capacity_frames
+
+        first = min(count, self.capacity_frames - start)
+        self.buffer[start:start + first] = samples[:first]
+        if first < count:
+            self.buffer[:count - first] = samples[first:]
+
+        # publish
+        self.frames_written += total
+        return
+
+    ##############################################################################################################
+    ## Absolute index of the oldest frame that is still available
+    def oldest_frame(self) -> int:
+        return max(0, self.frames_written - self.capacity_frames)
+
+    ##############################################################################################################
+    ## Copies the frames [start_frame, start_frame + count) into a new array or into out. Frames that were already
+    ## overwritten or not yet written are returned as silence.
+    def read(self, start_frame: int, count: int, out: np.ndarray = None) -> np.ndarray:
+        if out is None:
+            out = np.zeros((count, self.channels), dtype = np.int16)
+        else:
+            out[:] = 0
+
+        written = self.frames_written
+        first_valid = max(start_frame, written - self.capacity_frames, 0)
+        last_valid = min(start_frame + count, written)
+        if last_valid <= first_valid:
+            return out
+
+        out_pos = first_valid - start_frame
+        remaining = last_valid - first_valid
+        ring_pos = first_valid % self.capacity_frames
+        while remaining > 0:
+            chunk = min(remaining, self.capacity_frames - ring_pos)
+            out[out_pos:out_pos + chunk] = self.buffer[ring_pos:ring_pos + chunk]
+            out_pos += chunk
+            remaining -= chunk
+            ring_pos = 0
+
+        return out
+
+    ##############################################################################################################
+    ## Copies the newest count frames
+    def read_latest(self, count: int, out: np.ndarray = None) -> np.ndarray:
+        return self.read(self.frames_written - count, count, out)
@@ -0,0 +1,213 @@
+import pyaudio
+import wave
+import numpy as np
+
+##############################################################################################################
+##############################################################################################################
+## Live audio from a PyAudio input device. The only source that supports the callback capture mode.
+class PyAudioSource(object):
+
+    FORMAT = pyaudio.paInt16
+    SUPPORTS_CALLBACK = True
+
+    ##############################################################################################################
+    def __init__(self):
+        self.pa = pyaudio.PyAudio()
+        self.stream = None
+        self.sample_rate = 0
+        self.channels = 1
+        self.frames_per_block = 0
+
+    ##############################################################################################################
+    def get_input_device_list(self):
+        list_r_devices = []
+
+        for i in range( self.pa.get_device_count() ):
+            devinfo = self.pa.get_device_info_by_index(i)
+
+            in_channels = devinfo["maxInputChannels"]
+            in_host_api = devinfo["hostApi"]
+            if (in_channels > 0 and in_host_api == 0):
+                    list_r_devices.append(devinfo)
+
+        return list_r_devices
+
+    ##############################################################################################################
+    ## Opens the stream without starting it, so the consumer can set up its buffers first
+    def open(self, device_index: int, block_time: float, stream_callback = None):
+        device_info = self.get_input_device_list()[device_index]
+
+        self.sample_rate = int(device_info["defaultSampleRate"])
+        self.channels = int(device_info["maxInputChannels"])
+        self.frames_per_block = int(self.sample_rate * block_time)
+
+        self.stream = self.pa.open(format = self.FORMAT,
+            channels = self.channels,
+            rate = self.sample_rate,
+            input = True,
+            input_device_index = device_index,
+            frames_per_buffer = self.frames_per_block,
+            stream_callback = stream_callback,
+            start = False)
+        return
+
+    ##############################################################################################################
+    def start(self):
+        if self.stream is not None:
+            self.stream.start_stream()
+        return
+
+    ##############################################################################################################
+    def is_active(self) -> bool:
+        return (self.stream is not None) and (self.stream.is_active() is True)
+
+    ##############################################################################################################
+    def read(self, frames: int):
+        return self.stream.read(frames)
+
+    ##############################################################################################################
+    def close(self):
+        if self.stream is not None:
+            if self.stream.is_active():
+                self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        return
+
+    ##############################################################################################################
+    def terminate(self):
+        self.close()
+        self.pa.terminate()
+        return
+
+##############################################################################################################
+##############################################################################################################
+## Replays a 16 bit PCM WAV file block by block, as fast as it is read
+class WavFileSource(object):
+
+    SUPPORTS_CALLBACK = False
+
+    ##############################################################################################################
+    def __init__(self, wav_file: str):
+        self.wav_file = wav_file
+        self.wav = None
+        self.sample_rate = 0
+        self.channels = 1
+        self.frames_per_block = 0
+        self.frames_left = 0
+
+    ##############################################################################################################
+    def get_input_device_list(self):
+        return [{"index": 0, "name": self.wav_file, "maxInputChannels": self.channels, "defaultSampleRate": self.sample_rate}]
+
+    ##############################################################################################################
+    def open(self, device_index: int, block_time: float, stream_callback = None):
+        self.wav = wave.open(self.wav_file, "rb")
+        if self.wav.getsampwidth() != 2:
+            raise ValueError("Only 16 bit PCM WAV files are supported, {} has {} bytes per sample.".format(self.wav_file, self.wav.getsampwidth()))
+
+        self.sample_rate = self.wav.getframerate()
+        self.channels = self.wav.getnchannels()
+        self.frames_per_block = int(self.sample_rate * block_time)
+        self.frames_left = self.wav.getnframes()
+        return
+
+    ##############################################################################################################
+    def start(self):
+        return
+
+    ##############################################################################################################
+    ## Active as long as at least one complete block is left
+    def is_active(self) -> bool:
+        return (self.wav is not None) and (self.frames_left >= self.frames_per_block)
+
+    ##############################################################################################################
+    def read(self, frames: int):
+        self.frames_left -= frames
+        return self.wav.readframes(frames)
+
+    ##############################################################################################################
+    def close(self):
+        if self.wav is not None:
+            self.wav.close()
+            self.wav = None
+        return
+
+    ##############################################################################################################
+    def terminate(self):
+        self.close()
+        return
+
+##############################################################################################################
+##############################################################################################################
+## Generates background noise with short decaying noise bursts at known times
+class SyntheticSource(object):
+
+    SUPPORTS_CALLBACK = False
+
+    ##############################################################################################################
+    def __init__(self, impact_times: list, duration: float = 10.0, sample_rate: int = 44100, channels: int = 1,
+        noise_level: float = 0.005, impact_level: float = 0.3, seed: int = 0):
+        ## labels in seconds since start
+        self.impact_times = sorted(impact_times)
+        self.duration = duration
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.noise_level = noise_level
+        self.impact_level = impact_level
+        self.seed = seed
+        self.frames_per_block = 0
+        self.samples = None
+        self.position = 0
+
+    ##############################################################################################################
+    def get_input_device_list(self):
+        return [{"index": 0, "name": "synthetic", "maxInputChannels": self.channels, "defaultSampleRate": self.sample_rate}]
+
+    ##############################################################################################################
+    ## Renders the complete signal as int16 with shape (frames, channels)
+    def render(self) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        total = int(self.duration * self.sample_rate)
+        signal = rng.normal(0.0, self.noise_level, (total, self.channels))
+
+        burst_len = int(0.03 * self.sample_rate)
+        envelope = np.exp(-np.arange(burst_len) / (burst_len / 5.0))
+        for t in self.impact_times:
+            start = int(t * self.sample_rate)
+            stop = min(total, start + burst_len)
+            if start < total:
+                signal[start:stop] += (self.impact_level * rng.normal(0.0, 1.0, (stop - start, self.channels)) * envelope[:stop - start, np.newaxis])
+
+        return (np.clip(signal, -1.0, 1.0) * 32767).astype(np.int16)
+
+    ##############################################################################################################
+    def open(self, device_index: int, block_time: float, stream_callback = None):
+        self.frames_per_block = int(self.sample_rate * block_time)
+        self.samples = self.render()
+        self.position = 0
+        return
+
+    ##############################################################################################################
+    def start(self):
+        return
+
+    ##############################################################################################################
+    def is_active(self) -> bool:
+        return (self.samples is not None) and (self.position + self.frames_per_block <= self.samples.shape[0])
+
+    ##############################################################################################################
+    def read(self, frames: int):
+        block = self.samples[self.position:self.position + frames]
+        self.position += frames
+        return block.tobytes()
+
+    ##############################################################################################################
+    def close(self):
+        self.samples = None
+        return
+
+    ##############################################################################################################
+    def terminate(self):
+        self.close()
+        return
@@ -0,0 +1,127 @@
+import threading
+import time
+import numpy as np
+import cv2 as cv
+from collections import deque
+from datetime import datetime
+
+from game_modules.thread_log import THREAD_LOG
+
+##############################################################################################################
+## Focus measure: variance of the Laplacian of a grayscale image, higher is sharper
+def laplacian_variance(gray: np.ndarray) -> float:
+    return float(cv.Laplacian(gray, cv.CV_32F).var())
+
+##############################################################################################################
+##############################################################################################################
+class CapturedFrame(object):
+
+    ##############################################################################################################
+    def __init__(self, image, monotonic_time: float, sequence: int):
+        ## the camera image, [row, column, channel] array
+        self.image = image
+        ## time.monotonic() right after the frame was delivered by the camera
+        self.monotonic_time = monotonic_time
+        self.sequence = sequence
+        ## focus measure, computed on demand
+        self.sharpness = None
+
+##############################################################################################################
+##############################################################################################################
+## Grabs frames from a started camera on its own thread. The frame being captured and the latest complete
+## frame are separate buffers: the capture thread always gets a fresh image from the camera and only then
+## publishes it by swapping a reference, so taking a snapshot never waits for the camera and never copies.
+## The last max_frames frames are kept with their timestamps, so a shot can be picked after the fact.
+class CameraCaptureThread(object):
+
+    ERROR_RETRY_SECONDS = 0.5
+
+    ##############################################################################################################
+    ## to_gray: converts a camera image into a small 8 bit grayscale array for the focus measure
+    def __init__(self, camera, max_frames: int = 1, to_gray = None):
+        self.camera = camera
+        self.to_gray = to_gray
+        self.frame_ring = deque(maxlen = max(1, int(max_frames)))
+        self.latest_frame = None
+        self.frame_count = 0
+        self.error_count = 0
+        self.lock = threading.Lock()
+        self.first_frame = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target = self.run_capture, name = "CameraCapture", daemon = True)
+
+    ##############################################################################################################
+    def start(self):
+        self.thread.start()
+        return
+
+    ##############################################################################################################
+    def run_capture(self):
+        while self.stop_event.is_set() is False:
+            try:
+                image = self.camera.get_image()
+            except Exception as e:
+                self.error_count += 1
+                THREAD_LOG.add("{} - ERROR: ({}) Camera capture failed. E = {}".format(datetime.now(), self.error_count, e))
+                time.sleep(self.ERROR_RETRY_SECONDS)
+                continue
+
+            self.publish(image, time.monotonic())
+        return
+
+    ##############################################################################################################
+    def publish(self, image, monotonic_time: float):
+        self.frame_count += 1
+        frame = CapturedFrame(image, monotonic_time, self.frame_count)
+        with self.lock:
+            self.latest_frame = frame
+            self.frame_ring.append(frame)
+        self.first_frame.set()
+        return
+
+    ##############################################################################################################
+    ## Returns the latest complete frame, waits only if no frame was captured yet
+    def snapshot(self, timeout: float = 2.0) -> CapturedFrame:
+        if self.first_frame.wait(timeout) is False:
+            return None
+        with self.lock:
+            return self.latest_frame
+
+    ##############################################################################################################
+    ## Returns the sharpest frame captured between impact_time + delay and impact_time + window. Waits until the
+    ## window has passed, but not beyond deadline (time.monotonic(), None = 1 s from now). Falls back to the first
+    ## frame after the impact, then to the latest frame.
+    def select_frame(self, impact_time: float, delay: float, window: float, deadline: float = None) -> CapturedFrame:
+        window_start = impact_time + delay
+        window_end = impact_time + window
+
+        deadline = time.monotonic() + 1.0 if deadline is None else deadline
+        while time.monotonic() < deadline:
+            latest = self.snapshot(timeout = max(0.0, deadline - time.monotonic()))
+            if latest is None or latest.monotonic_time >= window_end:
+                break
+            time.sleep(0.01)
+
+        with self.lock:
+            frames = list(self.frame_ring)
+        if len(frames) == 0:
+            return None
+
+        candidates = [f for f in frames if window_start <= f.monotonic_time <= window_end]
+        if len(candidates) == 0:
+            after = [f for f in frames if f.monotonic_time >= impact_time]
+            return after[0] if len(after) > 0 else frames[-1]
+        if self.to_gray is None or len(candidates) == 1:
+            return candidates[0]
+
+        for frame in candidates:
+            if frame.sharpness is None:
+                frame.sharpness = laplacian_variance(self.to_gray(frame.image))
+        return max(candidates, key = lambda f: f.sharpness)
+
+    ##############################################################################################################
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join(timeout = 2.0)
+        return
@@ -1,22 +1,27 @@
 import PySimpleGUI as sg
-import pygame
-import pygame.camera
-import pygame.image
+import numpy as np
 from datetime import datetime
 import os
+import time
 
 from game_modules.app_configuration import AppConfig
-
-## DOCU HERE: https://www.pygame.org/docs/ref/camera.html
+from game_modules.camera_capture import CameraCaptureThread
+from game_modules.image_writer import ImageWriterPool
+from game_modules.image_frame import ImageFrame
+from game_modules.camera_sources import create_camera_source
 
 class CameraControl:
     
     #######################################################################################
-    def __init__(self):
+    def __init__(self, image_writer: ImageWriterPool):
         sg.cprint("{} - TRACE: Initializing class {}.".format(datetime.now(), self.__class__))
 
+        # pictures are encoded and written in the background
+        self.image_writer = image_writer
+
         # Load user setting from config file
-        self.current_camera = None
+        self.camera_source = None
+        self.capture_thread = None
         self.current_camera_index = AppConfig.get_user_setting_camera_index()
         self.output_format = AppConfig.CFG_DEFAULT_CAMERA_OUTPUT_FORMAT
         self.last_game_path = ""
@@ -37,31 +42,66 @@ class CameraControl:
 
         sg.cprint("{} - Storage location for camera pictures is set to {}.".format(datetime.now(), self.cam_base_storage_folder))
 
-        # init pygame module
-        pygame.init()
-        pygame.camera.init()
+        # init the camera backend, without any camera the synthetic one keeps the engine running
+        sg.cprint("{} - Using camera backend [{}].".format(datetime.now(), AppConfig.CFG_CAMERA_BACKEND))
+        self.camera_backend = AppConfig.CFG_CAMERA_BACKEND
+        self.camera_source = create_camera_source(self.camera_backend)
+        if len(self.camera_source.get_device_list()) == 0:
+            sg.cprint("{} - WARNING: No camera found, using synthetic camera pictures!".format(datetime.now()))
+            self.camera_backend = "synthetic"
+            self.camera_source = create_camera_source(self.camera_backend)
+        if self.current_camera_index >= len(self.camera_source.get_device_list()):
+            self.current_camera_index = 0
         
         # set default camera
-        cam = pygame.camera.Camera(pygame.camera.list_cameras()[self.current_camera_index], self.image_size_fullhd, self.color_space)
-        self.update_cam_selection(cam)
+        self.update_cam_selection(self.current_camera_index)
         return
 
     ##############################################################################################################
-    def update_cam_selection(self, new_cam):
+    def update_cam_selection(self, new_camera_index: int):
         sg.cprint("{} - TRACE: {}.update_cam_selection()".format(datetime.now(), self.__class__))
 
-        if self.current_camera is not None:
-            self.current_camera.stop()
-            self.current_camera = None
+        self.stop_capture()
+
+        self.current_camera_index = new_camera_index
+        self.camera_source.open(self.current_camera_index, self.image_size_fullhd, self.color_space)
+        self.camera_source.start()
 
-        self.current_camera = new_cam
-        self.current_camera.start()
+        # grab frames continuously into a memory capped ring, a shot then picks one of them
+        self.capture_thread = CameraCaptureThread(self.camera_source, self.get_frame_ring_size(), self.image_to_gray)
+        self.capture_thread.start()
 
         # Store user setting to config file
         AppConfig.set_user_setting_camera_index(self.current_camera_index)
         
         return
 
+    ##############################################################################################################
+    ## Number of frames that fit into the configured memory budget at the camera resolution, 3 channels per pixel
+    def get_frame_ring_size(self) -> int:
+        frame_bytes = self.image_size_fullhd[0] * self.image_size_fullhd[1] * 3
+        ring_size = max(1, int(AppConfig.CFG_CAMERA_FRAME_RING_MAX_MB * 1024 * 1024 // frame_bytes))
+        sg.cprint("{} - Camera frame ring holds {} frames ({} MB budget).".format(datetime.now(), ring_size, AppConfig.CFG_CAMERA_FRAME_RING_MAX_MB))
+        return ring_size
+
+    ##############################################################################################################
+    ## Grayscale of every 4th pixel, enough for comparing the focus of frames of the same scene
+    @staticmethod
+    def image_to_gray(pixels: np.ndarray) -> np.ndarray:
+        return pixels[::4, ::4].mean(axis = 2).astype(np.uint8)
+
+    ##############################################################################################################
+    def stop_capture(self):
+        sg.cprint("{} - TRACE: {}.stop_capture()".format(datetime.now(), self.__class__))
+
+        if self.capture_thread is not None:
+            self.capture_thread.stop()
+            self.capture_thread = None
+
+        if self.camera_source is not None:
+            self.camera_source.stop()
+        return
+
     ##############################################################################################################
     def get_last_game_path(self) -> str:
         sg.cprint("{} - TRACE: {}.get_last_game_path()".format(datetime.now(), self.__class__))
@@ -80,7 +120,7 @@ class CameraControl:
         sg.cprint("{} - TRACE: {}.configure()".format(datetime.now(), self.__class__))
 
         # get device full information list
-        camera_list = pygame.camera.list_cameras()
+        camera_list = self.camera_source.get_device_list()
         
         self.config_layout = [
             [sg.Text('Verfügbare Kameras:')],
@@ -109,10 +149,7 @@ class CameraControl:
         self.config_window.read(timeout = 1, timeout_key = "__TIMEOUT__") 
 
         cam_name = self.config_window["-CAMERA_INPUT_DEVICE_INDEX-"].get()
-        self.current_camera_index = pygame.camera.list_cameras().index(cam_name) 
-
-        cam = pygame.camera.Camera(cam_name, self.image_size_fullhd, self.color_space)
-        self.update_cam_selection(cam)
+        self.update_cam_selection(self.camera_source.get_device_list().index(cam_name))
 
         self.config_window.close()
         self.config_window = None
@@ -122,16 +159,46 @@ class CameraControl:
     def close(self):
         sg.cprint("{} - TRACE: {}.close()".format(datetime.now(), self.__class__))
 
-        if self.current_camera is not None:
-            self.current_camera.stop()
-            self.current_camera = None
+        self.stop_capture()
     
     #######################################################################################
-    def get_and_store_shot(self, game_instance: str, game_name: str, player_name: str) -> str:
+    ## The latest picture, not stored. Used as baseline before the first arrow of a shooter.
+    def take_reference_shot(self) -> ImageFrame:
+        sg.cprint("{} - TRACE: {}.take_reference_shot()".format(datetime.now(), self.__class__))
+
+        frame = self.capture_thread.snapshot()
+        if frame is None:
+            sg.cprint("{} - WARNING: No frame from the capture thread for the reference picture.".format(datetime.now()))
+            return None
+
+        shot = ImageFrame(frame.image, self.camera_source.color_order, frame.monotonic_time)
+        shot.camera_id = "{}_{}".format(self.camera_backend, self.current_camera_index)
+        return shot
+
+    #######################################################################################
+    ## With an impact_time (time.monotonic()) the sharpest frame right after the impact is taken, otherwise the latest.
+    ## Returns the picture in memory, storing it is done in the background if enabled.
+    ## With an impact_time the frame right after the impact is picked, waiting for it at most until deadline
+    ## (time.monotonic())
+    def get_and_store_shot(self, game_instance: str, game_name: str, player_name: str, impact_time: float = None, deadline: float = None) -> ImageFrame:
         sg.cprint("{} - TRACE: {}.get_and_store_shot()".format(datetime.now(), self.__class__))
 
-        # reading the input using the camera
-        image = self.current_camera.get_image()
+        # take a frame of the capture thread
+        if impact_time is None:
+            frame = self.capture_thread.snapshot()
+        else:
+            frame = self.capture_thread.select_frame(impact_time, AppConfig.CFG_CAMERA_SHOT_DELAY_SECONDS, AppConfig.CFG_CAMERA_SHOT_WINDOW_SECONDS, deadline)
+        if frame is None:
+            sg.cprint("{} - WARNING: No frame from the capture thread, reading the camera directly.".format(datetime.now()))
+            image = self.camera_source.get_image()
+            capture_time = time.monotonic()
+        else:
+            sg.cprint("{} - DEBUG: Using camera frame #{}, captured {:.0f} ms ago, sharpness {}.".format(datetime.now(), frame.sequence, (time.monotonic() - frame.monotonic_time) * 1000.0, frame.sharpness))
+            image = frame.image
+            capture_time = frame.monotonic_time
+        # the camera image is wrapped, not copied
+        shot = ImageFrame(image, self.camera_source.color_order, capture_time)
+        shot.camera_id = "{}_{}".format(self.camera_backend, self.current_camera_index)
         
         # saving image in local storage
         ct = datetime.now()
@@ -143,8 +210,11 @@ class CameraControl:
 
         file_name = "{:02d}-{:02d}-{:02d}_{}_{}.{}".format(ct.hour, ct.minute, ct.second, game_name, player_name, self.output_format)
         target_file = "{}/{}".format(dir_name, file_name)
-        sg.cprint("{} - Saving new camera picture: {}".format(datetime.now(), target_file))
-        pygame.image.save(image, target_file)
-        self.last_image_last_game = target_file        
-
-        return file_name
\ No newline at end of file
+        shot.image_file = target_file
+        shot.stored = AppConfig.CFG_CAMERA_STORE_PICTURES
+        if shot.stored is True:
+            sg.cprint("{} - Saving new camera picture: {}".format(datetime.now(), target_file))
+            self.image_writer.submit(shot.to_bgr(), target_file)
+            self.last_image_last_game = target_file        
+
+        return shot
\ No newline at end of file
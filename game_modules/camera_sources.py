@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+import PySimpleGUI as sg
+
+from game_modules.app_configuration import AppConfig
+from game_modules.image_writer import IMAGE_FORMATS, read_image
+
+## DOCU HERE: https://www.pygame.org/docs/ref/camera.html
+
+##############################################################################################################
+##############################################################################################################
+## Delivers frames at a fixed rate, like a camera does: get_image() waits for the next frame slot
+class FramePacer(object):
+
+    ##############################################################################################################
+    def __init__(self, fps: float):
+        self.interval = 1.0 / max(0.1, fps)
+        self.next_frame_time = 0.0
+
+    ##############################################################################################################
+    def wait(self):
+        now = time.monotonic()
+        if now < self.next_frame_time:
+            time.sleep(self.next_frame_time - now)
+            now = self.next_frame_time
+        self.next_frame_time = max(now, self.next_frame_time) + self.interval
+        return
+
+##############################################################################################################
+##############################################################################################################
+## Live frames from a webcam through pygame. get_image() returns a view on the camera surface, no copy.
+## pygame is imported here only, the other backends run without it (e.g. headless benchmarks).
+class PygameCameraSource(object):
+
+    ##############################################################################################################
+    def __init__(self):
+        import pygame
+        import pygame.camera
+        pygame.init()
+        pygame.camera.init()
+        self.camera = None
+        self.color_order = "RGB"
+
+    ##############################################################################################################
+    def get_device_list(self) -> list:
+        import pygame.camera
+        return pygame.camera.list_cameras()
+
+    ##############################################################################################################
+    def open(self, device_index: int, resolution: tuple, color_space: str):
+        import pygame.camera
+        self.camera = pygame.camera.Camera(self.get_device_list()[device_index], resolution, color_space)
+        self.color_order = color_space
+        return
+
+    ##############################################################################################################
+    def start(self):
+        self.camera.start()
+        return
+
+    ##############################################################################################################
+    ## [row, column, channel] view, surfarray itself is indexed [x, y]
+    def get_image(self) -> np.ndarray:
+        import pygame.surfarray
+        surface = self.camera.get_image()
+        return pygame.surfarray.pixels3d(surface).swapaxes(0, 1)
+
+    ##############################################################################################################
+    def stop(self):
+        if self.camera is not None:
+            self.camera.stop()
+            self.camera = None
+        return
+
+##############################################################################################################
+##############################################################################################################
+## Replays recorded frames at a fixed rate, in a loop: either all pictures of a directory (sorted by name, e.g.
+## a cam_shots session) or a video file. A missing replay path is no device, so the synthetic camera is used.
+class FileReplaySource(object):
+
+    ##############################################################################################################
+    def __init__(self, replay_path: str = None, fps: float = None):
+        self.replay_path = AppConfig.CFG_CAMERA_REPLAY_PATH if replay_path is None else replay_path
+        self.pacer = FramePacer(AppConfig.CFG_CAMERA_REPLAY_FPS if fps is None else fps)
+        self.color_order = "BGR"
+        self.image_files = []
+        self.next_index = 0
+        self.video = None
+
+    ##############################################################################################################
+    def get_device_list(self) -> list:
+        return [self.replay_path] if os.path.exists(self.replay_path) else []
+
+    ##############################################################################################################
+    ## Logs an error if there is nothing to replay, get_image() then fails until another device is opened
+    def open(self, device_index: int, resolution: tuple, color_space: str):
+        self.stop()
+        self.image_files = []
+        self.next_index = 0
+        if os.path.isdir(self.replay_path):
+            self.image_files = sorted([os.path.join(self.replay_path, f) for f in os.listdir(self.replay_path)
+                if os.path.splitext(f)[1][1:].lower() in IMAGE_FORMATS])
+            if len(self.image_files) == 0:
+                sg.cprint("{} - ERROR: No pictures to replay in {}.".format(datetime.now(), self.replay_path))
+        elif os.path.exists(self.replay_path):
+            self.video = cv.VideoCapture(self.replay_path)
+            if self.video.isOpened() is False:
+                sg.cprint("{} - ERROR: Could not open video {} for replay.".format(datetime.now(), self.replay_path))
+                self.stop()
+        else:
+            sg.cprint("{} - ERROR: Replay path {} does not exist.".format(datetime.now(), self.replay_path))
+        return
+
+    ##############################################################################################################
+    def start(self):
+        return
+
+    ##############################################################################################################
+    def get_image(self) -> np.ndarray:
+        self.pacer.wait()
+
+        if self.video is None:
+            if len(self.image_files) == 0:
+                raise IOError("Nothing to replay from {}.".format(self.replay_path))
+            image = read_image(self.image_files[self.next_index])
+            self.next_index = (self.next_index + 1) % len(self.image_files)
+            return image
+
+        ok, image = self.video.read()
+        if ok is False:
+            # start over
+            self.video.set(cv.CAP_PROP_POS_FRAMES, 0)
+            ok, image = self.video.read()
+            if ok is False:
+                raise IOError("Could not read a frame from {}.".format(self.replay_path))
+        return image
+
+    ##############################################################################################################
+    def stop(self):
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+        return
+
+##############################################################################################################
+##############################################################################################################
+## Generates pictures of the target face on a wall, with arrows drawn at known positions. The target face is the
+## matching template, placed at a random but known position, so the image processing can be checked end to end.
+class SyntheticTargetSource(object):
+
+    ARROW_COLOR = (30, 30, 30)
+    ARROW_SHAFT_LENGTH = 40
+
+    ##############################################################################################################
+    def __init__(self, fps: float = None, seed: int = 0):
+        self.pacer = FramePacer(AppConfig.CFG_CAMERA_SYNTHETIC_FPS if fps is None else fps)
+        self.rng = np.random.default_rng(seed)
+        self.color_order = "BGR"
+        self.base_image = None
+        self.image = None
+        self.lock = threading.Lock()
+        ## top left corner (x, y) and size (w, h) of the target face in the picture
+        self.target_origin = (0, 0)
+        self.target_size = (0, 0)
+        ## hit positions (x, y) of all arrows in picture coordinates
+        self.arrow_positions = []
+
+    ##############################################################################################################
+    def get_device_list(self) -> list:
+        return ["synthetic"]
+
+    ##############################################################################################################
+    def open(self, device_index: int, resolution: tuple, color_space: str):
+        width, height = resolution
+        wall = self.rng.normal(110.0, 12.0, (height, width, 1)).clip(0, 255).astype(np.uint8)
+        self.base_image = np.repeat(wall, 3, axis = 2)
+
+        target = cv.imread(AppConfig.CFG_TARGET_TEMPLATE_FILE, cv.IMREAD_COLOR)
+        if target is None:
+            target = self.draw_target_face(min(width, height) // 8)
+        self.target_size = (target.shape[1], target.shape[0])
+        self.target_origin = (int(self.rng.integers(0, width - target.shape[1])), int(self.rng.integers(0, height - target.shape[0])))
+        x, y = self.target_origin
+        self.base_image[y:y + target.shape[0], x:x + target.shape[1]] = target
+
+        self.clear_arrows()
+        return
+
+    ##############################################################################################################
+    ## Fallback target face if there is no template: white, red and yellow rings
+    @staticmethod
+    def draw_target_face(size: int) -> np.ndarray:
+        face = np.full((size, size, 3), 110, dtype = np.uint8)
+        center = (size // 2, size // 2)
+        for radius, color in [(size // 2, (255, 255, 255)), (size // 3, (40, 40, 220)), (size // 6, (40, 220, 250))]:
+            cv.circle(face, center, radius, color, -1)
+        return face
+
+    ##############################################################################################################
+    ## Adds an arrow, at a random position on the target face if none is given. Returns the hit position (x, y).
+    def add_arrow(self, position: tuple = None) -> tuple:
+        if position is None:
+            x, y = self.target_origin
+            w, h = self.target_size
+            position = (x + int(self.rng.integers(w // 8, w - w // 8)), y + int(self.rng.integers(h // 8, h - h // 8)))
+        self.arrow_positions.append(position)
+        self.render()
+        return position
+
+    ##############################################################################################################
+    def clear_arrows(self):
+        self.arrow_positions = []
+        self.render()
+        return
+
+    ##############################################################################################################
+    ## Draws all arrows into a new picture, pictures handed out before are never changed
+    def render(self):
+        image = self.base_image.copy()
+        # the shafts point the same way as the scorer expects
+        direction = np.array(AppConfig.CFG_SCORER_ARROW_DIRECTION, dtype = np.float64)
+        direction /= max(1e-9, np.linalg.norm(direction))
+        for x, y in self.arrow_positions:
+            shaft_end = (int(x + direction[0] * self.ARROW_SHAFT_LENGTH), int(y + direction[1] * self.ARROW_SHAFT_LENGTH))
+            cv.line(image, (x, y), shaft_end, self.ARROW_COLOR, 3, cv.LINE_AA)
+            cv.circle(image, (x, y), 3, self.ARROW_COLOR, -1)
+        with self.lock:
+            self.image = image
+        return
+
+    ##############################################################################################################
+    def start(self):
+        return
+
+    ##############################################################################################################
+    def get_image(self) -> np.ndarray:
+        self.pacer.wait()
+        with self.lock:
+            return self.image
+
+    ##############################################################################################################
+    def stop(self):
+        return
+
+##############################################################################################################
+## Camera backends by name, selected with AppConfig.CFG_CAMERA_BACKEND
+CAMERA_BACKENDS = {
+    "pygame": PygameCameraSource,
+    "replay": FileReplaySource,
+    "synthetic": SyntheticTargetSource,
+}
+
+##############################################################################################################
+def create_camera_source(backend_name: str):
+    backend = CAMERA_BACKENDS.get(backend_name, None)
+    if backend is None:
+        raise ValueError("Unknown camera backend {}, use one of {}.".format(backend_name, list(CAMERA_BACKENDS.keys())))
+    return backend()
@@ -0,0 +1,216 @@
+import os
+import time
+import concurrent.futures
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+
+from game_modules.app_configuration import AppConfig
+from game_modules.image_writer import ImageWriterPool
+from game_modules.template_matcher import TemplateMatcher, create_template_matcher
+from game_modules.target_rectifier import TargetCalibration, calibrate_target, rectified_score, load_lens, get_calibration_file
+
+## template matcher of a worker process, with its template pyramid built once when the process starts
+_worker_matcher: TemplateMatcher = None
+## target face, template, mask, lens model and the target calibrations by camera id of a worker process, for the rectification
+_worker_face_name: str = ""
+_worker_template_img: np.ndarray = None
+_worker_mask_img: np.ndarray = None
+_worker_lens: tuple = (None, None)
+_worker_calibrations = {}
+
+##############################################################################################################
+def init_worker(template_file: str, mask_file: str, strategy_name: str = None, method_name: str = None, face_name: str = ""):
+    global _worker_matcher, _worker_face_name, _worker_template_img, _worker_mask_img, _worker_lens
+    _worker_face_name = face_name
+    _worker_matcher = create_template_matcher(template_file, mask_file, strategy_name, method_name)
+    _worker_template_img = cv.imread(template_file, cv.IMREAD_COLOR)
+    _worker_mask_img = cv.imread(mask_file, cv.IMREAD_COLOR)
+    _worker_lens = load_lens()
+    _worker_calibrations.clear()
+    return
+
+##############################################################################################################
+## Front facing target face through the calibration of the camera, timing the stages. The face located by the
+## template matcher must still be where it was calibrated, else (or if there is no calibration, or the face does
+## not fit any more) it is calibrated again. Returns (face, calibration, score), None if the target could not be
+## calibrated.
+def rectify_target(source_img: np.ndarray, camera_id: str, match_loc: tuple, timings: dict) -> tuple:
+    camera_size = (source_img.shape[1], source_img.shape[0])
+    calibration = _worker_calibrations.get(camera_id, None)
+    if calibration is None:
+        calibration = TargetCalibration.load(get_calibration_file(camera_id, _worker_face_name))
+    if calibration is not None and calibration.camera_size == camera_size and calibration.fits(match_loc, AppConfig.CFG_RECTIFY_MAX_SHIFT):
+        t = time.monotonic()
+        rectified_img = calibration.rectify(source_img)
+        score = rectified_score(rectified_img, _worker_template_img, _worker_mask_img)
+        timings["rectify"] = (time.monotonic() - t) * 1000.0
+        if score >= AppConfig.CFG_RECTIFY_MIN_SCORE:
+            _worker_calibrations[camera_id] = calibration
+            return rectified_img, calibration, score
+
+    # no calibration yet, or the camera or target moved
+    t = time.monotonic()
+    calibration_file = get_calibration_file(camera_id, _worker_face_name)
+    file_state = os.stat(calibration_file).st_mtime_ns if os.path.exists(calibration_file) else None
+    calibration = calibrate_target(source_img, _worker_template_img, _worker_mask_img, _worker_matcher, _worker_lens[0], _worker_lens[1], match_loc)
+    timings["calibrate"] = (time.monotonic() - t) * 1000.0
+    if calibration is None:
+        _worker_calibrations.pop(camera_id, None)
+        return None
+
+    # another worker calibrated meanwhile: all crops of the camera must come from the same calibration,
+    # or the difference of two crops shows the rings instead of the arrow
+    if os.path.exists(calibration_file) and os.stat(calibration_file).st_mtime_ns != file_state:
+        other = TargetCalibration.load(calibration_file)
+        if other is not None and other.camera_size == calibration.camera_size and other.fits(match_loc, AppConfig.CFG_RECTIFY_MAX_SHIFT):
+            other_score = rectified_score(other.rectify(source_img), _worker_template_img, _worker_mask_img)
+            if other_score >= AppConfig.CFG_RECTIFY_MIN_SCORE:
+                _worker_calibrations[camera_id] = other
+                return other.rectify(source_img), other, other_score
+    calibration.save(calibration_file)
+    _worker_calibrations[camera_id] = calibration
+    print("{} - INFO: Calibrated the target rectification for camera {} ({}, score {:.3f}).".format(datetime.now(), camera_id, calibration.method, calibration.score))
+    return calibration.rectify(source_img), calibration, calibration.score
+
+##############################################################################################################
+##############################################################################################################
+class ExtractionResult(object):
+
+    ##############################################################################################################
+    def __init__(self, output_file: str, match_loc: tuple, timings: dict, score: float = None, roi_hit: bool = False, crop_img: np.ndarray = None,
+        homography: np.ndarray = None, method: str = ""):
+        self.output_file = output_file
+        ## the cut out target face, without the rectangle
+        self.crop_img = crop_img
+        ## top left corner (x, y) of the target face in the camera picture
+        self.match_loc = match_loc
+        ## milliseconds per stage
+        self.timings = timings
+        ## match confidence 0..1 (None for methods without one), and if the region around the last location was enough
+        self.score = score
+        self.roi_hit = roi_hit
+        ## template -> camera picture, if the face was rectified, and how the face was found
+        self.homography = homography
+        self.method = method
+
+    ##############################################################################################################
+    def timings_to_str(self) -> str:
+        return ", ".join(["{} {:.1f}".format(k, v) for k, v in self.timings.items()])
+
+##############################################################################################################
+## Finds the target face in a BGR picture and writes the crop to output_file (if given), timing every stage.
+## The face is always located by the template matcher first: with a hint_loc the region around it is searched,
+## the full picture only if that fails. With the rectification the face is then cut out front facing through the
+## calibration of the camera, if it is still where it was calibrated, otherwise (or if it can not be calibrated)
+## it is cropped axis aligned at the match location.
+## Runs in a worker process, or inline if there are no workers.
+def extract_target(source_img: np.ndarray, output_file: str, submit_time: float, hint_loc: tuple = None, camera_id: str = "") -> ExtractionResult:
+    timings = {}
+    start = time.monotonic()
+    timings["queue"] = (start - submit_time) * 1000.0
+
+    roi_match = None
+    if hint_loc is not None:
+        t = time.monotonic()
+        roi_match = _worker_matcher.find_near(source_img, hint_loc, AppConfig.CFG_MATCH_ROI_MARGIN, AppConfig.CFG_MATCH_ROI_MIN_SCORE)
+        timings["match_roi"] = (time.monotonic() - t) * 1000.0
+
+    if roi_match is not None:
+        matchLoc, score = roi_match
+    else:
+        t = time.monotonic()
+        matchLoc, score = _worker_matcher.find(source_img)
+        timings["match_search"] = (time.monotonic() - t) * 1000.0
+
+    rectified = rectify_target(source_img, camera_id, matchLoc, timings) if AppConfig.CFG_RECTIFY_TARGET is True else None
+    if rectified is not None:
+        cropped_img, calibration, _rectify_score = rectified
+        write_crop(cropped_img, output_file, timings)
+        timings["total"] = (time.monotonic() - submit_time) * 1000.0
+        return ExtractionResult(output_file, matchLoc, timings, score, roi_match is not None, cropped_img, calibration.homography,
+            "rectified/" + calibration.method)
+
+    # [rows, columns], the rectangle and the hit are drawn only when the picture is viewed
+    t = time.monotonic()
+    template_w, template_h = _worker_matcher.template_size
+    cropped_img = source_img[matchLoc[1]:matchLoc[1] + template_h, matchLoc[0]:matchLoc[0] + template_w].copy()
+    timings["crop"] = (time.monotonic() - t) * 1000.0
+
+    write_crop(cropped_img, output_file, timings)
+    timings["total"] = (time.monotonic() - submit_time) * 1000.0
+
+    return ExtractionResult(output_file, matchLoc, timings, score, roi_match is not None, cropped_img, None,
+        "{}/{}".format(AppConfig.CFG_MATCH_STRATEGY, AppConfig.CFG_MATCH_METHOD))
+
+##############################################################################################################
+def write_crop(cropped_img: np.ndarray, output_file: str, timings: dict):
+    if output_file != "":
+        t = time.monotonic()
+        ImageWriterPool.write_image(cropped_img, output_file)
+        timings["encode"] = (time.monotonic() - t) * 1000.0
+    return
+
+##############################################################################################################
+##############################################################################################################
+## Runs the target extraction of the camera pictures in a pool of worker processes, so the GUI thread only hands
+## over the picture and gets a future back. Each worker prepares the template matcher of the target face once. With 0
+## workers the extraction runs inline and the returned future is already done.
+class ExtractionPipeline(object):
+
+    ##############################################################################################################
+    def __init__(self, workers: int = None, template_file: str = None, mask_file: str = None, face_name: str = "default"):
+        self.workers = AppConfig.CFG_EXTRACTION_WORKERS if workers is None else workers
+        self.executor = None
+        self.face_name = None
+        self.start(AppConfig.CFG_TARGET_TEMPLATE_FILE if template_file is None else template_file,
+            AppConfig.CFG_TARGET_MASK_FILE if mask_file is None else mask_file, face_name)
+
+    ##############################################################################################################
+    def start(self, template_file: str, mask_file: str, face_name: str):
+        self.face_name = face_name
+        if self.workers > 0:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers = self.workers, initializer = init_worker,
+                initargs = (template_file, mask_file, None, None, face_name))
+        else:
+            init_worker(template_file, mask_file, None, None, face_name)
+        return
+
+    ##############################################################################################################
+    ## Switches the workers to another target face, jobs already submitted finish with the old one
+    def set_target_face(self, template_file: str, mask_file: str, face_name: str):
+        if face_name == self.face_name:
+            return
+        self.stop()
+        self.start(template_file, mask_file, face_name)
+        return
+
+    ##############################################################################################################
+    def submit(self, source_img: np.ndarray, output_file: str, hint_loc: tuple = None, camera_id: str = "") -> concurrent.futures.Future:
+        submit_time = time.monotonic()
+        if self.executor is not None:
+            return self.executor.submit(extract_target, source_img, output_file, submit_time, hint_loc, camera_id)
+
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(extract_target(source_img, output_file, submit_time, hint_loc, camera_id))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    ##############################################################################################################
+    ## Waits until the given jobs are done, finished ones cost nothing
+    @staticmethod
+    def wait_for(futures: list, timeout: float = None) -> bool:
+        pending = [f for f in futures if f.done() is False]
+        if len(pending) == 0:
+            return True
+        _done, not_done = concurrent.futures.wait(pending, timeout = timeout)
+        return len(not_done) == 0
+
+    ##############################################################################################################
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait = True)
+            self.executor = None
+        return
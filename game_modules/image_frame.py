@@ -0,0 +1,61 @@
+import numpy as np
+import cv2 as cv
+
+from game_modules.image_writer import read_image
+
+## conversions of the supported channel orders into BGR, the order OpenCV works with
+COLOR_ORDER_TO_BGR = {
+    "RGB": cv.COLOR_RGB2BGR,
+    "HSV": cv.COLOR_HSV2BGR_FULL,
+    "YUV": cv.COLOR_YUV2BGR,
+}
+
+##############################################################################################################
+##############################################################################################################
+## A camera picture in memory, handed from the camera to the result processing without a disk round trip.
+## pixels is indexed [row, column, channel] and may be a view on the camera buffer, color_order names its
+## channels. The BGR version is converted once and shared read-only, e.g. with the image writer.
+class ImageFrame(object):
+
+    ##############################################################################################################
+    def __init__(self, pixels: np.ndarray, color_order: str = "BGR", capture_time: float = -1.0, image_file: str = ""):
+        if color_order != "BGR" and color_order not in COLOR_ORDER_TO_BGR:
+            raise ValueError("Unsupported color order {}, use BGR or one of {}.".format(color_order, list(COLOR_ORDER_TO_BGR.keys())))
+
+        self.pixels = pixels
+        self.color_order = color_order
+        ## time.monotonic() of the capture, -1 if unknown
+        self.capture_time = capture_time
+        ## file name of the picture, it is on disk (or in the writer queue) only if stored is true
+        self.image_file = image_file
+        self.stored = (image_file != "")
+        ## the camera that took the picture, e.g. "pygame_0", empty if unknown
+        self.camera_id = ""
+        self._bgr = None
+
+    ##############################################################################################################
+    ## Loads a stored picture, e.g. for re-processing a session
+    @staticmethod
+    def from_file(image_file: str) -> "ImageFrame":
+        pixels = read_image(image_file)
+        if pixels is None:
+            raise IOError("Could not read image {}.".format(image_file))
+        return ImageFrame(pixels, "BGR", image_file = image_file)
+
+    ##############################################################################################################
+    def get_size(self) -> tuple:
+        return (self.pixels.shape[1], self.pixels.shape[0])
+
+    ##############################################################################################################
+    ## Returns the frame as read-only, contiguous BGR array. Copies at most once per frame.
+    def to_bgr(self) -> np.ndarray:
+        if self._bgr is None:
+            if self.color_order == "BGR":
+                bgr = np.ascontiguousarray(self.pixels)
+            else:
+                bgr = cv.cvtColor(self.pixels, COLOR_ORDER_TO_BGR[self.color_order])
+            # read-only on a view, the array of the camera may be the same object and stays writeable
+            bgr = bgr.view()
+            bgr.flags.writeable = False
+            self._bgr = bgr
+        return self._bgr
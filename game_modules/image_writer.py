@@ -0,0 +1,144 @@
+import os
+import queue
+import threading
+import time
+import numpy as np
+import cv2 as cv
+from datetime import datetime
+
+from game_modules.app_configuration import AppConfig
+from game_modules.thread_log import THREAD_LOG
+
+## output formats and their encoder parameters, "npy" stores the raw array without encoding
+IMAGE_FORMATS = ("png", "jpg", "webp", "npy")
+
+##############################################################################################################
+def get_encode_params(output_format: str) -> list:
+    if output_format == "png":
+        return [cv.IMWRITE_PNG_COMPRESSION, AppConfig.CFG_IMAGE_PNG_COMPRESSION]
+    if output_format == "jpg":
+        return [cv.IMWRITE_JPEG_QUALITY, AppConfig.CFG_IMAGE_JPEG_QUALITY]
+    if output_format == "webp":
+        return [cv.IMWRITE_WEBP_QUALITY, AppConfig.CFG_IMAGE_WEBP_QUALITY]
+    return []
+
+##############################################################################################################
+## Reads an image written by the pool as BGR array, whatever the format
+def read_image(image_file: str) -> np.ndarray:
+    if image_file.lower().endswith(".npy"):
+        return np.load(image_file)
+    return cv.imread(image_file, cv.IMREAD_COLOR)
+
+##############################################################################################################
+##############################################################################################################
+class ImageWriteJob(object):
+
+    ##############################################################################################################
+    def __init__(self, image: np.ndarray, target_file: str):
+        ## BGR image, must not be changed after it was submitted
+        self.image = image
+        self.target_file = target_file
+        self.submit_time = time.monotonic()
+        self.encode_ms = -1.0
+        self.ok = False
+        self.done = threading.Event()
+
+##############################################################################################################
+##############################################################################################################
+## Encodes and writes images on a few worker threads (OpenCV releases the GIL while encoding), so the GUI thread
+## only hands over the array. The queue is bounded: if the disk can not keep up, submit() blocks until a
+## worker is free instead of piling up full HD frames in memory. Readers wait only for the files they need.
+class ImageWriterPool(object):
+
+    ##############################################################################################################
+    def __init__(self, workers: int = AppConfig.CFG_IMAGE_WRITER_WORKERS, max_pending: int = AppConfig.CFG_IMAGE_WRITER_MAX_PENDING):
+        self.jobs = queue.Queue(maxsize = max(1, max_pending))
+        self.pending = {} # target file -> job
+        self.lock = threading.Lock()
+        self.images_written = 0
+        self.write_errors = 0
+
+        self.workers = []
+        for i in range(0, max(1, workers)):
+            worker = threading.Thread(target = self.run_worker, name = "ImageWriter-{}".format(i), daemon = True)
+            worker.start()
+            self.workers.append(worker)
+
+    ##############################################################################################################
+    ## Queues the image for writing, the format follows the file extension. Blocks while the queue is full.
+    def submit(self, image: np.ndarray, target_file: str) -> ImageWriteJob:
+        job = ImageWriteJob(image, target_file)
+        with self.lock:
+            self.pending[target_file] = job
+
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            THREAD_LOG.add("{} - WARNING: Image writer queue is full, waiting to write {}.".format(datetime.now(), target_file))
+            self.jobs.put(job)
+        return job
+
+    ##############################################################################################################
+    def run_worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                break
+
+            start = time.monotonic()
+            try:
+                self.write_image(job.image, job.target_file)
+                job.ok = True
+                self.images_written += 1
+            except Exception as e:
+                self.write_errors += 1
+                THREAD_LOG.add("{} - ERROR: Could not write image {}. E = {}".format(datetime.now(), job.target_file, e))
+            job.encode_ms = (time.monotonic() - start) * 1000.0
+            job.image = None
+
+            with self.lock:
+                if self.pending.get(job.target_file, None) is job:
+                    del self.pending[job.target_file]
+            job.done.set()
+            self.jobs.task_done()
+        return
+
+    ##############################################################################################################
+    @staticmethod
+    def write_image(image: np.ndarray, target_file: str):
+        output_format = os.path.splitext(target_file)[1][1:].lower()
+        if output_format == "npy":
+            np.save(target_file, image)
+            return
+        if cv.imwrite(target_file, image, get_encode_params(output_format)) is False:
+            raise IOError("OpenCV could not encode the image as {}".format(output_format))
+        return
+
+    ##############################################################################################################
+    ## Waits until the given files are written, files not known to the pool are considered done
+    def wait_for(self, target_files: list, timeout: float = None) -> bool:
+        with self.lock:
+            jobs = [self.pending[f] for f in target_files if f in self.pending]
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in jobs:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if job.done.wait(remaining) is False:
+                return False
+        return True
+
+    ##############################################################################################################
+    ## Waits until all queued images are written
+    def flush(self):
+        self.jobs.join()
+        return
+
+    ##############################################################################################################
+    def stop(self):
+        self.flush()
+        for worker in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join(timeout = 2.0)
+        return
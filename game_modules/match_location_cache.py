@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+from datetime import datetime
+import PySimpleGUI as sg
+
+##############################################################################################################
+##############################################################################################################
+## Remembers where the target face was found, per camera and target face. The target does not move during a
+## session, so the next search can start at the last location. The entries are stored in a JSON file and survive
+## a restart of the same session; a location found in another session is not used.
+class MatchLocationCache(object):
+
+    ##############################################################################################################
+    def __init__(self, cache_file: str):
+        self.cache_file = cache_file
+        self.entries = {} # "camera id|face" -> {"x", "y", "score", "session_id", "updated"}
+        self.lock = threading.Lock()
+        self.changed = False
+        self.load()
+
+    ##############################################################################################################
+    def load(self):
+        if os.path.exists(self.cache_file) is False:
+            return
+        try:
+            with open(self.cache_file, "r") as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            sg.cprint("{} - WARNING: Could not read match location cache {}, starting empty. E = {}".format(datetime.now(), self.cache_file, e))
+            self.entries = {}
+        return
+
+    ##############################################################################################################
+    ## Last location (x, y) of the face for the camera in the session, None if unknown
+    def get(self, camera_id: str, face_name: str, session_id: str) -> tuple:
+        with self.lock:
+            entry = self.entries.get(self.get_key(camera_id, face_name), None)
+        if entry is None or entry.get("session_id", None) != session_id:
+            return None
+        return (entry["x"], entry["y"])
+
+    ##############################################################################################################
+    def update(self, camera_id: str, face_name: str, location: tuple, score: float, session_id: str):
+        with self.lock:
+            self.entries[self.get_key(camera_id, face_name)] = {"x": int(location[0]), "y": int(location[1]), "score": score,
+                "session_id": session_id, "updated": str(datetime.now())}
+            self.changed = True
+        return
+
+    ##############################################################################################################
+    ## Forgets the location, e.g. when the camera was moved
+    def invalidate(self, camera_id: str, face_name: str):
+        with self.lock:
+            if self.entries.pop(self.get_key(camera_id, face_name), None) is not None:
+                self.changed = True
+        return
+
+    ##############################################################################################################
+    @staticmethod
+    def get_key(camera_id: str, face_name: str) -> str:
+        return "{}|{}".format(camera_id, face_name)
+
+    ##############################################################################################################
+    def save(self):
+        with self.lock:
+            if self.changed is False:
+                return
+            entries = dict(self.entries)
+            self.changed = False
+
+        folder = os.path.dirname(self.cache_file)
+        if folder != "" and os.path.exists(folder) is False:
+            os.makedirs(folder)
+        with open(self.cache_file, "w") as f:
+            json.dump(entries, f, indent = 2)
+        return
@@ -0,0 +1,266 @@
+import numpy as np
+
+from game_modules.app_configuration import AppConfig
+from game_modules.audio_features import BlockFeatures
+from game_modules.adaptive_threshold import AdaptiveThreshold
+
+##############################################################################################################
+##############################################################################################################
+## The classic engine: RMS of the loudest channel against a threshold that follows the noise floor
+class RmsOnsetDetector(object):
+
+    ## CONSTANTS AND DEFAULTS
+    NAME = "rms"
+
+    ##############################################################################################################
+    def __init__(self, sample_rate: int, frames_per_block: int, channels: int = 1):
+        self.block_time = frames_per_block / float(max(1, sample_rate))
+        self.threshold = AdaptiveThreshold(channels, self.block_time)
+
+        # position of the first loud sample of the current noisy run, relative to the last processed block
+        self.run_start_offset = 0
+        ## sample offset of the last onset relative to the start of its block, None if none
+        self.last_onset_offset = None
+
+    ##############################################################################################################
+    ## Called after a block could not be read, a burst cannot be judged across the gap
+    def on_input_error(self):
+        self.threshold.in_burst = False
+        return
+
+    ##############################################################################################################
+    def get_state(self) -> dict:
+        return self.threshold.get_state()
+
+    ##############################################################################################################
+    ## Returns true if a clap/bang was detected
+    def process(self, samples: np.ndarray, features: BlockFeatures) -> bool:
+
+        self.last_onset_offset = None
+        self.run_start_offset -= samples.shape[1]
+
+        clap_detected = self.threshold.process(features.rms)
+        if self.threshold.burst_started():
+            # first loud block: the onset is the first sample above half of the block peak
+            channel = features.loudest_channel()
+            loud = np.abs(samples[channel]) >= 0.5 * features.peak[channel]
+            self.run_start_offset = int(loud.argmax())
+        elif clap_detected is True:
+            self.last_onset_offset = self.run_start_offset
+
+        return clap_detected
+
+##############################################################################################################
+##############################################################################################################
+## Band-limited spectral flux over short STFT frames with an adaptive median threshold.
+## Sustained sounds like speech, applause or the video soundtrack raise the median and are ignored,
+## while the sharp broadband onset of an arrow impact produces a flux peak well above it.
+## All STFT frames of a block are computed in one vectorized FFT call, frames continue across blocks. The median
+## is a streaming estimate moved once per block, like the noise floor of the rms engine, and the mono and
+## windowed frame buffers are preallocated.
+class SpectralFluxOnsetDetector(object):
+
+    ## CONSTANTS AND DEFAULTS
+    NAME = "spectral_flux"
+    LOG_COMPRESSION = 100.0
+
+    ##############################################################################################################
+    def __init__(self, sample_rate: int, frames_per_block: int, channels: int = 1):
+        self.sample_rate = int(sample_rate)
+        self.frame_size = AppConfig.CFG_SPECTRAL_FLUX_FRAME_SIZE
+        self.hop_size = AppConfig.CFG_SPECTRAL_FLUX_HOP_SIZE
+        self.threshold_factor = AppConfig.CFG_SPECTRAL_FLUX_THRESHOLD_FACTOR
+        self.threshold_delta = AppConfig.CFG_SPECTRAL_FLUX_THRESHOLD_DELTA
+
+        self.window = np.hanning(self.frame_size).astype(np.float32)
+
+        # FFT bins of the detection band
+        band_low, band_high = AppConfig.CFG_SPECTRAL_FLUX_BAND_HZ
+        bin_hz = self.sample_rate / float(self.frame_size)
+        self.bin_low = max(1, int(band_low / bin_hz))
+        self.bin_high = min(self.frame_size // 2 + 1, int(band_high / bin_hz) + 1)
+
+        # streaming median of the recent flux for the adaptive threshold, set from the first frames
+        frame_time = self.hop_size / float(self.sample_rate)
+        median_frames = max(1, int(AppConfig.CFG_SPECTRAL_FLUX_MEDIAN_SECONDS / frame_time))
+        self.median_rate = 1.0 / median_frames
+        self.median_flux = None
+        self.flux_spread = 0.0
+        self.refractory_frames = int(AppConfig.CFG_SPECTRAL_FLUX_REFRACTORY_SECONDS / frame_time)
+
+        # sample carry-over between blocks, so the hop grid is continuous
+        self.buffer = np.zeros(self.frame_size + frames_per_block, dtype = np.float32)
+        self.buffer_fill = 0
+        self.prev_magnitude = np.zeros(self.bin_high - self.bin_low, dtype = np.float32)
+        self.prev_above = False
+        self.frames_since_onset = self.refractory_frames
+        # no detection before the median had the time of its window to settle
+        self.warmup_frames = median_frames
+
+        # work arrays, grown if a block is longer than announced
+        self._mono = np.zeros(0, dtype = np.float32)
+        self._windowed = np.zeros((0, self.frame_size), dtype = np.float32)
+        self._above = np.zeros(0, dtype = np.bool_)
+        self._rising = np.zeros(0, dtype = np.bool_)
+        self.allocate(frames_per_block)
+
+        ## diagnostics of the last processed block
+        self.last_flux = np.zeros(0, dtype = np.float32)
+        self.last_threshold = 0.0
+        ## sample offset of the last onset relative to the start of its block, None if none
+        self.last_onset_offset = None
+
+    ##############################################################################################################
+    def on_input_error(self):
+        self.buffer_fill = 0
+        return
+
+    ##############################################################################################################
+    ## Work arrays for blocks of up to frames_per_block samples
+    def allocate(self, frames_per_block: int):
+        if frames_per_block > self._mono.shape[0]:
+            self._mono = np.zeros(frames_per_block, dtype = np.float32)
+        max_frames = (self.buffer.shape[0] - self.frame_size) // self.hop_size + 1
+        if max_frames > self._windowed.shape[0]:
+            self._windowed = np.zeros((max_frames, self.frame_size), dtype = np.float32)
+            self._above = np.zeros(max_frames, dtype = np.bool_)
+            self._rising = np.zeros(max_frames, dtype = np.bool_)
+        return
+
+    ##############################################################################################################
+    def get_state(self) -> dict:
+        return {
+            "median_flux": round(self.median_flux, 3) if self.median_flux is not None else 0.0,
+            "threshold": round(self.last_threshold, 3),
+            "last_flux_max": round(float(self.last_flux.max()), 3) if self.last_flux.shape[0] > 0 else 0.0,
+            "refractory": self.frames_since_onset <= self.refractory_frames,
+        }
+
+    ##############################################################################################################
+    ## Returns the spectral flux of every complete STFT frame in the block
+    def compute_flux(self, mono: np.ndarray) -> np.ndarray:
+
+        count = mono.shape[0]
+        if self.buffer_fill + count > self.buffer.shape[0]:
+            grown = np.zeros(self.buffer_fill + count, dtype = np.float32)
+            grown[:self.buffer_fill] = self.buffer[:self.buffer_fill]
+            self.buffer = grown
+            self.allocate(count)
+
+        self.buffer[self.buffer_fill:self.buffer_fill + count] = mono
+        total = self.buffer_fill + count
+        if total < self.frame_size:
+            self.buffer_fill = total
+            return np.zeros(0, dtype = np.float32)
+
+        n_frames = (total - self.frame_size) // self.hop_size + 1
+        frames = np.lib.stride_tricks.sliding_window_view(self.buffer[:total], self.frame_size)[::self.hop_size][:n_frames]
+
+        windowed = self._windowed[:n_frames]
+        np.multiply(frames, self.window, out = windowed)
+        spectrum = np.fft.rfft(windowed, axis = 1)
+        magnitude = np.abs(spectrum[:, self.bin_low:self.bin_high]).astype(np.float32)
+        np.log1p(magnitude * self.LOG_COMPRESSION, out = magnitude)
+
+        # positive change per bin against the previous frame, averaged over the band
+        rises = np.diff(magnitude, axis = 0, prepend = self.prev_magnitude[np.newaxis, :])
+        np.maximum(rises, 0.0, out = rises)
+        flux = rises.mean(axis = 1)
+        self.prev_magnitude[:] = magnitude[-1]
+
+        # keep the samples the next frame still needs
+        consumed = n_frames * self.hop_size
+        self.buffer[:total - consumed] = self.buffer[consumed:total]
+        self.buffer_fill = total - consumed
+
+        return flux
+
+    ##############################################################################################################
+    ## Refines the onset inside the STFT frame starting at frame_start (relative to the block, may be negative)
+    ## to the first sample above half of the frame peak. Falls back to the frame centre if the frame lies
+    ## mostly in the previous block.
+    def locate_onset(self, mono: np.ndarray, frame_start: int) -> int:
+        first = max(0, frame_start)
+        last = min(mono.shape[0], frame_start + self.frame_size)
+        if last - first < self.hop_size:
+            return frame_start + self.frame_size // 2
+
+        window = np.abs(mono[first:last])
+        return first + int((window >= 0.5 * window.max()).argmax())
+
+    ##############################################################################################################
+    ## Moves the streaming median towards the flux of the frames of a block: up by half a step for every frame
+    ## above it, down by half a step for every frame below. The step is a fraction of the running mean deviation,
+    ## so the estimate settles within the median window whatever the level of the flux.
+    def update_median(self, flux: np.ndarray):
+        if self.median_flux is None:
+            self.median_flux = float(np.median(flux))
+            self.flux_spread = max(1e-6, float(np.abs(flux - self.median_flux).mean()))
+            return
+
+        n = flux.shape[0]
+        rate = min(1.0, self.median_rate * n)
+        deviation = float(np.abs(flux - self.median_flux).sum()) / n
+        self.flux_spread = max(1e-6, self.flux_spread + rate * (deviation - self.flux_spread))
+        above = int(np.count_nonzero(flux > self.median_flux))
+        self.median_flux = max(0.0, self.median_flux + self.median_rate * self.flux_spread * (above - 0.5 * n))
+        return
+
+    ##############################################################################################################
+    ## Returns true if an onset was detected in this block
+    def process(self, samples: np.ndarray, features: BlockFeatures) -> bool:
+
+        if samples.shape[0] == 1:
+            mono = samples[0]
+        else:
+            if samples.shape[1] > self._mono.shape[0]:
+                self.allocate(samples.shape[1])
+            mono = self._mono[:samples.shape[1]]
+            np.mean(samples, axis = 0, out = mono)
+        carried_samples = self.buffer_fill
+        flux = self.compute_flux(mono)
+        self.last_flux = flux
+        self.last_onset_offset = None
+        if flux.shape[0] == 0:
+            return False
+
+        # the threshold follows the median of the recent past, before this block
+        if self.median_flux is None:
+            self.update_median(flux)
+        self.last_threshold = self.threshold_delta + self.threshold_factor * self.median_flux
+
+        # rising edges over the threshold, frames of the warmup are never onsets
+        n = flux.shape[0]
+        above = self._above[:n]
+        rising = self._rising[:n]
+        np.greater(flux, self.last_threshold, out = above)
+        rising[0] = above[0] and not self.prev_above
+        np.greater(above[1:], above[:-1], out = rising[1:])
+        self.prev_above = bool(above[-1])
+        skipped = min(n, self.warmup_frames)
+        self.warmup_frames -= skipped
+
+        # frames_since_onset counts from the start of the block here, +1 for the frame itself
+        onset_detected = False
+        for i in np.flatnonzero(rising[skipped:]) + skipped:
+            if self.frames_since_onset + i + 1 > self.refractory_frames:
+                self.frames_since_onset = -(i + 1)
+                if onset_detected is False:
+                    self.last_onset_offset = self.locate_onset(mono, i * self.hop_size - carried_samples)
+                onset_detected = True
+        self.frames_since_onset += n
+
+        self.update_median(flux)
+        return onset_detected
+
+##############################################################################################################
+##############################################################################################################
+DETECTION_ENGINES = {
+    RmsOnsetDetector.NAME: RmsOnsetDetector,
+    SpectralFluxOnsetDetector.NAME: SpectralFluxOnsetDetector,
+}
+
+##############################################################################################################
+def create_onset_detector(engine_name: str, sample_rate: int, frames_per_block: int, channels: int = 1):
+    engine_class = DETECTION_ENGINES.get(engine_name, RmsOnsetDetector)
+    return engine_class(sample_rate, frames_per_block, channels)
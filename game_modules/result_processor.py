@@ -1,40 +1,80 @@
 import cv2 as cv
 import os
+import time
 from datetime import datetime
 import PySimpleGUI as sg
 
 from game_modules.app_configuration import AppConfig
+from game_modules.image_writer import ImageWriterPool, read_image
+from game_modules.image_frame import ImageFrame
+from game_modules.extraction_pipeline import ExtractionPipeline
+from game_modules.match_location_cache import MatchLocationCache
+from game_modules.arrow_scorer import ArrowHitScorer
+from game_modules.target_faces import TargetFaceLibrary
+from game_modules.thumbnail_cache import ThumbnailCache
+from game_modules.annotation_store import AnnotationStore, render_overlay
+from game_modules.result_store import ResultStore, StoreColumn
 
 ###################################################################################################################
 ###################################################################################################################
 ###################################################################################################################
+## The result classes are views on the ResultStore of the session, the values are kept in its arrays
 class ArrowResult:
-    def __init__(self):
-        self.cam_image = ""
-        self.crop_image = AppConfig.CFG_NO_HIT_MISS_IMAGE_FILE
-        self.auto_points = 0
-        self.manual_points = 0
-        self.final_points = 0
+    cam_image = StoreColumn()
+    crop_image = StoreColumn()
+    auto_points = StoreColumn()
+    auto_confidence = StoreColumn()       # 0..1 of the automatic scoring, -1 if not scored
+    auto_hit_point = StoreColumn()        # (x, y) of the arrow tip in the crop image
+    needs_review = StoreColumn()          # the automatic points should be checked manually, or the arrow could not be scored
+    manual_points = StoreColumn()
+    final_points = StoreColumn()
+    ## impact timing, -1 if unknown
+    video_file = StoreColumn()
+    audio_clip = StoreColumn()
+    impact_sample = StoreColumn()         # absolute audio sample index of the impact onset
+    impact_time = StoreColumn()           # time.monotonic() of the impact onset
+    video_time_ms = StoreColumn()         # playback position of the video at the impact
+    detection_latency_ms = StoreColumn()  # impact onset -> detected by the audio thread
+    handling_latency_ms = StoreColumn()   # detected -> handled by the game engine
+    extraction_timings = StoreColumn()    # ms per stage of the target extraction
+
+    def __init__(self, store: ResultStore = None, index: tuple = (0, 0, 0)):
+        # without a store the arrow has one of its own
+        self.store = ResultStore([""], [""], 1, {"crop_image": AppConfig.CFG_NO_HIT_MISS_IMAGE_FILE}) if store is None else store
+        self.index = index
         return
 
     def to_str(self) -> str:  
         text =  "         |> Camera image        = [{}]\n".format(self.cam_image)
         text += "         |> Crop image          = [{}]\n".format(self.crop_image)
         text += "         |> Automatic points    = [{}]\n".format(self.auto_points)
+        text += "         |> Automatic scoring   = [hit {}, confidence {:.2f}, review {}]\n".format(self.auto_hit_point, self.auto_confidence, self.needs_review)
         text += "         |> Manually set points = [{}]\n".format(self.manual_points)
         text += "         |> Final points        = [{}]\n".format(self.final_points)
+        text += "         |> Video file          = [{}]\n".format(self.video_file)
+        text += "         |> Audio clip          = [{}]\n".format(self.audio_clip)
+        text += "         |> Video time ms       = [{}]\n".format(self.video_time_ms)
+        text += "         |> Impact sample       = [{}]\n".format(self.impact_sample)
+        text += "         |> Impact time         = [{:.4f}]\n".format(self.impact_time)
+        text += "         |> Latency ms          = [detection {:.1f}, handling {:.1f}]\n".format(self.detection_latency_ms, self.handling_latency_ms)
+        text += "         |> Extraction ms       = [{}]\n".format(self.extraction_timings)
         return text
 
 ###################################################################################################################
 ###################################################################################################################
 ###################################################################################################################
 class GameResult:
-    def __init__(self):
-        self.game_name = ""
-        self.game_total_points = 0
-        self.arrow_results = [] # an index based array
+    def __init__(self, store: ResultStore, shooter_i: int, game_i: int):
+        self.store = store
+        self.index = (shooter_i, game_i)
+        self.game_name = store.game_names[game_i]
+        self.arrow_results = [ArrowResult(store, (shooter_i, game_i, arrow_i)) for arrow_i in range(0, store.arrows_per_game)] # an index based array
         return
 
+    @property
+    def game_total_points(self) -> int:
+        return int(self.store.game_totals[self.index])
+
     def to_str(self) -> str:    
         text =  "   #> Game name = [{}]\n".format(self.game_name)
         text += "      |> Game total points = [{}]\n".format(self.game_total_points)
@@ -49,12 +89,21 @@ class GameResult:
 ###################################################################################################################
 ###################################################################################################################
 class ShooterResult:
-    def __init__(self):
-        self.shooter_name = ""
-        self.shooter_total_points = 0
-        self.game_results = {} # a dictonary
+    def __init__(self, store: ResultStore, shooter_i: int):
+        self.store = store
+        self.index = shooter_i
+        self.shooter_name = store.shooter_names[shooter_i]
+        self.game_results = {game_name: GameResult(store, shooter_i, game_i) for game_i, game_name in enumerate(store.game_names)} # a dictonary
         return
 
+    @property
+    def shooter_total_points(self) -> int:
+        return int(self.store.shooter_totals[self.index])
+
+    @property
+    def shooter_rank(self) -> int:
+        return int(self.store.get_ranks()[self.index])
+
     def to_str(self) -> str:   
         text =  " # Shooter: [{}]\n".format(self.shooter_name)
         text += "   |> shooter total points = [{}]\n".format(self.shooter_total_points)
@@ -70,24 +119,35 @@ class SessionResult:
         self.session_id = ""
         self.cam_image_dir = ""
         self.result_dir = ""
-        self.total_arrows = 0
+        self.store = ResultStore([], [], 0)
         self.shooter_results = {} # a dictonary
         return
     
+    ## New store for the shooters and games of a session, with the views on it
+    def init(self, list_shooter_names, list_game_names, arrows_per_game: int):
+        self.store = ResultStore(list_shooter_names, list_game_names, arrows_per_game, {"crop_image": AppConfig.CFG_NO_HIT_MISS_IMAGE_FILE})
+        self.shooter_results = {shooter_name: ShooterResult(self.store, shooter_i) for shooter_i, shooter_name in enumerate(self.store.shooter_names)}
+        return
+
     def clear(self):
         self.session_id = ""
         self.cam_image_dir = ""
         self.result_dir = ""
-        self.total_arrows = 0
-        self.shooter_results.clear()
+        self.init([], [], 0)
         return
 
+    @property
+    def total_arrows(self) -> int:
+        return self.store.get_arrow_count()
+
     def to_str(self) -> str:
         text =  "BOGEN KINO - SESSION RESULTS DATA RECORD\n"
         text += " | Session ID             = [{}]\n".format(self.session_id)
         text += " | Camera image directory = [{}]\n".format(self.cam_image_dir)
         text += " | Result directory       = [{}]\n".format(self.result_dir)
         text += " | Session total arrows   = [{}]\n".format(self.total_arrows)
+        text += " | Ranking                = [{}]\n".format(", ".join(["{}. {} {}".format(self.store.get_ranks()[i], self.store.shooter_names[i],
+            self.store.shooter_totals[i]) for i in self.store.get_ranking()]))
         for k, v in self.shooter_results.items():
             text += v.to_str()
         return text
@@ -98,26 +158,50 @@ class SessionResult:
 class ResultProcessor:
 
     ## Some constants for field names
+    ## The results window shows one shooter at a time, its fields are slots per game and arrow index that are
+    ## filled with the data of the shooter shown. The element metadata holds (shooter_name, game_name, arrow_index).
     MANUAL_ENTRY_FIELD_PREFIX  = "-INPUT_RESULTS_MANUAL_ARROW"
-    ARROW_SCORE_FIELD_TEMPLATE = "-OUTPUT_ARROW_FINAL_SCORE_{}_{}_{}-" #.format(shooter_name, game_name, arrow_index)
-    GAME_SUM_FIELD_TEMPLATE    = "-OUTPUT_RESULTS_GAME_POINTS_{}_{}-"  #.format(shooter_name, game_name)
-    SHOOTER_SUM_FIELD_TEMPLATE = "-OUTPUT_RESULTS_SHOOTER_POINTS_{}-"  #.format(shooter_name)    
+    VIEW_SHOT_FIELD_PREFIX     = "-INPUT_RESULTS_VIEW_SHOT"
+    SHOW_SHOOTER_FIELD_PREFIX  = "-BUTTON_RESULTS_SHOW_SHOOTER"
+    ARROW_AUTO_FIELD_TEMPLATE  = "-OUTPUT_ARROW_AUTO_SCORE_{}_{}-"   #.format(game_index, arrow_index)
+    ARROW_SCORE_FIELD_TEMPLATE = "-OUTPUT_ARROW_FINAL_SCORE_{}_{}-"  #.format(game_index, arrow_index)
+    GAME_NAME_FIELD_TEMPLATE   = "-OUTPUT_RESULTS_GAME_NAME_{}-"     #.format(game_index)
+    GAME_SUM_FIELD_TEMPLATE    = "-OUTPUT_RESULTS_GAME_POINTS_{}-"   #.format(game_index)
+    SHOOTER_FRAME_FIELD        = "-OUTPUT_RESULTS_SHOOTER_FRAME-"
+    THUMBNAIL_READY_EVENT      = "-RESULTS_THUMBNAIL_READY-"        # value (image_file, PNG bytes)
     
-    ## default data for the image template matching
-    template_img = cv.imread("./pattern_img/target_template.png", cv.IMREAD_COLOR)
-    mask_img = cv.imread("./pattern_img/target_mask.png", cv.IMREAD_COLOR)
-    match_method = cv.TM_CCORR_NORMED  #match_method = cv.TM_SQDIFF
-
     ##########################################################################################
     ## 
-    def __init__(self):
+    def __init__(self, image_writer: ImageWriterPool):
         sg.cprint("{} - TRACE: Initializing class {}.".format(datetime.now(), self.__class__))
 
+        # the target faces that can be used, the one of a session is identified from its first shot
+        self.face_library = TargetFaceLibrary()
+        self.target_face = self.face_library.get(AppConfig.CFG_TARGET_FACE)
+        if self.target_face is None:
+            self.target_face = self.face_library.get(TargetFaceLibrary.DEFAULT_FACE)
+        self.face_identified = False
+
+        # images are written in the background, the target extraction runs in worker processes
+        self.image_writer = image_writer
+        self.extraction_pipeline = ExtractionPipeline(None, self.target_face.template_file, self.target_face.mask_file, self.target_face.name)
+        self.extraction_jobs = {} # (shooter_name, game_name, arrow_index) -> future
+        self.reference_jobs = {}  # (shooter_name, game_name) -> future, the target before the first arrow
+        # the arrows are scored automatically from the crops, with the zones of the target face
+        self.arrow_scorer = ArrowHitScorer(self.target_face.get_zone_map())
+        # the results window shows small pictures of the crops, made as soon as a crop is there
+        self.thumbnail_cache = ThumbnailCache()
+        # the search for the target starts where it was found last time
+        self.match_cache = MatchLocationCache(AppConfig.CFG_MATCH_LOCATION_CACHE_FILE)
+
         # The actual session Data
         self.session_results = SessionResult()
+        # match and scoring data of the camera pictures, the pictures are not changed
+        self.annotations = None
 
-        # Init window data
+        # Init window data, the window shows one shooter at a time
         self.result_window = None
+        self.result_shooter = None
 
         return
 
@@ -129,34 +213,19 @@ class ResultProcessor:
         sg.cprint("{} - TRACE: {}.init_session_results(list_shooter_names = {}, list_game_names = {}, session_id = {}, cam_image_dir = {}, result_dir = {})".format(datetime.now(), self.__class__, 
             list_shooter_names, list_game_names, session_id, cam_image_dir, result_dir))
 
-        total_arrow_cout = 0
-
         # Make sure the results dir exists
         if os.path.exists(result_dir) is False:
             os.mkdir(result_dir)
 
-        # Set the base data
+        # Set the base data, a configured target face needs no identification
+        self.face_identified = AppConfig.CFG_TARGET_FACE != "auto" and self.face_library.get(AppConfig.CFG_TARGET_FACE) is not None
+        self.annotations = AnnotationStore("{}/{}_annotations.json".format(result_dir, session_id), session_id)
         self.session_results.session_id = session_id
         self.session_results.cam_image_dir = cam_image_dir
         self.session_results.result_dir = result_dir
 
-        # Build the inital result set with correct amount of array elements
-        for shooter in list_shooter_names:
-            # Add a shooter to session results
-            self.session_results.shooter_results[shooter] = ShooterResult()
-            self.session_results.shooter_results[shooter].shooter_name = shooter
-
-            for game in list_game_names:
-                # Add a game to the shooter results
-                self.session_results.shooter_results[shooter].game_results[game] = GameResult()
-                self.session_results.shooter_results[shooter].game_results[game].game_name = game
-
-                for i in range (0, AppConfig.CFG_ARROWS_PER_PLAYER):
-                    # add arrows to the game
-                    total_arrow_cout += 1
-                    self.session_results.shooter_results[shooter].game_results[game].arrow_results.append(ArrowResult())
-
-        self.session_results.total_arrows = total_arrow_cout
+        # Build the inital result set, one array element per arrow
+        self.session_results.init(list_shooter_names, list_game_names, AppConfig.CFG_ARROWS_PER_PLAYER)
         return
 
     ##########################################################################################
@@ -164,13 +233,28 @@ class ResultProcessor:
     """ 
     def clear_results(self):
         self.session_results.clear()       
+        self.annotations = None
+        self.face_identified = False
+        self.extraction_jobs.clear()
+        self.reference_jobs.clear()
         return
 
     ##########################################################################################
-    """ This function allows to register an image for an arrow result, it will process the image directly
+    """ Stops the extraction workers, when the app closes.
+    """ 
+    def close(self):
+        sg.cprint("{} - TRACE: {}.close()".format(datetime.now(), self.__class__))
+        self.extraction_pipeline.stop()
+        self.thumbnail_cache.stop()
+        self.match_cache.save()
+        return
+
+    ##########################################################################################
+    """ This function allows to register an image for an arrow result, it will process the image directly from memory.
         Parameter arrow_nr must be between 1 and ARROWS_PER_GAME.
     """ 
-    def process_arrow_cam_shot(self, shooter_name: str, game_name: str, arrow_nr: int, cam_shot_image_file: str) -> bool:
+    def process_arrow_cam_shot(self, shooter_name: str, game_name: str, arrow_nr: int, cam_shot: ImageFrame) -> bool:
+        cam_shot_image_file = os.path.basename(cam_shot.image_file)
         sg.cprint("{} - TRACE: {}.process_arrow_cam_shot(shooter_name = {}, game_name = {}, arrow_nr = {}, cam_shot_image_file = {})".format(datetime.now(), self.__class__, 
             shooter_name, game_name, arrow_nr, cam_shot_image_file))
 
@@ -195,93 +279,189 @@ class ResultProcessor:
 
         # Ok, not is save to directly manipulate
         sg.cprint("{} - DEBUG: Processing camera image for shooter [{}] in game [{}] on arrow with image [{}]... ".format(datetime.now(), shooter_name, game_name, cam_shot_image_file))
-        ## Extract the target piece from the original image and store in results folder
-        input_image_file = "{}/{}".format(self.session_results.cam_image_dir, cam_shot_image_file)
-        output_image_file = "{}/{}".format(self.session_results.result_dir, cam_shot_image_file)
+        ## Extract the target piece from the original image and store in results folder, always as PNG for the result window
+        output_image_file = "{}/{}.png".format(self.session_results.result_dir, os.path.splitext(cam_shot_image_file)[0])
 
-        self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results[arrow_nr - 1].cam_image = input_image_file
+        self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results[arrow_nr - 1].cam_image = cam_shot.image_file if cam_shot.stored else ""
         self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results[arrow_nr - 1].crop_image = output_image_file
 
-        self.extract_target_from_image(input_image_file, output_image_file)
+        self.extraction_jobs[(shooter_name, game_name, arrow_nr - 1)] = self.extract_target_from_image(cam_shot, output_image_file)
 
         return True
 
     ##########################################################################################
-    ##
-    def extract_target_from_image(self, source_image_file: str, output_file: str):
+    """ Registers the picture of the target before the first arrow of a shooter in a game, it is the baseline
+        for scoring the first arrow. The picture is processed in the background and not stored.
+    """ 
+    def process_reference_shot(self, shooter_name: str, game_name: str, reference_shot: ImageFrame) -> bool:
+        sg.cprint("{} - TRACE: {}.process_reference_shot(shooter_name = {}, game_name = {})".format(datetime.now(), self.__class__, shooter_name, game_name))
 
-        sg.cprint("{} - TRACE: {}.extract_target_from_image(source_image_file = {}, output_file = {})".format(datetime.now(), self.__class__, source_image_file, output_file))
-        # Load source file
-        source_img = cv.imread(source_image_file, cv.IMREAD_COLOR)
+        if reference_shot is None:
+            return False
 
-        # Perform match operations.
-        
-        result = cv.matchTemplate(source_img, self.template_img, self.match_method, mask = self.mask_img) 
-
-        ## [normalize]
-        cv.normalize( result, result, 0, 1, cv.NORM_MINMAX, -1 )
-
-        ## [best_match]
-        _minVal, _maxVal, minLoc, maxLoc = cv.minMaxLoc(result, None)
-
-         ## [match_loc]
-        if (self.match_method == cv.TM_SQDIFF):
-            matchLoc = minLoc
-        else:
-            matchLoc = maxLoc
-            
-        ## Draw an rectangle to the original image
-        cv.rectangle(source_img, matchLoc, (matchLoc[0] + self.template_img.shape[0], matchLoc[1] + self.template_img.shape[1]), (0,0,0), 2, 8, 0 )
-        cv.imwrite(source_image_file, source_img)
-        
-        rows_start = matchLoc[1]
-        rows_stop = rows_start + self.template_img.shape[1]
-        cols_start = matchLoc[0]
-        cols_stop = cols_start + self.template_img.shape[0]
-        # [rows, columns]
-        cropped_img = source_img[rows_start:rows_stop, cols_start:cols_stop]
+        self.reference_jobs[(shooter_name, game_name)] = self.extract_target_from_image(reference_shot, "")
+        return True
+
+    ##########################################################################################
+    """ Stores the timing of an arrow impact, to be correlated with the video.
+        Parameter arrow_nr must be between 1 and ARROWS_PER_GAME.
+    """ 
+    def register_arrow_impact(self, shooter_name: str, game_name: str, arrow_nr: int, video_file: str, video_time_ms: int, 
+        impact_sample: int, impact_time: float, detection_latency_ms: float, handling_latency_ms: float, audio_clip: str = "") -> bool:
+        sg.cprint("{} - TRACE: {}.register_arrow_impact(shooter_name = {}, game_name = {}, arrow_nr = {}, video_time_ms = {})".format(datetime.now(), self.__class__, 
+            shooter_name, game_name, arrow_nr, video_time_ms))
+
+        ## Check input
+        if arrow_nr < 1 or arrow_nr > AppConfig.CFG_ARROWS_PER_PLAYER:
+            sg.cprint("{} - ERROR: Cannot register impact for arrow nr {}, must be between 1 and {}.".format(datetime.now(), arrow_nr, AppConfig.CFG_ARROWS_PER_PLAYER))
+            return False
+
+        shooter_rec = self.session_results.shooter_results.get(shooter_name, None)
+        game_rec = None if shooter_rec is None else shooter_rec.game_results.get(game_name, None)
+        if (game_rec is None):
+            # NOT FOUND
+            sg.cprint("{} - ERROR: Cannot register impact for shooter [{}] in game [{}]. Could not find a matching entry!!".format(datetime.now(), shooter_name, game_name))
+            return False
+
+        arrow_rec = game_rec.arrow_results[arrow_nr - 1]
+        arrow_rec.video_file = video_file
+        arrow_rec.video_time_ms = video_time_ms
+        arrow_rec.impact_sample = impact_sample
+        arrow_rec.impact_time = impact_time
+        arrow_rec.detection_latency_ms = detection_latency_ms
+        arrow_rec.handling_latency_ms = handling_latency_ms
+        arrow_rec.audio_clip = audio_clip
+
+        return True
+
+    ##########################################################################################
+    ## Hands the picture to the extraction workers, returns the future of the job
+    def extract_target_from_image(self, source: ImageFrame, output_file: str):
+
+        sg.cprint("{} - TRACE: {}.extract_target_from_image(source_image_file = {}, output_file = {})".format(datetime.now(), self.__class__, source.image_file, output_file))
+        # The source is shared read-only, e.g. with the image writer
+        if self.face_identified is False:
+            self.identify_target_face(source)
+        face_name = self.target_face.name
+        hint_loc = self.match_cache.get(source.camera_id, face_name, self.session_results.session_id) if source.camera_id != "" else None
+        future = self.extraction_pipeline.submit(source.to_bgr(), output_file, hint_loc, source.camera_id)
+        future.add_done_callback(lambda f: self.on_extraction_done(f, source, face_name))
 
-        # Write to target file
-        cv.imwrite(output_file, cropped_img)
+        return future
 
+    ##########################################################################################
+    ## Finds out which target face of the library is on the first shot of a session and uses it for the rest of
+    ## the session: the extraction workers and the scorer are switched if it is not the face used so far.
+    def identify_target_face(self, source: ImageFrame):
+        sg.cprint("{} - TRACE: {}.identify_target_face(source_image_file = {})".format(datetime.now(), self.__class__, source.image_file))
+
+        t = time.monotonic()
+        face, scores = self.face_library.identify(source.to_bgr())
+        sg.cprint("{} - INFO: Target face [{}] identified in {:.1f} ms, scores: {}".format(datetime.now(), face.name, (time.monotonic() - t) * 1000.0,
+            ", ".join(["{} {:.3f}".format(name, score) for name, score in scores.items()])))
+
+        if face.name != self.target_face.name:
+            self.target_face = face
+            self.extraction_pipeline.set_target_face(face.template_file, face.mask_file, face.name)
+            self.arrow_scorer = ArrowHitScorer(face.get_zone_map())
+        self.face_identified = True
         return
 
     ##########################################################################################
-    ##
-    def calculate_results(self):
-        sg.cprint("{} - TRACE: {}.calculate_results()".format(datetime.now(), self.__class__))
+    ## Called from the pipeline when a job is done, not on the GUI thread
+    def on_extraction_done(self, future, source: ImageFrame, face_name: str):
+        if future.exception() is not None:
+            return
+
+        result = future.result()
+        self.thumbnail_cache.request(result.output_file, result.crop_img)
+        if source.camera_id != "" and result.score is not None and result.score >= AppConfig.CFG_MATCH_ROI_MIN_SCORE:
+            self.match_cache.update(source.camera_id, face_name, result.match_loc, result.score, self.session_results.session_id)
+        return
 
-        arrow_points = 0
-        game_points = 0
-        shooter_points = 0
+    ##########################################################################################
+    ## Waits for the extraction jobs that are not done yet and stores their timings
+    def collect_extraction_results(self):
+        sg.cprint("{} - TRACE: {}.collect_extraction_results()".format(datetime.now(), self.__class__))
+
+        self.extraction_pipeline.wait_for(list(self.extraction_jobs.values()) + list(self.reference_jobs.values()))
+
+        for (shooter_name, game_name, arrow_index), future in self.extraction_jobs.items():
+            arrow_rec = self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results[arrow_index]
+            if future.exception() is not None:
+                sg.cprint("{} - ERROR: Target extraction failed for shooter [{}] in game [{}] on arrow with index [{}]. E = {}".format(datetime.now(), shooter_name, game_name, arrow_index, future.exception()))
+                arrow_rec.crop_image = AppConfig.CFG_NO_HIT_MISS_IMAGE_FILE
+                arrow_rec.needs_review = True
+                continue
+
+            arrow_rec.extraction_timings = future.result().timings_to_str()
+            self.annotations.update(shooter_name, game_name, arrow_index + 1, cam_image = arrow_rec.cam_image, crop_image = arrow_rec.crop_image,
+                face = self.target_face.name,
+                bbox = [int(future.result().match_loc[0]), int(future.result().match_loc[1]), self.target_face.get_size()[0], self.target_face.get_size()[1]],
+                score = future.result().score, roi_hit = future.result().roi_hit, timings = future.result().timings, method = future.result().method,
+                homography = future.result().homography.tolist() if future.result().homography is not None else None)
+            sg.cprint("{} - DEBUG: Target extraction for shooter [{}] in game [{}] on arrow with index [{}] (score {}, found near last location {}) took ms: {}".format(datetime.now(), 
+                shooter_name, game_name, arrow_index, future.result().score, future.result().roi_hit, arrow_rec.extraction_timings))
+
+        self.match_cache.save()
+        self.score_arrows()
+        self.annotations.save()
+        return
 
-        for shooter_i, shooter_name in enumerate(self.session_results.shooter_results):
+    ##########################################################################################
+    ## Scores every arrow against the crop before it: the reference picture for the first arrow, then the
+    ## previous arrow of the same shooter and game. Each game is scored with one zone map lookup. The manual
+    ## points start with the automatic ones and follow them as long as they were not corrected by hand. Arrows
+    ## that were shot but can not be scored are marked for review.
+    def score_arrows(self):
+        sg.cprint("{} - TRACE: {}.score_arrows()".format(datetime.now(), self.__class__))
 
-            for game_i, game_name in enumerate(self.session_results.shooter_results[shooter_name].game_results):
+        for shooter_name, shooter_rec in self.session_results.shooter_results.items():
+            for game_name, game_rec in shooter_rec.game_results.items():
+
+                crops = [self.get_job_crop(self.reference_jobs.get((shooter_name, game_name), None))]
+                for arrow_index in range(0, len(game_rec.arrow_results)):
+                    crops.append(self.get_job_crop(self.extraction_jobs.get((shooter_name, game_name, arrow_index), None)))
+
+                for arrow_index, arrow_score in enumerate(self.arrow_scorer.score_series(crops)):
+                    arrow_rec = game_rec.arrow_results[arrow_index]
+                    if arrow_score is None:
+                        # shot, but without a crop or one before it to compare with: only scored by hand
+                        arrow_rec.needs_review = (shooter_name, game_name, arrow_index) in self.extraction_jobs
+                        continue
+                    # a correction by hand is kept when the arrows are scored again
+                    if arrow_rec.manual_points == arrow_rec.auto_points:
+                        arrow_rec.manual_points = arrow_score.points
+                    arrow_rec.auto_points = arrow_score.points
+                    arrow_rec.auto_confidence = arrow_score.confidence
+                    arrow_rec.auto_hit_point = arrow_score.hit_point
+                    arrow_rec.needs_review = arrow_score.needs_review
+                    self.annotations.update(shooter_name, game_name, arrow_index + 1, hit_point = arrow_score.hit_point, auto_points = arrow_score.points,
+                        confidence = arrow_score.confidence, needs_review = arrow_score.needs_review)
+                    sg.cprint("{} - DEBUG: Automatic score for shooter [{}] in game [{}] on arrow with index [{}]: {}".format(datetime.now(), 
+                        shooter_name, game_name, arrow_index, arrow_score.to_str()))
 
-                for arrow_i, arrow_rec in enumerate(self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results):
-                    
-                    if arrow_rec.manual_points != arrow_rec.auto_points:
-                        arrow_points = arrow_rec.manual_points
-                    else:
-                        arrow_points = arrow_rec.auto_points
+        return
 
-                    # Update arrow final points
-                    sg.cprint("{} - DEBUG: Using result for shooter [{}] in game [{}] for arrow # [{}] -> score = [{}]... ".format(datetime.now(), shooter_name, game_name, arrow_i + 1, arrow_points))
-                    self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results[arrow_i].final_points = arrow_points
-                    game_points += arrow_points
-                    arrow_points = 0
+    ##########################################################################################
+    ## Crop of a finished extraction job, None if there is no job or it failed
+    @staticmethod
+    def get_job_crop(future):
+        if future is None or future.done() is False or future.exception() is not None:
+            return None
+        return future.result().crop_img
 
-                # Update game
-                sg.cprint("{} - DEBUG: Calculated result for shooter [{}] in game [{}] with total game score = [{}]... ".format(datetime.now(), shooter_name, game_name, game_points))
-                self.session_results.shooter_results[shooter_name].game_results[game_name].game_total_points = game_points
-                shooter_points += game_points
-                game_points = 0
+    ##########################################################################################
+    ##
+    def calculate_results(self):
+        sg.cprint("{} - TRACE: {}.calculate_results()".format(datetime.now(), self.__class__))
 
-            # Update Shooter
-            sg.cprint("{} - DEBUG: Calculated result for shooter [{}] total session score = [{}]... ".format(datetime.now(), shooter_name, game_name, shooter_points))
-            self.session_results.shooter_results[shooter_name].shooter_total_points = shooter_points
-            shooter_points = 0
+        # all arrows, games and shooters at once, one log line for all of them
+        store = self.session_results.store
+        store.calculate()
+        ranks = store.get_ranks()
+        sg.cprint("{} - DEBUG: Calculated results, ranking: {}".format(datetime.now(), ", ".join(["{}. {} {} {}".format(ranks[i], store.shooter_names[i], 
+            store.shooter_totals[i], store.game_totals[i].tolist()) for i in store.get_ranking()])))
 
         return
 
@@ -290,50 +470,48 @@ class ResultProcessor:
     def show_result_window(self):
         sg.cprint("{} - TRACE: {}.show_result_window()".format(datetime.now(), self.__class__))
 
-        ## First calculate results
+        ## The window shows the crops only, wait for the jobs still writing one. This also scores the arrows.
+        self.collect_extraction_results()
+
+        ## Then calculate results, from the scored arrows
         self.calculate_results()
 
         ## Build the Screen
-        sg.cprint("{} - DEBUG: Will now render the result screen for our result set:".format(datetime.now()))
-        sg.cprint(self.session_results.to_str())
+        # the full result set is written to the result file when the window is closed
+        sg.cprint("{} - DEBUG: Will now render the result screen for {} shooters.".format(datetime.now(), len(self.session_results.shooter_results)))
 
         result_win_layout = [ 
             [sg.Text("Ergebnisse für die Session {}".format(self.session_results.session_id)), sg.Push(background_color = "yellow")],
             [sg.HorizontalSeparator()],
+            [sg.Button("{}. {}: {} Punkte".format(shooter_rec.shooter_rank, shooter_name, shooter_rec.shooter_total_points), key = "{}_{}-".format(self.SHOW_SHOOTER_FIELD_PREFIX, shooter_index), 
+                metadata = shooter_name) for shooter_index, (shooter_name, shooter_rec) in enumerate(self.session_results.shooter_results.items())],
             [sg.Text("   Spiel", size = (22, 2)), sg.Text("Pfeil 1", size = (31, 2)), sg.Text("Pfeil 2", size = (31, 2)), sg.Text("Pfeil 3", size = (31, 2)), sg.Text("Punkte Spiel", size = (12, 2))]
          ]
 
-        main_column_layout = []
-        for shooter_name, shooter_rec in self.session_results.shooter_results.items():
-            shooter_frame_layout = []
-
-            for game_name, game_rec in self.session_results.shooter_results[shooter_name].game_results.items():
-
-                allowed_point_values = [AppConfig.CFG_POINTS_YELLOW, AppConfig.CFG_POINTS_RED, AppConfig.CFG_POINTS_WHITE, AppConfig.CFG_POINTS_MISS]
-                game_frame_layout_line = [sg.Text(game_name, size = (20, 1))]
-                
-                for arrow_index in range(0, len(self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results)):
-
-                    point_frame = [
-                        [sg.Text("Auto-P: {}".format(game_rec.arrow_results[arrow_index].auto_points), size = (16, 1), text_color = "gray")],
-                        [sg.Text("Man. Punkte:", text_color = "gray"), 
-                        sg.Combo(allowed_point_values, game_rec.arrow_results[arrow_index].manual_points, size = (3, 1), enable_events = True, 
-                            key = "{}_{}_{}_{}-".format(self.MANUAL_ENTRY_FIELD_PREFIX, arrow_index, shooter_name, game_name), metadata = (shooter_name, game_name, arrow_index))],
-                        [sg.Text("Punkte: {}".format(game_rec.arrow_results[arrow_index].final_points), size = (20, 1), key = self.ARROW_SCORE_FIELD_TEMPLATE.format(shooter_name, game_name, arrow_index))]
-                    ]
-                    game_frame_layout_line.append(sg.Image(source = game_rec.arrow_results[arrow_index].crop_image, subsample = 2))
-                    game_frame_layout_line.append(sg.Frame("", layout = point_frame, border_width = 0, vertical_alignment = "top"))
-
-                game_frame_layout_line.append(sg.Text("{}".format(game_rec.game_total_points), auto_size_text = True, size = (12, 1), key = self.GAME_SUM_FIELD_TEMPLATE.format(shooter_name, game_name)))
-
-                game_frame_layout = [game_frame_layout_line]
-                shooter_frame_layout.append([sg.Frame("", layout = game_frame_layout, border_width = 0, expand_x = True, vertical_alignment = "top")])
-
-            frame_title = "{}: {} Punkte".format(shooter_name, shooter_rec.shooter_total_points)
-            main_column_layout.append([
-                sg.Frame(frame_title, title_color = "red", layout = shooter_frame_layout, title_location = sg.TITLE_LOCATION_TOP_LEFT, font = ("Arial", 16, "bold"), border_width = 2, expand_x = True, vertical_alignment = "top", 
-                    key = self.SHOOTER_SUM_FIELD_TEMPLATE.format(shooter_name))
-            ])    
+        ## Only the fields of one shooter are built, all shooters have the same games
+        allowed_point_values = [AppConfig.CFG_POINTS_YELLOW, AppConfig.CFG_POINTS_RED, AppConfig.CFG_POINTS_WHITE, AppConfig.CFG_POINTS_MISS]
+        shooter_frame_layout = []
+        for game_index in range(0, len(self.session_results.store.game_names)):
+
+            game_frame_layout_line = [sg.Text("", size = (20, 1), key = self.GAME_NAME_FIELD_TEMPLATE.format(game_index))]
+            for arrow_index in range(0, self.session_results.store.arrows_per_game):
+                point_frame = [
+                    [sg.Text("", size = (20, 1), key = self.ARROW_AUTO_FIELD_TEMPLATE.format(game_index, arrow_index))],
+                    [sg.Text("Man. Punkte:", text_color = "gray"), 
+                    sg.Combo(allowed_point_values, None, size = (3, 1), enable_events = True, 
+                        key = "{}_{}_{}-".format(self.MANUAL_ENTRY_FIELD_PREFIX, arrow_index, game_index))],
+                    [sg.Text("", size = (20, 1), key = self.ARROW_SCORE_FIELD_TEMPLATE.format(game_index, arrow_index))]
+                ]
+                game_frame_layout_line.append(sg.Image(data = None, enable_events = True, key = "{}_{}_{}-".format(self.VIEW_SHOT_FIELD_PREFIX, arrow_index, game_index)))
+                game_frame_layout_line.append(sg.Frame("", layout = point_frame, border_width = 0, vertical_alignment = "top"))
+
+            game_frame_layout_line.append(sg.Text("", auto_size_text = True, size = (12, 1), key = self.GAME_SUM_FIELD_TEMPLATE.format(game_index)))
+            shooter_frame_layout.append([sg.Frame("", layout = [game_frame_layout_line], border_width = 0, expand_x = True, vertical_alignment = "top")])
+
+        main_column_layout = [[
+            sg.Frame("", title_color = "red", layout = shooter_frame_layout, title_location = sg.TITLE_LOCATION_TOP_LEFT, font = ("Arial", 16, "bold"), border_width = 2, expand_x = True, vertical_alignment = "top", 
+                key = self.SHOOTER_FRAME_FIELD)
+        ]]
         
         result_win_layout.append([sg.Column(main_column_layout, scrollable = True, vertical_scroll_only = True, expand_x = True, expand_y = True)])
         result_win_layout.append([sg.HorizontalSeparator()])
@@ -360,6 +538,84 @@ class ResultProcessor:
             disable_close = True
         )
         self.result_window.maximize()
+
+        ## Fill the fields with the first shooter
+        self.result_shooter = None
+        if len(self.session_results.shooter_results) > 0:
+            self.show_result_shooter(next(iter(self.session_results.shooter_results.keys())))
+        return
+
+    ##########################################################################################
+    """ Shows the results of a shooter in the results window, in the fields of the shooter shown before.
+    """ 
+    def show_result_shooter(self, shooter_name: str):
+        sg.cprint("{} - TRACE: {}.show_result_shooter(shooter_name = {})".format(datetime.now(), self.__class__, shooter_name))
+
+        shooter_rec = self.session_results.shooter_results.get(shooter_name, None)
+        if self.result_window is None or shooter_rec is None:
+            return
+        self.result_shooter = shooter_name
+
+        for shooter_index, other_name in enumerate(self.session_results.shooter_results.keys()):
+            self.result_window["{}_{}-".format(self.SHOW_SHOOTER_FIELD_PREFIX, shooter_index)].update(disabled = other_name == shooter_name)
+
+        placeholder_size = [v * AppConfig.CFG_THUMBNAIL_SCALE for v in self.target_face.get_size()]
+
+        for game_index, (game_name, game_rec) in enumerate(shooter_rec.game_results.items()):
+            self.result_window[self.GAME_NAME_FIELD_TEMPLATE.format(game_index)].update(value = game_name)
+
+            for arrow_index, arrow_rec in enumerate(game_rec.arrow_results):
+                auto_text = "Auto-P: {}".format(arrow_rec.auto_points)
+                if arrow_rec.auto_confidence >= 0:
+                    auto_text += " ({:.0f}%)".format(arrow_rec.auto_confidence * 100.0)
+                if arrow_rec.needs_review is True:
+                    auto_text += " PRÜFEN!"
+                self.result_window[self.ARROW_AUTO_FIELD_TEMPLATE.format(game_index, arrow_index)].update(value = auto_text, 
+                    text_color = "orange" if arrow_rec.needs_review else "gray")
+
+                manual_entry = self.result_window["{}_{}_{}-".format(self.MANUAL_ENTRY_FIELD_PREFIX, arrow_index, game_index)]
+                manual_entry.update(value = arrow_rec.manual_points)
+                manual_entry.metadata = (shooter_name, game_name, arrow_index)
+
+                # a thumbnail that is not ready yet replaces the placeholder when its job is done
+                arrow_image = self.result_window["{}_{}_{}-".format(self.VIEW_SHOT_FIELD_PREFIX, arrow_index, game_index)]
+                thumbnail = self.thumbnail_cache.get(arrow_rec.crop_image)
+                if thumbnail is None:
+                    thumbnail = self.thumbnail_cache.get_placeholder(placeholder_size)
+                    self.thumbnail_cache.request(arrow_rec.crop_image, on_ready = self.on_thumbnail_ready)
+                arrow_image.update(data = thumbnail)
+                arrow_image.metadata = (shooter_name, game_name, arrow_index)
+
+        # the thumbnails of the other shooters are made meanwhile, if they are not yet
+        for other_name, other_rec in self.session_results.shooter_results.items():
+            if other_name != shooter_name:
+                for game_rec in other_rec.game_results.values():
+                    for arrow_rec in game_rec.arrow_results:
+                        self.thumbnail_cache.request(arrow_rec.crop_image)
+
+        self.update_screen_point_sums()
+        return
+
+    ##########################################################################################
+    ## Called from the thumbnail cache when a requested thumbnail is done, not on the GUI thread: hands it over
+    ## to the event loop of the window
+    def on_thumbnail_ready(self, image_file: str, data: bytes):
+        result_window = self.result_window
+        if result_window is not None and data is not None:
+            result_window.write_event_value(self.THUMBNAIL_READY_EVENT, (image_file, data))
+        return
+
+    ##########################################################################################
+    ## Shows a finished thumbnail in the slots of the shooter shown that have its crop
+    def show_thumbnail(self, image_file: str, data: bytes):
+
+        shooter_rec = self.session_results.shooter_results.get(self.result_shooter, None)
+        if self.result_window is None or shooter_rec is None:
+            return
+        for game_index, game_rec in enumerate(shooter_rec.game_results.values()):
+            for arrow_index, arrow_rec in enumerate(game_rec.arrow_results):
+                if arrow_rec.crop_image == image_file:
+                    self.result_window["{}_{}_{}-".format(self.VIEW_SHOT_FIELD_PREFIX, arrow_index, game_index)].update(data = data)
         return
         
     ##########################################################################################
@@ -372,6 +628,8 @@ class ResultProcessor:
         f = open(file_name, "w")
         f.write(self.session_results.to_str())
         f.close()
+        if self.annotations is not None:
+            self.annotations.save()
 
         # Close the Window
         if self.result_window is not None:
@@ -380,6 +638,39 @@ class ResultProcessor:
 
         return
 
+    ##########################################################################################
+    """ Shows the camera picture of an arrow with the found target and the hit drawn in, the overlay is rendered only now.
+        Without a stored camera picture the crop is shown.
+    """ 
+    def show_arrow_shot(self, shooter_name: str, game_name: str, arrow_index: int):
+        sg.cprint("{} - TRACE: {}.show_arrow_shot(shooter_name = {}, game_name = {}, arrow_index = {})".format(datetime.now(), self.__class__, shooter_name, game_name, arrow_index))
+
+        annotation = self.annotations.get(shooter_name, game_name, arrow_index + 1) if self.annotations is not None else None
+        if annotation is None:
+            sg.cprint("{} - WARNING: No annotation for shooter [{}] in game [{}] on arrow with index [{}].".format(datetime.now(), shooter_name, game_name, arrow_index))
+            return False
+
+        on_crop = annotation.get("cam_image", "") == ""
+        image_file = annotation["crop_image"] if on_crop else annotation["cam_image"]
+        # the camera picture may still be in the writer queue
+        self.image_writer.wait_for([image_file])
+        image = read_image(image_file)
+        if image is None:
+            sg.cprint("{} - ERROR: Could not read [{}].".format(datetime.now(), image_file))
+            return False
+
+        overlay = render_overlay(image, annotation, on_crop)
+        screen_w, screen_h = sg.Window.get_screen_size()
+        scale = 3.0 if on_crop is True else min(1.0, 0.9 * screen_w / overlay.shape[1], 0.8 * screen_h / overlay.shape[0])
+        overlay = cv.resize(overlay, None, fx = scale, fy = scale, interpolation = cv.INTER_AREA if scale < 1.0 else cv.INTER_NEAREST)
+
+        text = "Score {} ({}), Treffer {}, Auto-P {}".format(annotation.get("score", None), annotation.get("method", ""), annotation.get("hit_point", None), annotation.get("auto_points", ""))
+        shot_window = sg.Window("{} - {} - Pfeil {}".format(shooter_name, game_name, arrow_index + 1), 
+            [[sg.Image(data = cv.imencode(".png", overlay)[1].tobytes())], [sg.Text(text)], [sg.Button("OK")]], 
+            modal = True, finalize = True, keep_on_top = True)
+        shot_window.read(close = True)
+        return True
+
     ##########################################################################################
     ##
     def update_manual_result(self, shooter_name: str, game_name: str, arrow_index: int, new_value: int):
@@ -405,11 +696,14 @@ class ResultProcessor:
             return False
 
         # Ok, not is save to directly manipulate
-        sg.cprint("{} - DEBUG: Processing manual update for shooter [{}] in game [{}] on arrow with index [{}]... ".format(datetime.now(), shooter_name, game_name, arrow_index))
+        sg.cprint("{} - DEBUG: Processing manual update for shooter [{}] in game [{}] on arrow with index [{}]: [{}] -> [{}]... ".format(datetime.now(), shooter_name, game_name, arrow_index, 
+            game_rec.arrow_results[arrow_index].manual_points, new_value))
 
         self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results[arrow_index].manual_points = new_value
 
-        # Recalculate and update the screen
+        # Recalculate and update the screen, only if a total changed
+        if len(self.session_results.store.get_outdated_shooters()) == 0:
+            return
         self.calculate_results()
         self.update_screen_point_sums()
 
@@ -420,22 +714,21 @@ class ResultProcessor:
     def update_screen_point_sums(self):
         sg.cprint("{} - TRACE: {}.update_screen_point_sums()".format(datetime.now(), self.__class__))
         
-        sg.cprint("{} - DEBUG: Will now re-render the result screen for our result set:".format(datetime.now()))
-        sg.cprint(self.session_results.to_str())
-
-        for shooter_name, shooter_rec in self.session_results.shooter_results.items():
+        ranks = self.session_results.store.get_ranks()
+        for shooter_index, (shooter_name, shooter_rec) in enumerate(self.session_results.shooter_results.items()):
             text = "{}: {} Punkte".format(shooter_name, shooter_rec.shooter_total_points)
-            shooter_score_field_name = self.SHOOTER_SUM_FIELD_TEMPLATE.format(shooter_name)
-            self.result_window[shooter_score_field_name].update(value = text)
+            self.result_window["{}_{}-".format(self.SHOW_SHOOTER_FIELD_PREFIX, shooter_index)].update(text = "{}. {}".format(ranks[shooter_index], text))
+            if shooter_name != self.result_shooter:
+                continue
 
-            for game_name, game_rec in self.session_results.shooter_results[shooter_name].game_results.items():
-                game_score_field_name = self.GAME_SUM_FIELD_TEMPLATE.format(shooter_name, game_name)
-                self.result_window[game_score_field_name].update(value = game_rec.game_total_points)
+            # only the shooter shown has fields
+            self.result_window[self.SHOOTER_FRAME_FIELD].update(value = text)
+            for game_index, game_rec in enumerate(shooter_rec.game_results.values()):
+                self.result_window[self.GAME_SUM_FIELD_TEMPLATE.format(game_index)].update(value = game_rec.game_total_points)
 
-                for arrow_i, arrow_rec in enumerate(self.session_results.shooter_results[shooter_name].game_results[game_name].arrow_results):
+                for arrow_i, arrow_rec in enumerate(game_rec.arrow_results):
                     text = "Punkte: {}".format(arrow_rec.final_points)
-                    arrow_score_field_name = self.ARROW_SCORE_FIELD_TEMPLATE.format(shooter_name, game_name, arrow_i) 
-                    self.result_window[arrow_score_field_name].update(value = text)
+                    self.result_window[self.ARROW_SCORE_FIELD_TEMPLATE.format(game_index, arrow_i)].update(value = text)
 
         self.result_window.refresh()
         return
@@ -448,40 +741,41 @@ if __name__ == "__main__":
     ct = datetime.now()
     session_id = "BogenKino-{:04d}-{:02d}-{:02d}_{:02d}-{:02d}".format(ct.year, ct.month, ct.day, ct.hour, ct.minute)
 
-    ip = ResultProcessor()
+    ip = ResultProcessor(ImageWriterPool())
+    cam_dir = "./cam_shots/2023-01-09_19-54"
     ip.init_session_results(["Hawkeye", "Micha", "Sebastian", "Martina"], ["Wiese", "Winterhaus"], session_id, "./cam_shots/2023-01-09_19-54", "./results/2023-01-09_19-54")
 
-    ip.process_arrow_cam_shot("Hawkeye", "Wiese", 1, "19-55-07_Wiese_Hawkeye.png")
-    ip.process_arrow_cam_shot("Hawkeye", "Wiese", 2, "19-55-18_Wiese_Hawkeye.png")
-    ip.process_arrow_cam_shot("Hawkeye", "Wiese", 3, "19-55-34_Wiese_Hawkeye.png")
+    ip.process_arrow_cam_shot("Hawkeye", "Wiese", 1, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-07_Wiese_Hawkeye.png")))
+    ip.process_arrow_cam_shot("Hawkeye", "Wiese", 2, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-18_Wiese_Hawkeye.png")))
+    ip.process_arrow_cam_shot("Hawkeye", "Wiese", 3, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-34_Wiese_Hawkeye.png")))
 
-    ip.process_arrow_cam_shot("Hawkeye", "Winterhaus", 1, "19-56-14_Winterhaus_Hawkeye.png")
-    ip.process_arrow_cam_shot("Hawkeye", "Winterhaus", 2, "19-56-32_Winterhaus_Hawkeye.png")
-    ip.process_arrow_cam_shot("Hawkeye", "Winterhaus", 3, "19-56-49_Winterhaus_Hawkeye.png")
+    ip.process_arrow_cam_shot("Hawkeye", "Winterhaus", 1, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-14_Winterhaus_Hawkeye.png")))
+    ip.process_arrow_cam_shot("Hawkeye", "Winterhaus", 2, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-32_Winterhaus_Hawkeye.png")))
+    ip.process_arrow_cam_shot("Hawkeye", "Winterhaus", 3, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-49_Winterhaus_Hawkeye.png")))
 
-    ip.process_arrow_cam_shot("Micha", "Wiese", 1, "19-55-07_Wiese_Micha.png")
-    ip.process_arrow_cam_shot("Micha", "Wiese", 2, "19-55-18_Wiese_Micha.png")
-    ip.process_arrow_cam_shot("Micha", "Wiese", 3, "19-55-34_Wiese_Micha.png")
+    ip.process_arrow_cam_shot("Micha", "Wiese", 1, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-07_Wiese_Micha.png")))
+    ip.process_arrow_cam_shot("Micha", "Wiese", 2, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-18_Wiese_Micha.png")))
+    ip.process_arrow_cam_shot("Micha", "Wiese", 3, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-34_Wiese_Micha.png")))
 
-    ip.process_arrow_cam_shot("Micha", "Winterhaus", 1, "19-56-14_Winterhaus_Micha.png")
-    ip.process_arrow_cam_shot("Micha", "Winterhaus", 2, "19-56-32_Winterhaus_Micha.png")
-    ip.process_arrow_cam_shot("Micha", "Winterhaus", 3, "19-56-49_Winterhaus_Micha.png")
+    ip.process_arrow_cam_shot("Micha", "Winterhaus", 1, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-14_Winterhaus_Micha.png")))
+    ip.process_arrow_cam_shot("Micha", "Winterhaus", 2, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-32_Winterhaus_Micha.png")))
+    ip.process_arrow_cam_shot("Micha", "Winterhaus", 3, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-49_Winterhaus_Micha.png")))
 
-    ip.process_arrow_cam_shot("Sebastian", "Wiese", 1, "19-55-07_Wiese_Micha.png")
-    ip.process_arrow_cam_shot("Sebastian", "Wiese", 2, "19-55-18_Wiese_Micha.png")
-    ip.process_arrow_cam_shot("Sebastian", "Wiese", 3, "19-55-34_Wiese_Micha.png")
+    ip.process_arrow_cam_shot("Sebastian", "Wiese", 1, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-07_Wiese_Micha.png")))
+    ip.process_arrow_cam_shot("Sebastian", "Wiese", 2, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-18_Wiese_Micha.png")))
+    ip.process_arrow_cam_shot("Sebastian", "Wiese", 3, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-34_Wiese_Micha.png")))
 
-    ip.process_arrow_cam_shot("Sebastian", "Winterhaus", 1, "19-56-14_Winterhaus_Micha.png")
-    ip.process_arrow_cam_shot("Sebastian", "Winterhaus", 2, "19-56-32_Winterhaus_Micha.png")
-    ip.process_arrow_cam_shot("Sebastian", "Winterhaus", 3, "19-56-49_Winterhaus_Micha.png")
+    ip.process_arrow_cam_shot("Sebastian", "Winterhaus", 1, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-14_Winterhaus_Micha.png")))
+    ip.process_arrow_cam_shot("Sebastian", "Winterhaus", 2, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-32_Winterhaus_Micha.png")))
+    ip.process_arrow_cam_shot("Sebastian", "Winterhaus", 3, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-49_Winterhaus_Micha.png")))
 
-    ip.process_arrow_cam_shot("Martina", "Wiese", 1, "19-55-07_Wiese_Micha.png")
-    ip.process_arrow_cam_shot("Martina", "Wiese", 2, "19-55-18_Wiese_Micha.png")
-    ip.process_arrow_cam_shot("Martina", "Wiese", 3, "19-55-34_Wiese_Micha.png")
+    ip.process_arrow_cam_shot("Martina", "Wiese", 1, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-07_Wiese_Micha.png")))
+    ip.process_arrow_cam_shot("Martina", "Wiese", 2, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-18_Wiese_Micha.png")))
+    ip.process_arrow_cam_shot("Martina", "Wiese", 3, ImageFrame.from_file("{}/{}".format(cam_dir, "19-55-34_Wiese_Micha.png")))
 
-    ip.process_arrow_cam_shot("Martina", "Winterhaus", 1, "19-56-14_Winterhaus_Micha.png")
-    ip.process_arrow_cam_shot("Martina", "Winterhaus", 2, "19-56-32_Winterhaus_Micha.png")
-    ip.process_arrow_cam_shot("Martina", "Winterhaus", 3, "19-56-49_Winterhaus_Micha.png")
+    ip.process_arrow_cam_shot("Martina", "Winterhaus", 1, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-14_Winterhaus_Micha.png")))
+    ip.process_arrow_cam_shot("Martina", "Winterhaus", 2, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-32_Winterhaus_Micha.png")))
+    ip.process_arrow_cam_shot("Martina", "Winterhaus", 3, ImageFrame.from_file("{}/{}".format(cam_dir, "19-56-49_Winterhaus_Micha.png")))
 
      # Set global Theme
     sg.theme('DarkAmber')
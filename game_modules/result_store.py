@@ -0,0 +1,103 @@
+import numpy as np
+
+##############################################################################################################
+## Columns of the store: name -> (dtype, value of an arrow that was not shot). Paths and hit points are kept as
+## objects, all other values as numbers.
+RESULT_COLUMNS = {
+    "cam_image":            (object, ""),
+    "crop_image":           (object, ""),
+    "auto_points":          (np.int16, 0),
+    "auto_confidence":      (np.float32, -1.0),
+    "auto_hit_point":       (object, None),
+    "needs_review":         (np.bool_, False),
+    "manual_points":        (np.int16, 0),
+    "final_points":         (np.int16, 0),
+    "video_file":           (object, ""),
+    "audio_clip":           (object, ""),
+    "impact_sample":        (np.int64, -1),
+    "impact_time":          (np.float64, -1.0),
+    "video_time_ms":        (np.int64, -1),
+    "detection_latency_ms": (np.float32, -1.0),
+    "handling_latency_ms":  (np.float32, -1.0),
+    "extraction_timings":   (object, ""),
+}
+
+##############################################################################################################
+##############################################################################################################
+## The results of a session as one array per value, indexed [shooter, game, arrow]. Shooters and games are
+## mapped to their index by name. Totals and the ranking are computed on the whole arrays at once.
+class ResultStore(object):
+
+    ##############################################################################################################
+    def __init__(self, shooter_names: list, game_names: list, arrows_per_game: int, defaults: dict = None):
+        self.shooter_names = list(shooter_names)
+        self.game_names = list(game_names)
+        self.shooter_index = {name: i for i, name in enumerate(self.shooter_names)}
+        self.game_index = {name: i for i, name in enumerate(self.game_names)}
+        self.arrows_per_game = arrows_per_game
+
+        shape = (len(self.shooter_names), len(self.game_names), arrows_per_game)
+        defaults = {} if defaults is None else defaults
+        self.columns = {}
+        for name, (dtype, default) in RESULT_COLUMNS.items():
+            self.columns[name] = np.full(shape, defaults.get(name, default), dtype = dtype)
+        self.game_totals = np.zeros(shape[0:2], dtype = np.int32)
+        self.shooter_totals = np.zeros(shape[0], dtype = np.int32)
+
+    ##############################################################################################################
+    def get_arrow_count(self) -> int:
+        return int(self.columns["final_points"].size)
+
+    ##############################################################################################################
+    ## Value of one arrow as plain Python value
+    def get(self, column: str, index: tuple):
+        value = self.columns[column][index]
+        return value.item() if isinstance(value, np.generic) else value
+
+    ##############################################################################################################
+    def set(self, column: str, index: tuple, value):
+        self.columns[column][index] = value
+        return
+
+    ##############################################################################################################
+    ## Final points of every arrow, game and shooter totals. The manual points start with the automatic ones and
+    ## are only changed by hand, so they are the final points.
+    def calculate(self):
+        np.copyto(self.columns["final_points"], self.columns["manual_points"])
+        self.game_totals = self.columns["final_points"].sum(axis = 2, dtype = np.int32)
+        self.shooter_totals = self.game_totals.sum(axis = 1, dtype = np.int32)
+        return
+
+    ##############################################################################################################
+    ## Indices of the shooters whose totals are not those of their manual points, points changed since calculate()
+    def get_outdated_shooters(self) -> np.ndarray:
+        return np.flatnonzero(self.columns["manual_points"].sum(axis = (1, 2), dtype = np.int32) != self.shooter_totals)
+
+    ##############################################################################################################
+    ## Rank (1 = best) of every shooter by total points, shooters with the same points share a rank
+    def get_ranks(self) -> np.ndarray:
+        return (self.shooter_totals[np.newaxis, :] > self.shooter_totals[:, np.newaxis]).sum(axis = 1) + 1
+
+    ##############################################################################################################
+    ## Shooter indices from best to worst, same points in the order the shooters were registered
+    def get_ranking(self) -> np.ndarray:
+        return np.argsort(-self.shooter_totals, kind = "stable")
+
+##############################################################################################################
+##############################################################################################################
+## Attribute of a result view that is a value of the store, at the index of the view
+class StoreColumn(object):
+
+    ##############################################################################################################
+    def __set_name__(self, owner, name: str):
+        self.column = name
+
+    ##############################################################################################################
+    def __get__(self, view, owner = None):
+        if view is None:
+            return self
+        return view.store.get(self.column, view.index)
+
+    ##############################################################################################################
+    def __set__(self, view, value):
+        view.store.set(self.column, view.index, value)
@@ -0,0 +1,138 @@
+import json
+import os
+import concurrent.futures
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+import PySimpleGUI as sg
+
+from game_modules.app_configuration import AppConfig
+from game_modules.zone_map import ZoneMap, load_zone_map
+
+##############################################################################################################
+##############################################################################################################
+## One target face: template, mask and zone map. The zone map is built on first use and cached with the results.
+## Template and mask are read when the library is indexed, with small copies for the identification.
+class TargetFace(object):
+
+    ##############################################################################################################
+    def __init__(self, name: str, template_file: str, mask_file: str, zone_map_file: str, ring_calibration: dict = None):
+        self.name = name
+        self.template_file = template_file
+        self.mask_file = mask_file
+        self.zone_map_file = zone_map_file
+        ## {"center", "radii"} of the face, None = zones from the template colours
+        self.ring_calibration = ring_calibration
+        self.template_img = cv.imread(template_file, cv.IMREAD_COLOR)
+        self.mask_img = cv.imread(mask_file, cv.IMREAD_COLOR)
+        if self.template_img is None or self.mask_img is None:
+            raise IOError("Could not read the template {} or mask {} of target face {}.".format(template_file, mask_file, name))
+        self.small_template_img = None
+        self.small_mask_img = None
+        self.zone_map = None
+
+    ##############################################################################################################
+    ## (w, h) of the template
+    def get_size(self) -> tuple:
+        return (self.template_img.shape[1], self.template_img.shape[0])
+
+    ##############################################################################################################
+    ## Template and mask scaled for the identification, prepared once
+    def prepare_small(self, scale: float):
+        self.small_template_img = cv.resize(self.template_img, None, fx = scale, fy = scale, interpolation = cv.INTER_AREA)
+        self.small_mask_img = cv.resize(self.mask_img, None, fx = scale, fy = scale, interpolation = cv.INTER_AREA)
+        return
+
+    ##############################################################################################################
+    def get_zone_map(self) -> ZoneMap:
+        if self.zone_map is None:
+            self.zone_map = load_zone_map(self.template_file, self.mask_file, self.zone_map_file, self.ring_calibration)
+        return self.zone_map
+
+##############################################################################################################
+##############################################################################################################
+## The target faces in the pattern directory, indexed once at startup. Every sub directory with a template.png and
+## a mask.png is a face named like the directory, an optional face.json may hold its ring calibration. The face
+## "default" is used until another one is identified.
+class TargetFaceLibrary(object):
+
+    DEFAULT_FACE = "default"
+
+    ##############################################################################################################
+    def __init__(self, library_path: str = None, identify_scale: float = None):
+        self.library_path = AppConfig.CFG_TARGET_FACE_LIBRARY_PATH if library_path is None else library_path
+        self.identify_scale = AppConfig.CFG_TARGET_IDENTIFY_SCALE if identify_scale is None else identify_scale
+        self.faces = {} # name -> TargetFace
+        self.index()
+
+    ##############################################################################################################
+    def index(self):
+        self.faces.clear()
+        if os.path.isdir(self.library_path):
+            for name in sorted(os.listdir(self.library_path)):
+                face_dir = os.path.join(self.library_path, name)
+                template_file = os.path.join(face_dir, "template.png")
+                mask_file = os.path.join(face_dir, "mask.png")
+                if os.path.isdir(face_dir) is False or os.path.exists(template_file) is False or os.path.exists(mask_file) is False:
+                    continue
+                try:
+                    self.add_face(TargetFace(name, template_file, mask_file, AppConfig.CFG_TARGET_ZONE_MAP_FILE.format(face = name),
+                        load_face_info(face_dir).get("ring_calibration", None)))
+                except Exception as e:
+                    sg.cprint("{} - WARNING: Target face {} skipped. E = {}".format(datetime.now(), face_dir, e))
+
+        sg.cprint("{} - INFO: Target face library {}: {}".format(datetime.now(), self.library_path, list(self.faces.keys())))
+        return
+
+    ##############################################################################################################
+    def add_face(self, face: TargetFace):
+        face.prepare_small(self.identify_scale)
+        self.faces[face.name] = face
+        return
+
+    ##############################################################################################################
+    def get(self, name: str) -> TargetFace:
+        return self.faces.get(name, None)
+
+    ##############################################################################################################
+    def get_names(self) -> list:
+        return list(self.faces.keys())
+
+    ##############################################################################################################
+    ## The face that fits a camera picture best, all faces are matched at the same time on a small copy of the
+    ## picture. Returns the face and the scores by name.
+    def identify(self, camera_img: np.ndarray) -> tuple:
+        if len(self.faces) == 1:
+            return list(self.faces.values())[0], {}
+
+        small_img = cv.resize(camera_img, None, fx = self.identify_scale, fy = self.identify_scale, interpolation = cv.INTER_AREA)
+        with concurrent.futures.ThreadPoolExecutor(max_workers = len(self.faces)) as executor:
+            futures = {name: executor.submit(match_face_score, small_img, face) for name, face in self.faces.items()}
+            scores = {name: future.result() for name, future in futures.items()}
+        best = max(scores, key = scores.get)
+        return self.faces[best], scores
+
+##############################################################################################################
+## Contents of the face.json of a face directory, empty if there is none
+def load_face_info(face_dir: str) -> dict:
+    face_file = os.path.join(face_dir, "face.json")
+    if os.path.exists(face_file) is False:
+        return {}
+    with open(face_file, "r") as f:
+        return json.load(f)
+
+##############################################################################################################
+## Writes the face.json of a face directory
+def save_face_info(face_dir: str, info: dict):
+    with open(os.path.join(face_dir, "face.json"), "w") as f:
+        json.dump(info, f, indent = 2)
+    return
+
+##############################################################################################################
+## How well a face fits a scaled camera picture, the best correlation with the mean removed (-1..1)
+def match_face_score(small_img: np.ndarray, face: TargetFace) -> float:
+    if small_img.shape[0] < face.small_template_img.shape[0] or small_img.shape[1] < face.small_template_img.shape[1]:
+        return -1.0
+    result = cv.matchTemplate(small_img, face.small_template_img, cv.TM_CCOEFF_NORMED, mask = face.small_mask_img)
+    result[np.isfinite(result) == False] = -1.0
+    return float(result.max())
@@ -0,0 +1,225 @@
+import os
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+
+from game_modules.app_configuration import AppConfig
+
+##############################################################################################################
+##############################################################################################################
+## Geometry of one camera setup: where the target face is in the camera picture, as homography from template
+## to camera pixels, and the lens distortion. Both are folded into one remap table at template resolution, so
+## every shot is turned into a front facing picture of the target face with a single cv.remap. The calibration
+## is stored per camera and used until the target face does not fit any more (camera or target moved).
+class TargetCalibration(object):
+
+    ##############################################################################################################
+    def __init__(self, homography: np.ndarray, camera_size: tuple, output_size: tuple, camera_matrix: np.ndarray = None,
+        dist_coeffs: np.ndarray = None, score: float = 0.0, method: str = "", match_loc: tuple = None):
+        ## template pixel (u, v, 1) -> undistorted camera pixel
+        self.homography = homography
+        ## (w, h) of the camera picture and of the front facing target picture (the template)
+        self.camera_size = tuple(int(v) for v in camera_size)
+        self.output_size = tuple(int(v) for v in output_size)
+        ## lens model, None if the lens is not calibrated
+        self.camera_matrix = camera_matrix
+        self.dist_coeffs = dist_coeffs
+        ## similarity with the template after rectification and how the homography was found
+        self.score = score
+        self.method = method
+        ## where the template matcher found the face in the raw camera picture when calibrating, None if unknown
+        self.match_loc = None if match_loc is None else tuple(int(v) for v in match_loc)
+        self.map_1, self.map_2 = self.build_maps()
+
+    ##############################################################################################################
+    ## The remap table: for every output pixel the position in the raw camera picture
+    def build_maps(self) -> tuple:
+        out_w, out_h = self.output_size
+        us, vs = np.meshgrid(np.arange(out_w, dtype = np.float64), np.arange(out_h, dtype = np.float64))
+        template_points = np.stack([us.ravel(), vs.ravel()], axis = 1).reshape(-1, 1, 2)
+        camera_points = cv.perspectiveTransform(template_points, self.homography).reshape(-1, 2)
+
+        if self.camera_matrix is not None and self.dist_coeffs is not None:
+            # undistorted pixel -> normalized ray -> pixel in the distorted raw picture
+            fx, fy = self.camera_matrix[0, 0], self.camera_matrix[1, 1]
+            cx, cy = self.camera_matrix[0, 2], self.camera_matrix[1, 2]
+            rays = np.stack([(camera_points[:, 0] - cx) / fx, (camera_points[:, 1] - cy) / fy, np.ones(camera_points.shape[0])], axis = 1)
+            camera_points, _ = cv.projectPoints(rays, np.zeros(3), np.zeros(3), self.camera_matrix, self.dist_coeffs)
+            camera_points = camera_points.reshape(-1, 2)
+
+        map_x = camera_points[:, 0].reshape(out_h, out_w).astype(np.float32)
+        map_y = camera_points[:, 1].reshape(out_h, out_w).astype(np.float32)
+        # the fixed point format is faster to remap with
+        return cv.convertMaps(map_x, map_y, cv.CV_16SC2)
+
+    ##############################################################################################################
+    ## The front facing target face out of a raw camera picture
+    def rectify(self, camera_img: np.ndarray) -> np.ndarray:
+        return cv.remap(camera_img, self.map_1, self.map_2, cv.INTER_LINEAR, borderMode = cv.BORDER_CONSTANT)
+
+    ##############################################################################################################
+    ## Bounding box (x, y, w, h) of the target face in the undistorted camera picture
+    def get_bbox(self) -> tuple:
+        out_w, out_h = self.output_size
+        corners = np.array([[[0, 0]], [[out_w, 0]], [[out_w, out_h]], [[0, out_h]]], dtype = np.float64)
+        return cv.boundingRect(cv.perspectiveTransform(corners, self.homography).astype(np.float32))
+
+    ##############################################################################################################
+    ## If the face found by the template matcher is still where it was when calibrating, checked before the remap
+    def fits(self, match_loc: tuple, max_shift: int) -> bool:
+        if self.match_loc is None:
+            return False
+        return abs(match_loc[0] - self.match_loc[0]) <= max_shift and abs(match_loc[1] - self.match_loc[1]) <= max_shift
+
+    ##############################################################################################################
+    def save(self, calibration_file: str):
+        folder = os.path.dirname(calibration_file)
+        if folder != "" and os.path.exists(folder) is False:
+            os.makedirs(folder)
+        lens = {} if self.camera_matrix is None else {"camera_matrix": self.camera_matrix, "dist_coeffs": self.dist_coeffs}
+        if self.match_loc is not None:
+            lens["match_loc"] = np.array(self.match_loc)
+        # written next to the file and renamed, a worker reading it never sees half a file
+        temp_file = "{}.{}.tmp.npz".format(calibration_file, os.getpid())
+        np.savez(temp_file, homography = self.homography, camera_size = np.array(self.camera_size), output_size = np.array(self.output_size),
+            map_1 = self.map_1, map_2 = self.map_2, score = np.array(self.score), method = np.array(self.method), **lens)
+        os.replace(temp_file, calibration_file)
+        return
+
+    ##############################################################################################################
+    ## The stored calibration, None if there is none or it can not be read
+    @staticmethod
+    def load(calibration_file: str):
+        if os.path.exists(calibration_file) is False:
+            return None
+        try:
+            with np.load(calibration_file) as data:
+                calibration = TargetCalibration.__new__(TargetCalibration)
+                calibration.homography = data["homography"]
+                calibration.camera_size = tuple(int(v) for v in data["camera_size"])
+                calibration.output_size = tuple(int(v) for v in data["output_size"])
+                calibration.camera_matrix = data["camera_matrix"] if "camera_matrix" in data else None
+                calibration.dist_coeffs = data["dist_coeffs"] if "dist_coeffs" in data else None
+                calibration.score = float(data["score"])
+                calibration.method = str(data["method"])
+                calibration.match_loc = tuple(int(v) for v in data["match_loc"]) if "match_loc" in data else None
+                calibration.map_1 = data["map_1"]
+                calibration.map_2 = data["map_2"]
+            return calibration
+        except Exception as e:
+            print("{} - WARNING: Could not read target calibration {}. E = {}".format(datetime.now(), calibration_file, e))
+            return None
+
+##############################################################################################################
+## Similarity 0..1 of a rectified picture with the template, inside the mask of the face
+def rectified_score(rectified_img: np.ndarray, template_img: np.ndarray, mask_img: np.ndarray) -> float:
+    result = cv.matchTemplate(rectified_img, template_img, cv.TM_CCOEFF_NORMED, mask = mask_img)
+    score = float(result[0, 0])
+    return score if np.isfinite(score) else 0.0
+
+##############################################################################################################
+## Homography template -> camera picture from matched SIFT features, None if there are not enough good matches
+def homography_from_features(camera_gray: np.ndarray, template_gray: np.ndarray, template_mask: np.ndarray):
+    sift = cv.SIFT_create()
+    template_keys, template_desc = sift.detectAndCompute(template_gray, template_mask)
+    camera_keys, camera_desc = sift.detectAndCompute(camera_gray, None)
+    if template_desc is None or camera_desc is None or len(template_keys) < 4 or len(camera_keys) < 4:
+        return None
+
+    # ratio test, the rings repeat a lot of similar structure
+    good = [m[0] for m in cv.BFMatcher(cv.NORM_L2).knnMatch(template_desc, camera_desc, k = 2) if len(m) == 2 and m[0].distance < 0.75 * m[1].distance]
+    if len(good) < AppConfig.CFG_RECTIFY_MIN_FEATURE_MATCHES:
+        return None
+
+    template_points = np.float32([template_keys[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+    camera_points = np.float32([camera_keys[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+    homography, inliers = cv.findHomography(template_points, camera_points, cv.RANSAC, 3.0)
+    if homography is None or int(inliers.sum()) < AppConfig.CFG_RECTIFY_MIN_FEATURE_MATCHES:
+        return None
+    return homography
+
+##############################################################################################################
+## Finds the target face in a camera picture and calibrates the rectification for it. The template matcher finds
+## the region of the face, in that region the homography comes from feature matching, or from the match location
+## if the face has too few features, and is then refined on the pixels (ECC). match_loc is where the matcher
+## already found the face in the raw picture, searched if not given. Returns None if the rectified face does not
+## look like the template.
+def calibrate_target(camera_img: np.ndarray, template_img: np.ndarray, mask_img: np.ndarray, matcher,
+    camera_matrix: np.ndarray = None, dist_coeffs: np.ndarray = None, match_loc: tuple = None) -> TargetCalibration:
+    undistorted = camera_img if camera_matrix is None else cv.undistort(camera_img, camera_matrix, dist_coeffs)
+    template_gray = cv.cvtColor(template_img, cv.COLOR_BGR2GRAY)
+    template_mask = cv.cvtColor(mask_img, cv.COLOR_BGR2GRAY) if mask_img.ndim == 3 else mask_img
+
+    # the region around the match, with room for the perspective
+    if match_loc is None:
+        match_loc, _score = matcher.find(camera_img)
+    loc = match_loc if camera_matrix is None else matcher.find(undistorted)[0]
+    margin = max(template_img.shape[0:2]) // 2
+    x0, y0 = max(0, loc[0] - margin), max(0, loc[1] - margin)
+    x1 = min(undistorted.shape[1], loc[0] + template_img.shape[1] + margin)
+    y1 = min(undistorted.shape[0], loc[1] + template_img.shape[0] + margin)
+    region_gray = cv.cvtColor(undistorted[y0:y1, x0:x1], cv.COLOR_BGR2GRAY)
+
+    homography = homography_from_features(region_gray, template_gray, template_mask)
+    method = "features"
+    if homography is None:
+        homography = np.array([[1.0, 0.0, loc[0] - x0], [0.0, 1.0, loc[1] - y0], [0.0, 0.0, 1.0]])
+        method = "template"
+
+    try:
+        criteria = (cv.TERM_CRITERIA_EPS | cv.TERM_CRITERIA_COUNT, 200, 1e-6)
+        _ecc, refined = cv.findTransformECC(template_gray.astype(np.float32), region_gray.astype(np.float32),
+            homography.astype(np.float32), cv.MOTION_HOMOGRAPHY, criteria, None, 5)
+        homography = refined.astype(np.float64) / refined[2, 2]
+        method += "+ecc"
+    except cv.error as e:
+        print("{} - WARNING: ECC refinement of the target calibration did not converge, using the {} homography. E = {}".format(datetime.now(), method, e))
+
+    # from region to picture coordinates
+    homography = np.array([[1.0, 0.0, x0], [0.0, 1.0, y0], [0.0, 0.0, 1.0]]) @ homography
+    calibration = TargetCalibration(homography, (camera_img.shape[1], camera_img.shape[0]), (template_img.shape[1], template_img.shape[0]),
+        camera_matrix, dist_coeffs, 0.0, method, match_loc)
+    calibration.score = rectified_score(calibration.rectify(camera_img), template_img, mask_img)
+    if calibration.score < AppConfig.CFG_RECTIFY_MIN_SCORE:
+        print("{} - WARNING: Target calibration ({}) fits the template with {:.3f} only, not used.".format(datetime.now(), method, calibration.score))
+        return None
+    return calibration
+
+##############################################################################################################
+## Camera matrix and distortion coefficients of a lens from pictures of a chessboard with the given inner corners
+## (columns, rows), None if the board was not found in enough pictures
+def calibrate_lens(chessboard_images: list, pattern_size: tuple) -> tuple:
+    board = np.zeros((pattern_size[0] * pattern_size[1], 3), np.float32)
+    board[:, :2] = np.mgrid[0:pattern_size[0], 0:pattern_size[1]].T.reshape(-1, 2)
+    object_points = []
+    image_points = []
+    image_size = None
+    for image in chessboard_images:
+        gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        image_size = (gray.shape[1], gray.shape[0])
+        found, corners = cv.findChessboardCorners(gray, pattern_size, None)
+        if found is False:
+            continue
+        corners = cv.cornerSubPix(gray, corners, (11, 11), (-1, -1), (cv.TERM_CRITERIA_EPS | cv.TERM_CRITERIA_COUNT, 30, 0.001))
+        object_points.append(board)
+        image_points.append(corners)
+
+    if len(object_points) < 3:
+        return None
+    _error, camera_matrix, dist_coeffs, _rvecs, _tvecs = cv.calibrateCamera(object_points, image_points, image_size, None, None)
+    return camera_matrix, dist_coeffs
+
+##############################################################################################################
+## Stored lens model (camera_matrix, dist_coeffs) for AppConfig.CFG_CAMERA_LENS_FILE, (None, None) if there is none
+def load_lens(lens_file: str = None) -> tuple:
+    lens_file = AppConfig.CFG_CAMERA_LENS_FILE if lens_file is None else lens_file
+    if lens_file == "" or os.path.exists(lens_file) is False:
+        return None, None
+    with np.load(lens_file) as data:
+        return data["camera_matrix"], data["dist_coeffs"]
+
+##############################################################################################################
+## Calibration file of a camera and target face, one per camera id and face
+def get_calibration_file(camera_id: str, face_name: str = "") -> str:
+    return AppConfig.CFG_RECTIFY_CALIBRATION_FILE.format(camera_id = camera_id if camera_id != "" else "default",
+        face = face_name if face_name != "" else "default")
@@ -0,0 +1,154 @@
+import numpy as np
+import cv2 as cv
+
+from game_modules.app_configuration import AppConfig
+
+## match methods by name, selected with AppConfig.CFG_MATCH_METHOD
+MATCH_METHODS = {
+    "ccorr_normed": cv.TM_CCORR_NORMED,
+    "ccoeff_normed": cv.TM_CCOEFF_NORMED,
+    "sqdiff_normed": cv.TM_SQDIFF_NORMED,
+    "sqdiff": cv.TM_SQDIFF,
+}
+
+##############################################################################################################
+##############################################################################################################
+## Finds the target face template in a picture by searching the whole picture. The template and mask are
+## prepared once; with grayscale the pictures are matched on one channel, about three times less work.
+class TemplateMatcher(object):
+
+    ##############################################################################################################
+    def __init__(self, template_img: np.ndarray, mask_img: np.ndarray, match_method: int, grayscale: bool = False):
+        self.match_method = match_method
+        self.grayscale = grayscale
+        self.template_img = self.prepare(template_img)
+        self.mask_img = self.prepare(mask_img)
+        ## size of the target face (w, h)
+        self.template_size = (template_img.shape[1], template_img.shape[0])
+
+    ##############################################################################################################
+    ## Converts a BGR picture into the form that is matched
+    def prepare(self, image: np.ndarray) -> np.ndarray:
+        if self.grayscale is True and image.ndim == 3:
+            return cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+        return image
+
+    ##############################################################################################################
+    ## Match confidence between 0 and 1 for the normed methods, None if the method has no comparable score
+    def score(self, min_val: float, max_val: float) -> float:
+        if self.match_method == cv.TM_SQDIFF_NORMED:
+            return 1.0 - min_val
+        if self.match_method in (cv.TM_CCORR_NORMED, cv.TM_CCOEFF_NORMED):
+            return max_val
+        return None
+
+    ##############################################################################################################
+    ## Best match of the template in a prepared image, returns the location (x, y) and the score
+    def best_match(self, image: np.ndarray, template_img: np.ndarray, mask_img: np.ndarray) -> tuple:
+        result = cv.matchTemplate(image, template_img, self.match_method, mask = mask_img)
+        # the location of the extreme does not change with normalizing, so the raw response is used
+        min_val, max_val, min_loc, max_loc = cv.minMaxLoc(result, None)
+        if self.match_method in (cv.TM_SQDIFF, cv.TM_SQDIFF_NORMED):
+            return min_loc, self.score(min_val, max_val)
+        return max_loc, self.score(min_val, max_val)
+
+    ##############################################################################################################
+    ## Searches the whole BGR picture, returns the location (x, y) and the score
+    def find(self, source_img: np.ndarray) -> tuple:
+        return self.best_match(self.prepare(source_img), self.template_img, self.mask_img)
+
+    ##############################################################################################################
+    ## Searches only a region around the last known location. Returns (location, score) or None if the target was
+    ## not found there with enough confidence, or touches the border of the region (it moved).
+    def find_near(self, source_img: np.ndarray, hint_loc: tuple, margin: int, min_score: float):
+        template_w, template_h = self.template_size
+        image_h, image_w = source_img.shape[0:2]
+        x0 = max(0, hint_loc[0] - margin)
+        y0 = max(0, hint_loc[1] - margin)
+        x1 = min(image_w, hint_loc[0] + template_w + margin)
+        y1 = min(image_h, hint_loc[1] + template_h + margin)
+        if x1 - x0 < template_w or y1 - y0 < template_h:
+            return None
+
+        loc, score = self.best_match(self.prepare(source_img[y0:y1, x0:x1]), self.template_img, self.mask_img)
+        if score is None or score < min_score:
+            return None
+        on_border_x = (loc[0] == 0 and x0 > 0) or (loc[0] == x1 - x0 - template_w and x1 < image_w)
+        on_border_y = (loc[1] == 0 and y0 > 0) or (loc[1] == y1 - y0 - template_h and y1 < image_h)
+        if on_border_x or on_border_y:
+            return None
+        return (x0 + loc[0], y0 + loc[1]), score
+
+##############################################################################################################
+##############################################################################################################
+## Coarse to fine search: the target is located on a picture downscaled by 2^levels, then the location is refined
+## level by level in a small window. Template and mask pyramids are built once. If the result at full
+## resolution is not confident, the whole picture is searched as before.
+class PyramidTemplateMatcher(TemplateMatcher):
+
+    ##############################################################################################################
+    def __init__(self, template_img: np.ndarray, mask_img: np.ndarray, match_method: int, grayscale: bool = False,
+        levels: int = 2, refine_margin: int = 4, min_score: float = 0.0):
+        TemplateMatcher.__init__(self, template_img, mask_img, match_method, grayscale)
+        self.refine_margin = refine_margin
+        self.min_score = min_score
+
+        # level 0 is the full resolution, the template must stay large enough to be found
+        self.template_pyramid = [self.template_img]
+        self.mask_pyramid = [self.mask_img]
+        while len(self.template_pyramid) <= levels and min(self.template_pyramid[-1].shape[0:2]) >= 32:
+            self.template_pyramid.append(cv.pyrDown(self.template_pyramid[-1]))
+            self.mask_pyramid.append(cv.pyrDown(self.mask_pyramid[-1]))
+        self.levels = len(self.template_pyramid) - 1
+        self.last_used_full_search = False
+
+    ##############################################################################################################
+    def find(self, source_img: np.ndarray) -> tuple:
+        image_pyramid = [self.prepare(source_img)]
+        for level in range(0, self.levels):
+            image_pyramid.append(cv.pyrDown(image_pyramid[-1]))
+
+        # coarsest level: search everything
+        loc, score = self.best_match(image_pyramid[-1], self.template_pyramid[-1], self.mask_pyramid[-1])
+
+        # finer levels: search a small window around the doubled location
+        for level in range(self.levels - 1, -1, -1):
+            image = image_pyramid[level]
+            template_h, template_w = self.template_pyramid[level].shape[0:2]
+            x0 = max(0, loc[0] * 2 - self.refine_margin)
+            y0 = max(0, loc[1] * 2 - self.refine_margin)
+            x1 = min(image.shape[1], loc[0] * 2 + template_w + self.refine_margin)
+            y1 = min(image.shape[0], loc[1] * 2 + template_h + self.refine_margin)
+            window_loc, score = self.best_match(image[y0:y1, x0:x1], self.template_pyramid[level], self.mask_pyramid[level])
+            loc = (x0 + window_loc[0], y0 + window_loc[1])
+
+        self.last_used_full_search = score is not None and score < self.min_score
+        if self.last_used_full_search is True:
+            return self.best_match(image_pyramid[0], self.template_img, self.mask_img)
+        return loc, score
+
+##############################################################################################################
+## Search strategies by name, selected with AppConfig.CFG_MATCH_STRATEGY
+MATCH_STRATEGIES = {
+    "full": TemplateMatcher,
+    "pyramid": PyramidTemplateMatcher,
+}
+
+##############################################################################################################
+def create_template_matcher(template_file: str, mask_file: str, strategy_name: str = None, method_name: str = None) -> TemplateMatcher:
+    strategy_name = AppConfig.CFG_MATCH_STRATEGY if strategy_name is None else strategy_name
+    method_name = AppConfig.CFG_MATCH_METHOD if method_name is None else method_name
+    if strategy_name not in MATCH_STRATEGIES:
+        raise ValueError("Unknown match strategy {}, use one of {}.".format(strategy_name, list(MATCH_STRATEGIES.keys())))
+    if method_name not in MATCH_METHODS:
+        raise ValueError("Unknown match method {}, use one of {}.".format(method_name, list(MATCH_METHODS.keys())))
+
+    template_img = cv.imread(template_file, cv.IMREAD_COLOR)
+    mask_img = cv.imread(mask_file, cv.IMREAD_COLOR)
+    if template_img is None or mask_img is None:
+        raise IOError("Could not read the target template {} or mask {}.".format(template_file, mask_file))
+
+    if strategy_name == "pyramid":
+        return PyramidTemplateMatcher(template_img, mask_img, MATCH_METHODS[method_name], AppConfig.CFG_MATCH_GRAYSCALE,
+            AppConfig.CFG_MATCH_PYRAMID_LEVELS, AppConfig.CFG_MATCH_REFINE_MARGIN, AppConfig.CFG_MATCH_ROI_MIN_SCORE)
+    return TemplateMatcher(template_img, mask_img, MATCH_METHODS[method_name], AppConfig.CFG_MATCH_GRAYSCALE)
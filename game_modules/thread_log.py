@@ -0,0 +1,30 @@
+from collections import deque
+import PySimpleGUI as sg
+
+##############################################################################################################
+##############################################################################################################
+## Log lines of the background threads (image writer, audio clips, camera capture, thumbnails). sg.cprint may
+## only be called on the GUI thread, so the threads queue their lines here and the event loop prints them into
+## the log window. Appending to a deque needs no lock; the oldest lines are dropped if nobody prints them.
+class ThreadLog(object):
+
+    MAX_PENDING_LINES = 1000
+
+    ##############################################################################################################
+    def __init__(self):
+        self.lines = deque(maxlen = self.MAX_PENDING_LINES)
+
+    ##############################################################################################################
+    def add(self, text: str):
+        self.lines.append(text)
+        return
+
+    ##############################################################################################################
+    ## Prints the queued lines, on the GUI thread only
+    def flush(self):
+        while len(self.lines) > 0:
+            sg.cprint(self.lines.popleft())
+        return
+
+## the log of all background threads of the application
+THREAD_LOG = ThreadLog()
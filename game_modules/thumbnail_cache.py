@@ -0,0 +1,145 @@
+import os
+import hashlib
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+
+from game_modules.app_configuration import AppConfig
+from game_modules.image_writer import read_image
+from game_modules.thread_log import THREAD_LOG
+
+##############################################################################################################
+##############################################################################################################
+## Small, already encoded pictures of the crops for the results window, so the window does not decode and scale
+## full crops on the GUI thread. A thumbnail is made in the background as soon as its crop exists and kept in
+## memory (least recently used are dropped above max_bytes) and on disk, both by file path and modification
+## time: a crop that is written again gets a new thumbnail. The GUI thread only takes ready thumbnails from
+## memory, it shows a placeholder for the others until their job calls back.
+class ThumbnailCache(object):
+
+    ##############################################################################################################
+    def __init__(self, cache_path: str = None, scale: float = None, max_bytes: int = None):
+        self.cache_path = AppConfig.CFG_THUMBNAIL_CACHE_PATH if cache_path is None else cache_path
+        self.scale = AppConfig.CFG_THUMBNAIL_SCALE if scale is None else scale
+        self.max_bytes = AppConfig.CFG_THUMBNAIL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.thumbnails = OrderedDict() # (image file, mtime) -> PNG bytes, most recently used last
+        self.cached_bytes = 0
+        self.pending = {} # image file -> future of the thumbnail being made
+        self.lock = threading.Lock()
+        self.placeholders = {} # (w, h) -> PNG bytes
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "Thumbnails")
+
+    ##############################################################################################################
+    ## Makes the thumbnail of an image file in the background, from the given BGR picture if it is at hand.
+    ## on_ready(image_file, data) is called on the thumbnail thread when it is done, data is None if the image
+    ## can not be read.
+    def request(self, image_file: str, image: np.ndarray = None, on_ready = None):
+        if image_file == "" or self.executor is None:
+            return
+        with self.lock:
+            future = self.pending.get(image_file, None)
+            submitted = future is None
+            if submitted is True:
+                future = self.executor.submit(self.make, image_file, image)
+                self.pending[image_file] = future
+        # a future that is already done calls back right away, so not while holding the lock
+        if submitted is True:
+            future.add_done_callback(lambda f: self.forget_pending(image_file, f))
+        if on_ready is not None:
+            future.add_done_callback(lambda f: on_ready(image_file, f.result()))
+        return
+
+    ##############################################################################################################
+    def forget_pending(self, image_file: str, future: concurrent.futures.Future):
+        with self.lock:
+            if self.pending.get(image_file, None) is future:
+                del self.pending[image_file]
+        return
+
+    ##############################################################################################################
+    ## PNG bytes of the thumbnail if it is ready in memory, None if it still has to be made (see request())
+    def get(self, image_file: str) -> bytes:
+        if image_file == "" or os.path.exists(image_file) is False:
+            return None
+        key = (os.path.abspath(image_file), os.stat(image_file).st_mtime_ns)
+        with self.lock:
+            data = self.thumbnails.get(key, None)
+            if data is not None:
+                self.thumbnails.move_to_end(key)
+        return data
+
+    ##############################################################################################################
+    ## Plain grey PNG of the given size (w, h), shown until the thumbnail is ready
+    def get_placeholder(self, size: tuple) -> bytes:
+        size = (max(1, int(size[0])), max(1, int(size[1])))
+        if size not in self.placeholders:
+            self.placeholders[size] = cv.imencode(".png", np.full((size[1], size[0], 3), 64, dtype = np.uint8))[1].tobytes()
+        return self.placeholders[size]
+
+    ##############################################################################################################
+    def make(self, image_file: str, image: np.ndarray = None) -> bytes:
+        try:
+            key = (os.path.abspath(image_file), os.stat(image_file).st_mtime_ns)
+            with self.lock:
+                data = self.thumbnails.get(key, None)
+                if data is not None:
+                    self.thumbnails.move_to_end(key)
+                    return data
+
+            disk_file = self.get_disk_file(key)
+            if os.path.exists(disk_file):
+                with open(disk_file, "rb") as f:
+                    data = f.read()
+            else:
+                image = read_image(image_file) if image is None else image
+                if image is None:
+                    return None
+                thumbnail = cv.resize(image, None, fx = self.scale, fy = self.scale, interpolation = cv.INTER_AREA)
+                _ok, encoded = cv.imencode(".png", thumbnail, [cv.IMWRITE_PNG_COMPRESSION, 1])
+                data = encoded.tobytes()
+                self.write_disk_file(disk_file, data)
+
+            self.add(key, data)
+            return data
+        except Exception as e:
+            THREAD_LOG.add("{} - WARNING: Could not make the thumbnail of {}. E = {}".format(datetime.now(), image_file, e))
+            return None
+
+    ##############################################################################################################
+    def add(self, key: tuple, data: bytes):
+        with self.lock:
+            if key in self.thumbnails:
+                return
+            self.thumbnails[key] = data
+            self.cached_bytes += len(data)
+            while self.cached_bytes > self.max_bytes and len(self.thumbnails) > 1:
+                _old_key, old_data = self.thumbnails.popitem(last = False)
+                self.cached_bytes -= len(old_data)
+        return
+
+    ##############################################################################################################
+    ## Name of the thumbnail on disk, from the image file, its modification time and the thumbnail scale
+    def get_disk_file(self, key: tuple) -> str:
+        name = hashlib.sha1("{}|{}|{}".format(key[0], key[1], self.scale).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_path, name + ".png")
+
+    ##############################################################################################################
+    def write_disk_file(self, disk_file: str, data: bytes):
+        if os.path.exists(self.cache_path) is False:
+            os.makedirs(self.cache_path, exist_ok = True)
+        # written next to the file and renamed, a reader never sees half a thumbnail
+        temp_file = "{}.{}.tmp".format(disk_file, threading.get_ident())
+        with open(temp_file, "wb") as f:
+            f.write(data)
+        os.replace(temp_file, disk_file)
+        return
+
+    ##############################################################################################################
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait = True)
+            self.executor = None
+        return
@@ -158,6 +158,22 @@ class VideoPlayer:
         else:
             return False
 
+    ##############################################################################################################
+    ## Returns the playback position in ms at the given time.monotonic() timestamp, -1 if no video is playing.
+    ## Must be called before pause(), the current VLC position is extrapolated back to the requested instant.
+    def get_video_time_at(self, monotonic_time: float) -> int:
+        #sg.cprint("{} - TRACE: {}.get_video_time_at()".format(datetime.now(), self.__class__))  # no tracing, to noisy
+
+        if self.video_started is False or not self.vlc_player.is_playing():
+            return -1
+
+        current_video_ms = self.vlc_player.get_time()
+        now = time.monotonic()
+        if current_video_ms < 0:
+            return -1
+
+        return max(0, int(current_video_ms - (now - monotonic_time) * 1000.0 * self.vlc_player.get_rate()))
+
     ##############################################################################################################
     def pause(self):
         sg.cprint("{} - TRACE: {}.pause()".format(datetime.now(), self.__class__))
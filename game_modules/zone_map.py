@@ -0,0 +1,159 @@
+import json
+import os
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+import PySimpleGUI as sg
+
+from game_modules.app_configuration import AppConfig
+
+##############################################################################################################
+##############################################################################################################
+## Points of every pixel of the target face at template resolution, built once per face and cached on disk as
+## uint8 array. Scoring a hit is one array lookup, scoring many hits one fancy indexing call. The map is built
+## from the colours of the template, or from a calibration with the centre and the ring radii. Lines between
+## two zones belong to the higher zone, pixels outside the face score a miss.
+class ZoneMap(object):
+
+    ##############################################################################################################
+    def __init__(self, points_map: np.ndarray, source: str = ""):
+        ## [rows, columns] -> points, read-only (memory mapped when loaded from the cache)
+        self.points_map = points_map
+        ## how the map was built, e.g. "template" or "rings"
+        self.source = source
+
+    ##############################################################################################################
+    ## Size of the map (w, h), the same as the template
+    def get_size(self) -> tuple:
+        return (self.points_map.shape[1], self.points_map.shape[0])
+
+    ##############################################################################################################
+    ## Points at one crop position (x, y)
+    def points_at(self, hit_point: tuple) -> int:
+        x, y = int(round(hit_point[0])), int(round(hit_point[1]))
+        if x < 0 or y < 0 or y >= self.points_map.shape[0] or x >= self.points_map.shape[1]:
+            return AppConfig.CFG_POINTS_MISS
+        return int(self.points_map[y, x])
+
+    ##############################################################################################################
+    ## Points of many crop positions at once, hit_points is a (n, 2) array-like of (x, y)
+    def score_hits(self, hit_points) -> np.ndarray:
+        hits = np.rint(np.asarray(hit_points, dtype = np.float64).reshape(-1, 2)).astype(np.intp)
+        h, w = self.points_map.shape
+        inside = (hits[:, 0] >= 0) & (hits[:, 1] >= 0) & (hits[:, 0] < w) & (hits[:, 1] < h)
+        points = np.full(hits.shape[0], AppConfig.CFG_POINTS_MISS, dtype = np.uint8)
+        points[inside] = self.points_map[hits[inside, 1], hits[inside, 0]]
+        return points
+
+    ##############################################################################################################
+    ## How clearly a position lies inside its zone (0..1): the share of the neighbourhood with the same points
+    def confidence_at(self, hit_point: tuple, radius: int = 3) -> float:
+        x, y = int(round(hit_point[0])), int(round(hit_point[1]))
+        h, w = self.points_map.shape
+        if x < 0 or y < 0 or x >= w or y >= h:
+            return 1.0
+        window = self.points_map[max(0, y - radius):min(h, y + radius + 1), max(0, x - radius):min(w, x + radius + 1)]
+        return float(np.count_nonzero(window == self.points_map[y, x])) / window.size
+
+    ##############################################################################################################
+    ## Builds the map from the colours of the template: white, red and yellow by HSV, the mask marks the face
+    @staticmethod
+    def from_template(template_img: np.ndarray, mask_img: np.ndarray):
+        hsv = cv.cvtColor(template_img, cv.COLOR_BGR2HSV)
+        hue, sat, val = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+        points_map = np.zeros(hue.shape, dtype = np.uint8)
+        points_map[(sat < 60) & (val > 180)] = AppConfig.CFG_POINTS_WHITE
+        points_map[((hue < 10) | (hue > 165)) & (sat > 100) & (val > 100)] = AppConfig.CFG_POINTS_RED
+        points_map[(hue >= 15) & (hue <= 40) & (sat > 60) & (val > 150)] = AppConfig.CFG_POINTS_YELLOW
+
+        # lines and blurred edges get the highest neighbouring zone, grown in from the zones around them
+        face = (mask_img[:, :, 0] if mask_img.ndim == 3 else mask_img) > 0
+        kernel = np.ones((3, 3), np.uint8)
+        for _ in range(0, max(points_map.shape)):
+            open_pixels = face & (points_map == AppConfig.CFG_POINTS_MISS)
+            if np.count_nonzero(open_pixels) == 0:
+                break
+            grown = cv.dilate(points_map, kernel)
+            if np.count_nonzero(grown[open_pixels] != AppConfig.CFG_POINTS_MISS) == 0:
+                break
+            points_map[open_pixels] = grown[open_pixels]
+        points_map[face == False] = AppConfig.CFG_POINTS_MISS
+        return ZoneMap(points_map, "template")
+
+    ##############################################################################################################
+    ## Builds the map from a calibration: centre (x, y) and the outer radius of the white, red and yellow ring
+    ## in template pixels. A distance exactly on a ring border counts for the inner ring.
+    @staticmethod
+    def from_rings(size: tuple, center: tuple, radii: tuple):
+        ys, xs = np.indices((size[1], size[0]), dtype = np.float64)
+        distance = np.hypot(xs - center[0], ys - center[1])
+        ring_points = np.array([AppConfig.CFG_POINTS_YELLOW, AppConfig.CFG_POINTS_RED, AppConfig.CFG_POINTS_WHITE, AppConfig.CFG_POINTS_MISS], dtype = np.uint8)
+        borders = np.array(sorted(radii), dtype = np.float64)
+        points_map = ring_points[np.searchsorted(borders, distance, side = "left")]
+        return ZoneMap(points_map, "rings")
+
+    ##############################################################################################################
+    def save(self, map_file: str, cache_key: str):
+        folder = os.path.dirname(map_file)
+        if folder != "" and os.path.exists(folder) is False:
+            os.makedirs(folder)
+        np.save(map_file, np.ascontiguousarray(self.points_map, dtype = np.uint8))
+        with open(map_file + ".json", "w") as f:
+            json.dump({"cache_key": cache_key, "source": self.source, "created": str(datetime.now())}, f, indent = 2)
+        return
+
+    ##############################################################################################################
+    ## Memory maps the cached map, None if there is none or it was built from something else
+    @staticmethod
+    def load(map_file: str, cache_key: str):
+        if os.path.exists(map_file) is False or os.path.exists(map_file + ".json") is False:
+            return None
+        try:
+            with open(map_file + ".json", "r") as f:
+                info = json.load(f)
+            if info.get("cache_key", None) != cache_key:
+                return None
+            return ZoneMap(np.load(map_file, mmap_mode = "r"), info.get("source", ""))
+        except Exception as e:
+            sg.cprint("{} - WARNING: Could not read zone map {}, building it again. E = {}".format(datetime.now(), map_file, e))
+            return None
+
+##############################################################################################################
+## Identifies what the map is built from, a changed template or calibration builds a new map. The template is
+## part of the key with a ring calibration too, the map has its size.
+def zone_map_cache_key(template_file: str, mask_file: str, ring_calibration) -> str:
+    points = "points {}/{}/{}/{}".format(AppConfig.CFG_POINTS_MISS, AppConfig.CFG_POINTS_WHITE, AppConfig.CFG_POINTS_RED, AppConfig.CFG_POINTS_YELLOW)
+    files = []
+    for file in (template_file, mask_file):
+        stat = os.stat(file)
+        files.append("{}:{}:{}".format(os.path.basename(file), stat.st_size, int(stat.st_mtime)))
+    if ring_calibration is not None:
+        return "rings {} template {} {}".format(json.dumps(ring_calibration), " ".join(files), points)
+    return "template {} {}".format(" ".join(files), points)
+
+##############################################################################################################
+## The zone map of a target face: memory mapped from the cache, built and cached if missing or outdated. Without
+## files it is the default face. The ring calibration {"center": (x, y), "radii": (white, red, yellow)} is in
+## template pixels, without one the zones come from the template colours.
+def load_zone_map(template_file: str = None, mask_file: str = None, map_file: str = None, ring_calibration: dict = None) -> ZoneMap:
+    template_file = AppConfig.CFG_TARGET_TEMPLATE_FILE if template_file is None else template_file
+    mask_file = AppConfig.CFG_TARGET_MASK_FILE if mask_file is None else mask_file
+    map_file = AppConfig.CFG_TARGET_ZONE_MAP_FILE.format(face = "default") if map_file is None else map_file
+
+    cache_key = zone_map_cache_key(template_file, mask_file, ring_calibration)
+    zone_map = ZoneMap.load(map_file, cache_key)
+    if zone_map is not None:
+        return zone_map
+
+    template_img = cv.imread(template_file, cv.IMREAD_COLOR)
+    mask_img = cv.imread(mask_file, cv.IMREAD_COLOR)
+    if template_img is None or mask_img is None:
+        raise IOError("Could not read the target template {} or mask {}.".format(template_file, mask_file))
+
+    if ring_calibration is not None:
+        zone_map = ZoneMap.from_rings((template_img.shape[1], template_img.shape[0]), ring_calibration["center"], ring_calibration["radii"])
+    else:
+        zone_map = ZoneMap.from_template(template_img, mask_img)
+    zone_map.save(map_file, cache_key)
+    sg.cprint("{} - INFO: Built the zone map {} from the {}.".format(datetime.now(), map_file, zone_map.source))
+    return ZoneMap.load(map_file, cache_key)
@@ -0,0 +1,47 @@
+import numpy as np
+import cv2 as cv
+
+from game_modules.app_configuration import AppConfig
+from game_modules.zone_map import ZoneMap
+from game_modules.arrow_scorer import ArrowHitScorer
+
+##############################################################################################################
+## A light target face, arrows are dark shafts from the tip towards the nock (AppConfig.CFG_SCORER_ARROW_DIRECTION)
+def add_arrow(crop: np.ndarray, tip: tuple, length: int = 60) -> np.ndarray:
+    direction = np.array(AppConfig.CFG_SCORER_ARROW_DIRECTION, dtype = np.float64)
+    nock = np.array(tip, dtype = np.float64) + direction / np.linalg.norm(direction) * length
+    crop = crop.copy()
+    cv.line(crop, tip, (int(nock[0]), int(nock[1])), (20, 20, 20), 3)
+    return crop
+
+##############################################################################################################
+def make_scorer() -> ArrowHitScorer:
+    return ArrowHitScorer(ZoneMap.from_rings((200, 200), (100, 100), (30, 60, 90)))
+
+##############################################################################################################
+def test_score_single_arrow():
+    empty = np.full((200, 200, 3), 230, dtype = np.uint8)
+    result = make_scorer().score(empty, add_arrow(empty, (95, 90)))
+    assert result.points == AppConfig.CFG_POINTS_YELLOW
+    assert abs(result.hit_point[0] - 95) <= 3 and abs(result.hit_point[1] - 90) <= 3
+    assert result.needs_review is False
+
+##############################################################################################################
+def test_score_series_against_previous_arrow():
+    empty = np.full((200, 200, 3), 230, dtype = np.uint8)
+    first = add_arrow(empty, (100, 145))
+    second = add_arrow(first, (40, 60))
+    results = make_scorer().score_series([empty, first, None, second, second])
+    assert results[0].points == AppConfig.CFG_POINTS_RED
+    assert results[1] is None
+    assert results[2].points == AppConfig.CFG_POINTS_WHITE
+    # nothing changed: a miss, marked for review
+    assert results[3].points == AppConfig.CFG_POINTS_MISS and results[3].hit_point is None
+    assert results[3].needs_review is True
+
+##############################################################################################################
+def test_light_change_is_no_arrow():
+    empty = np.full((200, 200, 3), 230, dtype = np.uint8)
+    darker = add_arrow(np.full((200, 200, 3), 120, dtype = np.uint8), (100, 100))
+    result = make_scorer().score(empty, darker)
+    assert result.hit_point is None and result.confidence == 0.0
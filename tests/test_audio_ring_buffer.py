@@ -0,0 +1,46 @@
+import numpy as np
+
+from game_modules.audio_ring_buffer import AudioRingBuffer
+
+##############################################################################################################
+## Frames numbered by their absolute index since stream start, on two channels
+def frames(start: int, count: int) -> np.ndarray:
+    index = np.arange(start, start + count, dtype = np.int16)
+    return np.stack([index, -index], axis = 1)
+
+##############################################################################################################
+def test_read_across_wrap_around():
+    ring = AudioRingBuffer(8, channels = 2)
+    ring.write(frames(0, 5))
+    ring.write(frames(5, 6))
+    assert ring.frames_written == 11
+    assert ring.oldest_frame() == 3
+    assert np.array_equal(ring.read(3, 8), frames(3, 8))
+    assert np.array_equal(ring.read_latest(4), frames(7, 4))
+
+##############################################################################################################
+def test_overwritten_and_future_frames_are_silence():
+    ring = AudioRingBuffer(8, channels = 2)
+    ring.write(frames(0, 5))
+    ring.write(frames(5, 6))
+    result = ring.read(1, 12)
+    assert np.array_equal(result[:2], np.zeros((2, 2), dtype = np.int16))
+    assert np.array_equal(result[2:10], frames(3, 8))
+    assert np.array_equal(result[10:], np.zeros((2, 2), dtype = np.int16))
+
+##############################################################################################################
+def test_block_larger_than_ring_keeps_newest():
+    ring = AudioRingBuffer(8, channels = 2)
+    ring.write(frames(0, 3))
+    ring.write(frames(3, 20))
+    assert ring.oldest_frame() == 15
+    assert np.array_equal(ring.read_latest(8), frames(15, 8))
+
+##############################################################################################################
+def test_read_into_preallocated_output():
+    ring = AudioRingBuffer(8, channels = 2)
+    out = np.full((4, 2), 99, dtype = np.int16)
+    ring.write(frames(0, 10))
+    result = ring.read(6, 4, out = out)
+    assert result is out
+    assert np.array_equal(out, frames(6, 4))
@@ -0,0 +1,47 @@
+import numpy as np
+
+from game_modules.result_store import ResultStore
+
+##############################################################################################################
+def make_store() -> ResultStore:
+    store = ResultStore(["Anna", "Ben", "Carl"], ["Wiese", "Wald"], 3)
+    store.columns["manual_points"][0] = [[5, 3, 1], [0, 3, 3]]  # 15
+    store.columns["manual_points"][1] = [[5, 5, 5], [0, 0, 1]]  # 16
+    store.columns["manual_points"][2] = [[3, 3, 3], [1, 5, 0]]  # 15
+    return store
+
+##############################################################################################################
+def test_totals():
+    store = make_store()
+    store.calculate()
+    assert store.columns["final_points"].tolist() == store.columns["manual_points"].tolist()
+    assert store.game_totals.tolist() == [[9, 6], [15, 1], [9, 6]]
+    assert store.shooter_totals.tolist() == [15, 16, 15]
+
+##############################################################################################################
+def test_ranks_share_same_points():
+    store = make_store()
+    store.calculate()
+    assert store.get_ranks().tolist() == [2, 1, 2]
+    # same points in the order the shooters were registered
+    assert store.get_ranking().tolist() == [1, 0, 2]
+
+##############################################################################################################
+def test_outdated_shooters():
+    store = make_store()
+    store.calculate()
+    assert store.get_outdated_shooters().size == 0
+
+    store.set("manual_points", (2, 1, 2), 5)
+    assert store.get_outdated_shooters().tolist() == [2]
+    store.calculate()
+    assert store.get_outdated_shooters().size == 0
+    assert store.get_ranks().tolist() == [3, 2, 1]
+
+##############################################################################################################
+def test_defaults_and_plain_values():
+    store = ResultStore(["Anna"], ["Wiese"], 2, defaults = {"needs_review": True})
+    assert store.get_arrow_count() == 2
+    assert bool(np.all(store.columns["needs_review"]))
+    assert store.get("auto_hit_point", (0, 0, 1)) is None
+    assert isinstance(store.get("auto_points", (0, 0, 0)), int)
@@ -0,0 +1,25 @@
+from game_modules.app_configuration import AppConfig
+from game_modules.zone_map import ZoneMap
+
+##############################################################################################################
+def make_zone_map() -> ZoneMap:
+    return ZoneMap.from_rings((200, 200), (100, 100), (90, 30, 60))
+
+##############################################################################################################
+def test_score_hits_by_ring():
+    zone_map = make_zone_map()
+    hits = [(100, 100), (125, 100), (100, 140), (100, 185), (5, 5)]
+    expected = [AppConfig.CFG_POINTS_YELLOW, AppConfig.CFG_POINTS_YELLOW, AppConfig.CFG_POINTS_RED, AppConfig.CFG_POINTS_WHITE, AppConfig.CFG_POINTS_MISS]
+    assert zone_map.score_hits(hits).tolist() == expected
+    assert [zone_map.points_at(hit) for hit in hits] == expected
+
+##############################################################################################################
+def test_score_hits_border_and_outside():
+    zone_map = make_zone_map()
+    # a distance exactly on a ring border counts for the inner ring, positions are rounded
+    assert zone_map.score_hits([(130, 100), (100.4, 160.4)]).tolist() == [AppConfig.CFG_POINTS_YELLOW, AppConfig.CFG_POINTS_RED]
+    assert zone_map.score_hits([(-1, 100), (100, 200), (250, -3)]).tolist() == [AppConfig.CFG_POINTS_MISS] * 3
+
+##############################################################################################################
+def test_score_hits_empty():
+    assert make_zone_map().score_hits([]).shape == (0,)
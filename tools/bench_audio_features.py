@@ -0,0 +1,67 @@
+"""
+--> Micro-benchmark for the per block audio feature extraction of the BangDetector.
+    Compares the legacy struct.unpack based RMS loop with the NumPy based AudioFeatureExtractor.
+
+    Run from the repository root:
+        python -m tools.bench_audio_features [--rate 44100] [--channels 2] [--repeat 200]
+"""
+import argparse
+import math
+import struct
+import time
+import numpy as np
+
+from game_modules.audio_features import AudioFeatureExtractor
+
+INPUT_BLOCK_TIME = 0.035
+SHORT_NORMALIZE = (1.0/32768.0)
+
+################################################################################
+## The former BangDetector.get_rms(), kept here as reference
+def legacy_get_rms(block) -> float:
+    count = len(block)/2
+    format = "%dh"%(count)
+    shorts = struct.unpack( format, block )
+    sum_squares = 0.0
+    for sample in shorts:
+        n = sample * SHORT_NORMALIZE
+        sum_squares += n*n
+
+    return math.sqrt( sum_squares / count )
+
+################################################################################
+def time_per_block_us(func, block, repeat: int) -> float:
+    func(block) # warm up
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(block)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+################################################################################
+def main():
+    parser = argparse.ArgumentParser(description = "Per block cost of the audio feature extraction.")
+    parser.add_argument("--rate", type = int, default = 44100, help = "sample rate in Hz")
+    parser.add_argument("--channels", type = int, default = 2, help = "number of input channels")
+    parser.add_argument("--repeat", type = int, default = 200, help = "number of timed blocks")
+    args = parser.parse_args()
+
+    frames = int(args.rate * INPUT_BLOCK_TIME)
+    rng = np.random.default_rng(42)
+    block = rng.integers(-8000, 8000, size = frames * args.channels, dtype = np.int16).tobytes()
+
+    extractor = AudioFeatureExtractor(args.channels, frames)
+
+    legacy_us = time_per_block_us(legacy_get_rms, block, args.repeat)
+    total_us = time_per_block_us(extractor.total_rms, block, args.repeat)
+    features_us = time_per_block_us(extractor.extract, block, args.repeat)
+
+    print("Block: {} frames x {} channels ({:.0f} ms @ {} Hz)".format(frames, args.channels, INPUT_BLOCK_TIME * 1000, args.rate))
+    print("  legacy struct RMS          : {:10.1f} us/block".format(legacy_us))
+    print("  numpy total RMS            : {:10.1f} us/block (x{:.0f})".format(total_us, legacy_us / total_us))
+    print("  numpy rms/peak/crest/rise  : {:10.1f} us/block (x{:.0f})".format(features_us, legacy_us / features_us))
+    print("  legacy = {:.6f}, numpy = {:.6f}".format(legacy_get_rms(block), extractor.total_rms(block)))
+    return
+
+################################################################################
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+--> Offline replay benchmark for the BangDetector, no microphone needed.
+    Replays every *.wav in a directory through BangDetector.listen() as fast as possible and compares the
+    detections against labels. Labels for recording.wav are read from recording.txt: one impact time in
+    seconds per line, Audacity label exports (start <tab> end <tab> text) work as well.
+
+    Run from the repository root:
+        python -m tools.bench_bang_detector ./recordings [--engine spectral_flux] [--tolerance-ms 150]
+        python -m tools.bench_bang_detector --synthetic 5
+"""
+import argparse
+import os
+import time
+import numpy as np
+
+from game_modules.audio_bang_detector import BangDetector
+from game_modules.audio_sources import WavFileSource, SyntheticSource
+from game_modules.onset_detectors import DETECTION_ENGINES
+
+################################################################################
+def load_labels(wav_file: str) -> list:
+    labels = []
+    label_file = os.path.splitext(wav_file)[0] + ".txt"
+    if os.path.exists(label_file) is False:
+        print("WARNING: No label file {} found, all detections count as false positives.".format(label_file))
+        return labels
+
+    with open(label_file, "r") as f:
+        for line in f:
+            fields = line.replace(",", "\t").split()
+            if len(fields) > 0:
+                try:
+                    labels.append(float(fields[0]))
+                except ValueError:
+                    pass # header or comment
+    return sorted(labels)
+
+################################################################################
+## Runs one recording through the detector, returns (detection time, onset time) pairs and cpu times.
+## The detection time is the end of the detecting block, the onset time the estimated start of the impact.
+def replay(audio_source, engine: str):
+    detector = BangDetector(audio_source = audio_source, detection_engine = engine)
+    rate = detector.input_sample_rate
+    block_frames = detector.input_frames_per_block
+
+    detection_times = []
+    cpu_per_block = []
+    while detector.source.is_active():
+        start = time.thread_time()
+        impacts = detector.poll_impacts()
+        cpu_per_block.append(time.thread_time() - start)
+        for impact in impacts:
+            detection_times.append(((impact.frame_index + block_frames) / float(rate), impact.onset_frame / float(rate)))
+
+    detector.stop()
+    return detection_times, cpu_per_block, block_frames / float(rate)
+
+################################################################################
+## Greedy matching: a detection belongs to the earliest open label it follows within the tolerance
+def match(labels: list, detections: list, tolerance: float):
+    open_labels = list(labels)
+    latencies = []
+    onset_errors = []
+    false_positives = 0
+    for t, onset in detections:
+        hit = None
+        for label in open_labels:
+            if label <= t <= label + tolerance:
+                hit = label
+                break
+        if hit is None:
+            false_positives += 1
+        else:
+            open_labels.remove(hit)
+            latencies.append((t - hit) * 1000.0)
+            onset_errors.append((onset - hit) * 1000.0)
+
+    return len(latencies), false_positives, len(open_labels), latencies, onset_errors
+
+################################################################################
+def main():
+    parser = argparse.ArgumentParser(description = "Replay labelled recordings through the BangDetector.")
+    parser.add_argument("recordings", nargs = "?", default = None, help = "directory with *.wav and label *.txt files")
+    parser.add_argument("--engine", default = "rms", choices = list(DETECTION_ENGINES.keys()), help = "detection engine")
+    parser.add_argument("--tolerance-ms", type = float, default = 150.0, help = "max. delay between label and detection")
+    parser.add_argument("--synthetic", type = int, default = 0, help = "replay N synthetic recordings instead of a directory")
+    args = parser.parse_args()
+
+    runs = []
+    if args.synthetic > 0:
+        rng = np.random.default_rng(1)
+        for i in range(args.synthetic):
+            impact_times = sorted(rng.uniform(1.0, 19.0, 6).round(3))
+            level = [0.05, 0.1, 0.3][i % 3]
+            runs.append(("synthetic_{:02d} (level {})".format(i, level), SyntheticSource(impact_times, duration = 20.0, impact_level = level, seed = i), impact_times))
+    elif args.recordings is not None:
+        for name in sorted(os.listdir(args.recordings)):
+            if name.lower().endswith(".wav"):
+                wav_file = os.path.join(args.recordings, name)
+                runs.append((name, WavFileSource(wav_file), load_labels(wav_file)))
+    else:
+        parser.error("either a recordings directory or --synthetic N is required")
+
+    totals = [0, 0, 0]
+    all_latencies = []
+    all_onset_errors = []
+    all_cpu = []
+    audio_seconds = 0.0
+    print("{:40s} {:>4s} {:>4s} {:>4s} {:>10s} {:>12s}".format("recording", "TP", "FP", "FN", "lat. ms", "cpu us/blk"))
+    for name, source, labels in runs:
+        detections, cpu, block_time = replay(source, args.engine)
+        tp, fp, fn, latencies, onset_errors = match(labels, detections, args.tolerance_ms / 1000.0)
+        totals[0] += tp
+        totals[1] += fp
+        totals[2] += fn
+        all_latencies += latencies
+        all_onset_errors += onset_errors
+        all_cpu += cpu
+        audio_seconds += len(cpu) * block_time
+        print("{:40s} {:4d} {:4d} {:4d} {:10.1f} {:12.1f}".format(name[:40], tp, fp, fn, np.mean(latencies) if latencies else float("nan"), np.mean(cpu) * 1e6 if cpu else 0.0))
+
+    tp, fp, fn = totals
+    precision = tp / float(tp + fp) if (tp + fp) > 0 else 0.0
+    recall = tp / float(tp + fn) if (tp + fn) > 0 else 0.0
+    print("")
+    print("Engine              : {}".format(args.engine))
+    print("Precision / Recall  : {:.3f} / {:.3f}".format(precision, recall))
+    if len(all_latencies) > 0:
+        print("Latency ms          : mean {:.1f}, p50 {:.1f}, p95 {:.1f}, max {:.1f}".format(np.mean(all_latencies),
+            np.percentile(all_latencies, 50), np.percentile(all_latencies, 95), np.max(all_latencies)))
+        print("Onset error ms      : mean {:+.1f}, mean abs {:.1f}, max abs {:.1f}".format(np.mean(all_onset_errors),
+            np.mean(np.abs(all_onset_errors)), np.max(np.abs(all_onset_errors))))
+    if len(all_cpu) > 0:
+        print("CPU us per block    : mean {:.1f}, p95 {:.1f}, max {:.1f}".format(np.mean(all_cpu) * 1e6, np.percentile(all_cpu, 95) * 1e6, np.max(all_cpu) * 1e6))
+        print("Faster than realtime: x{:.0f}".format(audio_seconds / max(1e-9, float(np.sum(all_cpu)))))
+    return
+
+################################################################################
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+--> Microbenchmark of the image processing per arrow, stage by stage, to see what an OpenCV upgrade, a resolution
+    or a configuration change does. Renders synthetic camera pictures with the target face at random offsets
+    (720p, 1080p and 4K by default), encodes them as the camera does and times every stage:
+        decode    : read the stored camera picture (from memory, no disk)
+        match     : matchTemplate on the full picture with the configured method
+        normalize : normalize of the response map, as the extraction used to do
+        minmaxloc : minMaxLoc on the response map
+        crop      : cut out the target face
+        encode    : write the crop as PNG (into memory)
+        rectify   : front facing face through a target calibration (calibrated untimed for every picture)
+        extract   : complete extract_target with the configured strategy, for comparison
+    Reports mean and percentiles per stage. With --save the results are written as JSON baseline, with --compare
+    a baseline is read and every stage slower than --tolerance (and --min-ms) is reported as regression.
+
+    Run from the repository root:
+        python -m tools.bench_image_pipeline [--frames 10] [--resolutions 1280x720,1920x1080,3840x2160] [--save baseline.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import platform
+import time
+from datetime import datetime
+import numpy as np
+import cv2 as cv
+
+from game_modules.app_configuration import AppConfig
+from game_modules.camera_sources import SyntheticTargetSource
+from game_modules.extraction_pipeline import extract_target, init_worker
+from game_modules.image_writer import get_encode_params
+from game_modules.template_matcher import create_template_matcher
+from game_modules.target_rectifier import calibrate_target
+
+STAGES = ("decode", "match", "normalize", "minmaxloc", "crop", "encode", "rectify", "extract")
+PERCENTILES = (50, 90, 99)
+TEMPLATE_IMG = cv.imread(AppConfig.CFG_TARGET_TEMPLATE_FILE, cv.IMREAD_COLOR)
+MASK_IMG = cv.imread(AppConfig.CFG_TARGET_MASK_FILE, cv.IMREAD_COLOR)
+
+################################################################################
+## Times the stages on one picture, returns {stage: ms} and if the target was found at the right place
+def time_stages(encoded: np.ndarray, matcher, target_origin: tuple) -> tuple:
+    times = {}
+    t = time.perf_counter()
+    picture = cv.imdecode(encoded, cv.IMREAD_COLOR)
+    times["decode"] = (time.perf_counter() - t) * 1000.0
+
+    t = time.perf_counter()
+    result = cv.matchTemplate(matcher.prepare(picture), matcher.template_img, matcher.match_method, mask = matcher.mask_img)
+    times["match"] = (time.perf_counter() - t) * 1000.0
+
+    t = time.perf_counter()
+    normalized = cv.normalize(result, None, 0, 1, cv.NORM_MINMAX, -1)
+    times["normalize"] = (time.perf_counter() - t) * 1000.0
+
+    t = time.perf_counter()
+    _min_val, _max_val, min_loc, max_loc = cv.minMaxLoc(normalized, None)
+    times["minmaxloc"] = (time.perf_counter() - t) * 1000.0
+    loc = min_loc if matcher.match_method in (cv.TM_SQDIFF, cv.TM_SQDIFF_NORMED) else max_loc
+
+    t = time.perf_counter()
+    template_w, template_h = matcher.template_size
+    crop = picture[loc[1]:loc[1] + template_h, loc[0]:loc[0] + template_w].copy()
+    times["crop"] = (time.perf_counter() - t) * 1000.0
+
+    t = time.perf_counter()
+    cv.imencode(".png", crop, get_encode_params("png"))
+    times["encode"] = (time.perf_counter() - t) * 1000.0
+
+    calibration = calibrate_target(picture, TEMPLATE_IMG, MASK_IMG, matcher)
+    t = time.perf_counter()
+    if calibration is not None:
+        calibration.rectify(picture)
+    times["rectify"] = (time.perf_counter() - t) * 1000.0
+
+    t = time.perf_counter()
+    extraction = extract_target(picture, "", time.monotonic())
+    times["extract"] = (time.perf_counter() - t) * 1000.0
+
+    return times, tuple(loc) == target_origin and tuple(extraction.match_loc) == target_origin
+
+################################################################################
+def stage_stats(times_ms: list) -> dict:
+    stats = {"mean": float(np.mean(times_ms)), "max": float(np.max(times_ms))}
+    for p in PERCENTILES:
+        stats["p{}".format(p)] = float(np.percentile(times_ms, p))
+    return stats
+
+################################################################################
+def run_resolution(resolution: tuple, frames: int, matcher, seed: int) -> dict:
+    source = SyntheticTargetSource(fps = 1000.0, seed = seed)
+    times = {stage: [] for stage in STAGES}
+    wrong = 0
+    # one picture untimed, the first calls allocate buffers and load the OpenCV kernels
+    source.open(0, resolution, "BGR")
+    _ok, encoded = cv.imencode(".png", source.get_image(), get_encode_params("png"))
+    time_stages(encoded, matcher, source.target_origin)
+    for i in range(0, frames):
+        # a new random position of the target for every picture
+        source.open(0, resolution, "BGR")
+        source.add_arrow()
+        _ok, encoded = cv.imencode(".png", source.get_image(), get_encode_params("png"))
+        frame_times, found = time_stages(encoded, matcher, source.target_origin)
+        for stage, ms in frame_times.items():
+            times[stage].append(ms)
+        wrong += 0 if found else 1
+    return {"frames": frames, "wrong_location": wrong, "stages": {stage: stage_stats(times[stage]) for stage in STAGES}}
+
+################################################################################
+def print_results(results: dict):
+    header = "{:10s} {:10s}".format("resolution", "stage") + "".join(["{:>10s}".format(k) for k in ["mean"] + ["p{}".format(p) for p in PERCENTILES] + ["max"]])
+    print(header)
+    for resolution, res in results["resolutions"].items():
+        for stage, stats in res["stages"].items():
+            print("{:10s} {:10s}".format(resolution, stage) + "".join(["{:10.2f}".format(stats[k]) for k in ["mean"] + ["p{}".format(p) for p in PERCENTILES] + ["max"]]))
+        print("{:10s} wrong location in {} of {} pictures".format(resolution, res["wrong_location"], res["frames"]))
+    return
+
+################################################################################
+## Compares the p50 of every stage with the baseline, returns the number of regressions. A stage counts as
+## regression if it is slower by more than the tolerance and by more than min_ms.
+def compare_baseline(results: dict, baseline: dict, tolerance: float, min_ms: float) -> int:
+    print("Compared with baseline from {} (OpenCV {}):".format(baseline.get("created", "?"), baseline.get("opencv", "?")))
+    regressions = 0
+    for resolution, res in results["resolutions"].items():
+        base_res = baseline["resolutions"].get(resolution, None)
+        if base_res is None:
+            print("{:10s} not in the baseline".format(resolution))
+            continue
+        for stage, stats in res["stages"].items():
+            base_stats = base_res["stages"].get(stage, None)
+            if base_stats is None or base_stats["p50"] <= 0:
+                continue
+            change = stats["p50"] / base_stats["p50"] - 1.0
+            # sub-millisecond stages jitter by more than the tolerance
+            regression = change > tolerance and stats["p50"] - base_stats["p50"] > min_ms
+            regressions += 1 if regression else 0
+            print("{:10s} {:10s} p50 {:10.2f} -> {:10.2f} ms  {:+7.1%}{}".format(resolution, stage, base_stats["p50"], stats["p50"], change,
+                "  REGRESSION" if regression else ""))
+    return regressions
+
+################################################################################
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the image processing per arrow stage by stage.")
+    parser.add_argument("--frames", type = int, default = 10, help = "pictures per resolution")
+    parser.add_argument("--resolutions", default = "1280x720,1920x1080,3840x2160", help = "comma separated WxH")
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--save", default = None, help = "write the results as JSON baseline to this file")
+    parser.add_argument("--compare", default = None, help = "JSON baseline to compare with")
+    parser.add_argument("--tolerance", type = float, default = 0.1, help = "p50 slowdown that counts as regression, 0.1 = 10%%")
+    parser.add_argument("--min-ms", type = float, default = 0.5, help = "smaller p50 slowdowns are no regression")
+    args = parser.parse_args()
+
+    # the target moves with every picture, extract_target would calibrate every time
+    AppConfig.CFG_RECTIFY_TARGET = False
+    matcher = create_template_matcher(AppConfig.CFG_TARGET_TEMPLATE_FILE, AppConfig.CFG_TARGET_MASK_FILE, "full")
+    init_worker(AppConfig.CFG_TARGET_TEMPLATE_FILE, AppConfig.CFG_TARGET_MASK_FILE)
+
+    results = {
+        "created": str(datetime.now()),
+        "opencv": cv.__version__,
+        "numpy": np.__version__,
+        "python": platform.python_version(),
+        "machine": "{} {}".format(platform.system(), platform.machine()),
+        "config": {"strategy": AppConfig.CFG_MATCH_STRATEGY, "method": AppConfig.CFG_MATCH_METHOD, "grayscale": AppConfig.CFG_MATCH_GRAYSCALE,
+            "png_compression": AppConfig.CFG_IMAGE_PNG_COMPRESSION},
+        "resolutions": {},
+    }
+    for resolution_text in args.resolutions.split(","):
+        resolution = tuple(int(v) for v in resolution_text.lower().split("x"))
+        results["resolutions"]["{}x{}".format(resolution[0], resolution[1])] = run_resolution(resolution, args.frames, matcher, args.seed)
+
+    print("OpenCV {}, {} threads, strategy {}, method {}, {}".format(cv.__version__, cv.getNumThreads(), AppConfig.CFG_MATCH_STRATEGY,
+        AppConfig.CFG_MATCH_METHOD, "grayscale" if AppConfig.CFG_MATCH_GRAYSCALE else "BGR"))
+    print_results(results)
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent = 2)
+        print("Baseline written to {}".format(args.save))
+
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(results, baseline, args.tolerance, args.min_ms)
+        if regressions > 0:
+            print("{} stages slower than the baseline by more than {:.0%}".format(regressions, args.tolerance))
+            raise SystemExit(1)
+    return
+
+################################################################################
+if __name__ == '__main__':
+    main()
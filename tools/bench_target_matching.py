@@ -0,0 +1,112 @@
+"""
+--> Per arrow timing of the target extraction, before and after the ROI tracking and the pyramid search.
+    Renders synthetic camera pictures (target face at a known position, one more arrow per picture) and
+    finds the target in each picture several ways:
+        legacy  : full search with normalize of the response map, as the extraction used to work
+        full    : full resolution search on the raw response map
+        pyramid : coarse to fine search
+        roi     : complete extraction (crop + encode) searching around the last location first, with the
+                  configured strategy as fallback
+    With --move-every N the target jumps to a new position every N pictures, like a moved camera.
+
+    Run from the repository root:
+        python -m tools.bench_target_matching [--pictures 20] [--resolution 1920x1080] [--move-every 0] [--grayscale]
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import cv2 as cv
+
+from game_modules.app_configuration import AppConfig
+from game_modules.camera_sources import SyntheticTargetSource
+from game_modules.extraction_pipeline import extract_target, init_worker
+from game_modules.template_matcher import create_template_matcher
+
+################################################################################
+## The extraction as it was before the ROI tracking, match and normalize on the full picture
+def legacy_extract(source_img: np.ndarray, template_img: np.ndarray, mask_img: np.ndarray, match_method: int) -> tuple:
+    result = cv.matchTemplate(source_img, template_img, match_method, mask = mask_img)
+    cv.normalize(result, result, 0, 1, cv.NORM_MINMAX, -1)
+    _minVal, _maxVal, minLoc, maxLoc = cv.minMaxLoc(result, None)
+    return minLoc if match_method == cv.TM_SQDIFF else maxLoc
+
+################################################################################
+def print_stats(name: str, times_ms: list, errors: list, extra: str = ""):
+    print("{:8s} mean {:8.1f}  p50 {:8.1f}  p95 {:8.1f}  max {:8.1f} ms   wrong location {:3d}  {}".format(name, np.mean(times_ms),
+        np.percentile(times_ms, 50), np.percentile(times_ms, 95), np.max(times_ms), int(np.sum(errors)), extra))
+    return
+
+################################################################################
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the target extraction with and without ROI tracking.")
+    parser.add_argument("--pictures", type = int, default = 20, help = "number of camera pictures")
+    parser.add_argument("--resolution", default = "1920x1080", help = "picture size WxH")
+    parser.add_argument("--move-every", type = int, default = 0, help = "move the target every N pictures, 0 = never")
+    parser.add_argument("--grayscale", action = "store_true", help = "match on one channel")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+
+    resolution = tuple(int(v) for v in args.resolution.lower().split("x"))
+    AppConfig.CFG_MATCH_GRAYSCALE = args.grayscale
+    # the matching is measured, not the rectification
+    AppConfig.CFG_RECTIFY_TARGET = False
+    template_img = cv.imread(AppConfig.CFG_TARGET_TEMPLATE_FILE, cv.IMREAD_COLOR)
+    mask_img = cv.imread(AppConfig.CFG_TARGET_MASK_FILE, cv.IMREAD_COLOR)
+    full_matcher = create_template_matcher(AppConfig.CFG_TARGET_TEMPLATE_FILE, AppConfig.CFG_TARGET_MASK_FILE, "full")
+    pyramid_matcher = create_template_matcher(AppConfig.CFG_TARGET_TEMPLATE_FILE, AppConfig.CFG_TARGET_MASK_FILE, "pyramid")
+    init_worker(AppConfig.CFG_TARGET_TEMPLATE_FILE, AppConfig.CFG_TARGET_MASK_FILE)
+    output_file = os.path.join(tempfile.mkdtemp(), "crop.png")
+
+    source = SyntheticTargetSource(fps = 1000.0, seed = args.seed)
+    source.open(0, resolution, "BGR")
+
+    times = {"legacy": [], "full": [], "pyramid": [], "roi": []}
+    errors = {"legacy": [], "full": [], "pyramid": [], "roi": []}
+    roi_hits = 0
+    pyramid_fallbacks = 0
+    hint_loc = None
+    for i in range(0, args.pictures):
+        if args.move_every > 0 and i > 0 and i % args.move_every == 0:
+            source.open(0, resolution, "BGR")
+        source.add_arrow()
+        picture = source.get_image()
+
+        t = time.perf_counter()
+        loc = legacy_extract(picture, template_img, mask_img, full_matcher.match_method)
+        times["legacy"].append((time.perf_counter() - t) * 1000.0)
+        errors["legacy"].append(tuple(loc) != source.target_origin)
+
+        t = time.perf_counter()
+        loc, _score = full_matcher.find(picture)
+        times["full"].append((time.perf_counter() - t) * 1000.0)
+        errors["full"].append(tuple(loc) != source.target_origin)
+
+        t = time.perf_counter()
+        loc, _score = pyramid_matcher.find(picture)
+        times["pyramid"].append((time.perf_counter() - t) * 1000.0)
+        errors["pyramid"].append(tuple(loc) != source.target_origin)
+        pyramid_fallbacks += 1 if pyramid_matcher.last_used_full_search else 0
+
+        t = time.perf_counter()
+        result = extract_target(picture, output_file, time.monotonic(), hint_loc)
+        times["roi"].append((time.perf_counter() - t) * 1000.0)
+        errors["roi"].append(tuple(result.match_loc) != source.target_origin)
+        roi_hits += 1 if result.roi_hit else 0
+        if result.score is not None and result.score >= AppConfig.CFG_MATCH_ROI_MIN_SCORE:
+            hint_loc = result.match_loc
+
+    print("{} pictures {}x{}, template {}x{}, {}, pyramid levels {}, ROI margin {} px".format(args.pictures, resolution[0], resolution[1],
+        template_img.shape[1], template_img.shape[0], "grayscale" if args.grayscale else "BGR", pyramid_matcher.levels, AppConfig.CFG_MATCH_ROI_MARGIN))
+    print_stats("legacy", times["legacy"], errors["legacy"])
+    print_stats("full", times["full"], errors["full"])
+    print_stats("pyramid", times["pyramid"], errors["pyramid"], "({} full search fallbacks)".format(pyramid_fallbacks))
+    print_stats("roi", times["roi"], errors["roi"], "(incl. crop + encode, {} of {} found near the last location)".format(roi_hits, args.pictures))
+    print("Speedup per arrow (mean): legacy -> pyramid x{:.1f}, legacy -> roi x{:.1f}".format(np.mean(times["legacy"]) / np.mean(times["pyramid"]),
+        np.mean(times["legacy"]) / np.mean(times["roi"])))
+    return
+
+################################################################################
+if __name__ == '__main__':
+    main()
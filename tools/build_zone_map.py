@@ -0,0 +1,60 @@
+"""
+--> Builds the zone map of a target face of the library (points per template pixel) and writes it to the cache,
+    the game does the same when the face is used and the map is missing or outdated. The zones are read from the
+    colours of the template, or from the ring calibration in the face.json of the face. --center and --radii store
+    a ring calibration there, --colours removes it. With --preview the map is also written as a picture to check
+    it against the template.
+
+    Run from the repository root:
+        python -m tools.build_zone_map [--face default] [--center 68,68 --radii 66,44,22 | --colours] [--preview zone_map.png]
+"""
+import argparse
+import os
+import numpy as np
+import cv2 as cv
+import PySimpleGUI as sg
+
+from game_modules.app_configuration import AppConfig
+from game_modules.target_faces import TargetFaceLibrary, load_face_info, save_face_info
+
+################################################################################
+def main():
+    parser = argparse.ArgumentParser(description = "Build the zone map of a target face.")
+    parser.add_argument("--face", default = TargetFaceLibrary.DEFAULT_FACE, help = "target face of the library")
+    parser.add_argument("--center", default = None, help = "ring centre x,y in template pixels")
+    parser.add_argument("--radii", default = None, help = "outer radius of the white, red and yellow ring")
+    parser.add_argument("--colours", action = "store_true", help = "remove the ring calibration, zones from the template colours")
+    parser.add_argument("--preview", default = None, help = "write the map as picture to this file")
+    args = parser.parse_args()
+
+    # no window: the log goes to the console
+    sg.cprint = lambda *values, **kwargs: print(*values)
+    face_dir = os.path.join(AppConfig.CFG_TARGET_FACE_LIBRARY_PATH, args.face)
+    if (args.center is not None and args.radii is not None) or args.colours is True:
+        info = load_face_info(face_dir)
+        info["ring_calibration"] = None
+        if args.colours is False:
+            info["ring_calibration"] = {"center": [float(v) for v in args.center.split(",")], "radii": [float(v) for v in args.radii.split(",")]}
+        save_face_info(face_dir, info)
+
+    face = TargetFaceLibrary().get(args.face)
+    if face is None:
+        print("There is no target face {} in {}.".format(args.face, AppConfig.CFG_TARGET_FACE_LIBRARY_PATH))
+        return
+    zone_map = face.get_zone_map()
+    points, counts = np.unique(zone_map.points_map, return_counts = True)
+    print("Zone map {} {}x{} from the {}, pixels per points: {}".format(face.zone_map_file, zone_map.get_size()[0],
+        zone_map.get_size()[1], zone_map.source, dict(zip(points.tolist(), counts.tolist()))))
+
+    if args.preview is not None:
+        colours = {AppConfig.CFG_POINTS_MISS: (40, 40, 40), AppConfig.CFG_POINTS_WHITE: (255, 255, 255),
+            AppConfig.CFG_POINTS_RED: (0, 0, 255), AppConfig.CFG_POINTS_YELLOW: (0, 255, 255)}
+        preview = np.zeros(zone_map.points_map.shape + (3,), dtype = np.uint8)
+        for point_value, colour in colours.items():
+            preview[zone_map.points_map == point_value] = colour
+        cv.imwrite(args.preview, preview)
+    return
+
+################################################################################
+if __name__ == '__main__':
+    main()
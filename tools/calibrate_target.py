@@ -0,0 +1,80 @@
+"""
+--> Calibration of the target rectification, the game calibrates by itself on the first shot of a camera and
+    whenever the target face does not fit any more. This tool does it ahead of time or starts over:
+        --picture FILE     : calibrate the camera from a picture of the target (no arrows in it)
+        --invalidate       : delete the stored calibration of the camera, the next shot calibrates again
+        --chessboard DIR   : calibrate the lens from pictures of a chessboard (--pattern inner corners) and write
+                             the lens model to --lens-file, set AppConfig.CFG_CAMERA_LENS_FILE to use it
+    The calibration is stored per camera and target face (--face, a name of the face library, "default" if not given).
+    With --preview FILE the rectified target face is written next to the template for a check.
+
+    Run from the repository root:
+        python -m tools.calibrate_target --camera-id pygame_0 --picture cam_shots/<session>/<picture>.png [--face default] [--preview check.png]
+        python -m tools.calibrate_target --camera-id pygame_0 --invalidate
+        python -m tools.calibrate_target --chessboard ./chessboard --pattern 9x6 --lens-file ./results/camera_lens.npz
+"""
+import argparse
+import os
+import numpy as np
+import cv2 as cv
+import PySimpleGUI as sg
+
+from game_modules.app_configuration import AppConfig
+from game_modules.image_writer import read_image
+from game_modules.template_matcher import create_template_matcher
+from game_modules.target_rectifier import calibrate_target, calibrate_lens, load_lens, get_calibration_file
+from game_modules.target_faces import TargetFaceLibrary
+
+################################################################################
+def main():
+    parser = argparse.ArgumentParser(description = "Calibrate the target rectification of a camera or the camera lens.")
+    parser.add_argument("--camera-id", default = "", help = "camera id, e.g. pygame_0, as in the annotations")
+    parser.add_argument("--face", default = TargetFaceLibrary.DEFAULT_FACE, help = "target face of the library")
+    parser.add_argument("--picture", default = None, help = "camera picture of the target without arrows")
+    parser.add_argument("--invalidate", action = "store_true", help = "delete the stored calibration of the camera")
+    parser.add_argument("--preview", default = None, help = "write the rectified target face to this file")
+    parser.add_argument("--chessboard", default = None, help = "directory with chessboard pictures for the lens calibration")
+    parser.add_argument("--pattern", default = "9x6", help = "inner corners of the chessboard, columns x rows")
+    parser.add_argument("--lens-file", default = "./results/camera_lens.npz", help = "where the lens model is written")
+    args = parser.parse_args()
+
+    # no window: the log goes to the console
+    sg.cprint = lambda *values, **kwargs: print(*values)
+    if args.chessboard is not None:
+        pattern_size = tuple(int(v) for v in args.pattern.lower().split("x"))
+        images = [read_image(os.path.join(args.chessboard, f)) for f in sorted(os.listdir(args.chessboard))]
+        lens = calibrate_lens([image for image in images if image is not None], pattern_size)
+        if lens is None:
+            print("The chessboard {} was found in fewer than 3 pictures, no lens model written.".format(args.pattern))
+            return
+        np.savez(args.lens_file, camera_matrix = lens[0], dist_coeffs = lens[1])
+        print("Lens model written to {}:\n{}\n{}".format(args.lens_file, lens[0], lens[1].ravel()))
+
+    face = TargetFaceLibrary().get(args.face)
+    if face is None:
+        print("There is no target face {} in {}.".format(args.face, AppConfig.CFG_TARGET_FACE_LIBRARY_PATH))
+        return
+    calibration_file = get_calibration_file(args.camera_id, face.name)
+    if args.invalidate is True and os.path.exists(calibration_file):
+        os.remove(calibration_file)
+        print("Calibration {} deleted.".format(calibration_file))
+
+    if args.picture is not None:
+        template_img = face.template_img
+        mask_img = face.mask_img
+        matcher = create_template_matcher(face.template_file, face.mask_file)
+        camera_matrix, dist_coeffs = load_lens(args.lens_file if args.chessboard is not None else None)
+        calibration = calibrate_target(read_image(args.picture), template_img, mask_img, matcher, camera_matrix, dist_coeffs)
+        if calibration is None:
+            print("The target face was not found well enough in {}, no calibration written.".format(args.picture))
+            return
+        calibration.save(calibration_file)
+        print("Calibration {} written ({}, score {:.3f}), target face at {} in the picture.".format(calibration_file, calibration.method,
+            calibration.score, calibration.get_bbox()))
+        if args.preview is not None:
+            cv.imwrite(args.preview, np.hstack([calibration.rectify(read_image(args.picture)), template_img]))
+    return
+
+################################################################################
+if __name__ == '__main__':
+    main()
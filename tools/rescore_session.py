@@ -0,0 +1,103 @@
+"""
+--> Re-runs the target extraction and the automatic scoring of a past session, e.g. after changing the matching or
+    scoring parameters. Reads the camera pictures of cam_shots/<session_id>, named HH-MM-SS_game_player.<ext> by
+    CameraControl.get_and_store_shot, and finds shooter, game and arrow from the names: the pictures of a shooter
+    in a game are the arrows in the order they were taken. The pictures are extracted in a process pool on all
+    cores and the crops, the annotations and the result file are written to a fresh result directory, no window is
+    opened. The camera pictures are not changed. The target before the first arrow is not stored during a session, so
+    the first arrow of every game has no baseline and is marked for review.
+
+    Run from the repository root:
+        python -m tools.rescore_session cam_shots/<session_id> [--output results/<session_id>_rescored] [--workers N] [--verbose]
+"""
+import argparse
+import os
+import re
+import time
+import PySimpleGUI as sg
+
+from game_modules.app_configuration import AppConfig
+from game_modules.image_frame import ImageFrame
+from game_modules.image_writer import IMAGE_FORMATS, ImageWriterPool
+from game_modules.result_processor import ResultProcessor
+from game_modules.thread_log import THREAD_LOG
+
+## HH-MM-SS_game_player.ext, the game name may contain "_", the shooter name is the last part
+CAM_SHOT_NAME_PATTERN = re.compile(r"^(\d{2})-(\d{2})-(\d{2})_(.+)_([^_]+)\.(\w+)$")
+
+################################################################################
+## The camera pictures of a session by shooter and game: {shooter: {game: [file, ...]}} in the order they were taken
+def find_cam_shots(cam_dir: str) -> dict:
+    shots = []
+    for file_name in sorted(os.listdir(cam_dir)):
+        match = CAM_SHOT_NAME_PATTERN.match(file_name)
+        if match is None or match.group(6).lower() not in IMAGE_FORMATS:
+            continue
+        taken = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + int(match.group(3))
+        shots.append((taken, match.group(4), match.group(5), os.path.join(cam_dir, file_name)))
+
+    session = {}
+    for _taken, game_name, shooter_name, file in sorted(shots):
+        session.setdefault(shooter_name, {}).setdefault(game_name, []).append(file)
+    return session
+
+################################################################################
+def main():
+    parser = argparse.ArgumentParser(description = "Re-extract and re-score the camera pictures of a past session.")
+    parser.add_argument("cam_dir", help = "camera picture directory of the session, e.g. cam_shots/<session_id>")
+    parser.add_argument("--output", default = None, help = "result directory, default results/<session_id>_rescored")
+    parser.add_argument("--workers", type = int, default = os.cpu_count(), help = "extraction processes")
+    parser.add_argument("--verbose", action = "store_true", help = "print the log of the result processing")
+    args = parser.parse_args()
+
+    session_id = os.path.basename(os.path.normpath(args.cam_dir))
+    result_dir = args.output if args.output is not None else os.path.join(AppConfig.CFG_RESULTS_STORAGE_PATH, session_id + "_rescored")
+    session = find_cam_shots(args.cam_dir)
+    if len(session) == 0:
+        print("No camera pictures named HH-MM-SS_game_player found in {}.".format(args.cam_dir))
+        return
+    if os.path.exists(os.path.dirname(os.path.abspath(result_dir))) is False:
+        os.makedirs(os.path.dirname(os.path.abspath(result_dir)))
+
+    # no window: the log of the result processing goes to the console
+    sg.cprint = lambda *values, **kwargs: print(*values) if args.verbose else None
+    AppConfig.CFG_EXTRACTION_WORKERS = args.workers
+
+    image_writer = ImageWriterPool()
+    result_processor = ResultProcessor(image_writer)
+    game_names = []
+    for games in session.values():
+        game_names += [g for g in games.keys() if g not in game_names]
+    result_processor.init_session_results(list(session.keys()), game_names, session_id, args.cam_dir, result_dir)
+
+    start = time.perf_counter()
+    pictures = 0
+    for shooter_name, games in session.items():
+        for game_name, files in games.items():
+            if len(files) > AppConfig.CFG_ARROWS_PER_PLAYER:
+                print("Shooter {} has {} pictures in game {}, only the first {} are arrows.".format(shooter_name, len(files), game_name, AppConfig.CFG_ARROWS_PER_PLAYER))
+            for arrow_index, file in enumerate(files[0:AppConfig.CFG_ARROWS_PER_PLAYER]):
+                result_processor.process_arrow_cam_shot(shooter_name, game_name, arrow_index + 1, ImageFrame.from_file(file))
+                pictures += 1
+
+    result_processor.collect_extraction_results()
+    result_processor.calculate_results()
+    result_processor.close_result_window()
+    result_processor.close()
+    image_writer.stop()
+    THREAD_LOG.flush()
+    elapsed = time.perf_counter() - start
+
+    # best shooter first
+    store = result_processor.session_results.store
+    ranks = store.get_ranks()
+    review = store.columns["needs_review"].sum(axis = (1, 2))
+    for shooter_i in store.get_ranking():
+        games = ", ".join(["{} {}".format(game_name, store.columns["final_points"][shooter_i, game_i].tolist()) for game_i, game_name in enumerate(store.game_names)])
+        print("{:2d}. {:20s} {:4d} points   {}   ({} to review)".format(ranks[shooter_i], store.shooter_names[shooter_i], store.shooter_totals[shooter_i], games, review[shooter_i]))
+    print("{} pictures in {:.1f} s with {} workers, results in {}".format(pictures, elapsed, args.workers, result_dir))
+    return
+
+################################################################################
+if __name__ == '__main__':
+    main()